@@ -33,6 +33,7 @@ class Settings(BaseSettings):
     host: str = Field(default="0.0.0.0", env="HOST")
     port: int = Field(default=8000, env="PORT")
     workers: int = Field(default=1, env="WORKERS")
+    use_uvloop: bool = Field(default=True, env="USE_UVLOOP")
     
     # SSL settings
     ssl_cert: Optional[str] = Field(default=None, env="SSL_CERT")
@@ -57,6 +58,7 @@ class Settings(BaseSettings):
     db_pool_min: int = Field(default=5, env="DB_POOL_MIN")
     db_pool_max: int = Field(default=20, env="DB_POOL_MAX")
     db_pool_timeout: int = Field(default=30, env="DB_POOL_TIMEOUT")
+    db_statement_cache_size: int = Field(default=256, env="DB_STATEMENT_CACHE_SIZE")
     
     # =============================================================================
     # REDIS SETTINGS
@@ -145,6 +147,7 @@ class Settings(BaseSettings):
     enable_mcp: bool = Field(default=True, env="ENABLE_MCP")
     enable_skills: bool = Field(default=True, env="ENABLE_SKILLS")
     enable_multi_agent: bool = Field(default=False, env="ENABLE_MULTI_AGENT")
+    enable_tracing: bool = Field(default=True, env="ENABLE_TRACING")
     
     # =============================================================================
     # RATE LIMITING
@@ -160,6 +163,7 @@ class Settings(BaseSettings):
     task_timeout: int = Field(default=300, env="TASK_TIMEOUT")
     task_retry_attempts: int = Field(default=3, env="TASK_RETRY_ATTEMPTS")
     task_retry_delay: int = Field(default=5, env="TASK_RETRY_DELAY")
+    worker_concurrency: int = Field(default=4, env="WORKER_CONCURRENCY")
     
     # SSE settings
     sse_heartbeat_interval: int = Field(default=30, env="SSE_HEARTBEAT_INTERVAL")
@@ -174,6 +178,9 @@ class Settings(BaseSettings):
     provider_priority_cloudflare: int = Field(default=2, env="PROVIDER_PRIORITY_CLOUDFLARE")
     provider_priority_bedrock: int = Field(default=3, env="PROVIDER_PRIORITY_BEDROCK")
     
+    # Client-side request budget per provider
+    provider_rate_limit_per_minute: int = Field(default=600, env="PROVIDER_RATE_LIMIT_PER_MINUTE")
+    
     # Failover settings
     failover_enabled: bool = Field(default=True, env="FAILOVER_ENABLED")
     failover_max_attempts: int = Field(default=3, env="FAILOVER_MAX_ATTEMPTS")
@@ -187,6 +194,17 @@ class Settings(BaseSettings):
     vector_index_type: str = Field(default="ivfflat", env="VECTOR_INDEX_TYPE")
     vector_index_lists: int = Field(default=100, env="VECTOR_INDEX_LISTS")
     vector_similarity_threshold: float = Field(default=0.8, env="VECTOR_SIMILARITY_THRESHOLD")
+    # VectorStore index: "hnsw" (in-process, needs hnswlib) or "faiss-gpu" (exact
+    # search on GPU, needs faiss-gpu); set VECTOR_USE_INDEX=false to force the
+    # exact brute-force scan
+    vector_use_index: bool = Field(default=True, env="VECTOR_USE_INDEX")
+    vector_index_backend: str = Field(default="hnsw", env="VECTOR_INDEX_BACKEND")
+    vector_hnsw_m: int = Field(default=16, env="VECTOR_HNSW_M")
+    vector_hnsw_ef_construction: int = Field(default=200, env="VECTOR_HNSW_EF_CONSTRUCTION")
+    vector_hnsw_ef_search: int = Field(default=64, env="VECTOR_HNSW_EF_SEARCH")
+    # Directory for a persistent, memory-mapped VectorStore (single writer);
+    # unset keeps vectors in process memory only
+    vector_store_path: Optional[str] = Field(default=None, env="VECTOR_STORE_PATH")
     
     # RAG settings
     rag_chunk_size: int = Field(default=1000, env="RAG_CHUNK_SIZE")
@@ -225,6 +243,9 @@ class Settings(BaseSettings):
     webhook_signature_algorithm: str = Field(default="SHA256", env="WEBHOOK_SIGNATURE_ALGORITHM")
     webhook_signature_tolerance: int = Field(default=300, env="WEBHOOK_SIGNATURE_TOLERANCE")
     
+    # Per-source webhook secrets
+    poe_webhook_secret: Optional[str] = Field(default=None, env="POE_WEBHOOK_SECRET")
+    
     # Webhook processing
     webhook_max_payload_size: int = Field(default=10485760, env="WEBHOOK_MAX_PAYLOAD_SIZE")
     webhook_processing_timeout: int = Field(default=30, env="WEBHOOK_PROCESSING_TIMEOUT")
@@ -5,7 +5,7 @@ Handles PostgreSQL + pgvector connections with async support
 
 import asyncio
 import logging
-from typing import AsyncGenerator, Optional
+from typing import AsyncGenerator, Dict, Optional
 from contextlib import asynccontextmanager
 
 import asyncpg
@@ -18,6 +18,23 @@ logger = logging.getLogger(__name__)
 # Global connection pool
 _db_pool: Optional[Pool] = None
 
+# Hot-path statements addressed by name. Sending the exact same SQL text every
+# time means each pooled connection parses and plans it once, then reuses the
+# prepared statement from its statement cache.
+PREPARED_STATEMENTS: Dict[str, str] = {
+    "update_status": "UPDATE tasks SET status = $1, updated_at = NOW() WHERE id = $2",
+    "complete_task": "UPDATE tasks SET status = $1, output_payload = $2, updated_at = NOW() WHERE id = $3",
+    "fail_task": "UPDATE tasks SET status = $1, error_reason = $2, updated_at = NOW() WHERE id = $3",
+    "cancel_task": (
+        "UPDATE tasks SET status = $1, updated_at = NOW() "
+        "WHERE id = $2 AND status IN ($3, $4)"
+    ),
+    "insert_task": (
+        "INSERT INTO tasks (user_id, task_type, input_payload, status, priority, metadata, created_at, updated_at) "
+        "VALUES ($1, $2, $3, $4, $5, $6, NOW(), NOW()) RETURNING id"
+    ),
+}
+
 
 async def init_db() -> None:
     """Initialize database connection pool"""
@@ -31,6 +48,9 @@ async def init_db() -> None:
             min_size=settings.db_pool_min,
             max_size=settings.db_pool_max,
             command_timeout=settings.db_pool_timeout,
+            # Per-connection prepared statement cache keyed by SQL text, so
+            # repeated queries skip Postgres parse/plan after first use
+            statement_cache_size=settings.db_statement_cache_size,
             server_settings={
                 "jit": "off",  # Disable JIT for better stability
             }
@@ -98,6 +118,23 @@ async def fetch_val(query: str, *args):
         return await conn.fetchval(query, *args)
 
 
+def command_rowcount(status: str) -> int:
+    """Row count from an asyncpg command tag, e.g. 'DELETE 47' or 'INSERT 0 1'"""
+    return int(status.rpartition(" ")[2])
+
+
+async def execute_prepared(name: str, *args) -> str:
+    """Execute a named hot-path statement and return the status"""
+    async with get_db() as conn:
+        return await conn.execute(PREPARED_STATEMENTS[name], *args)
+
+
+async def fetch_val_prepared(name: str, *args):
+    """Fetch a single value from a named hot-path statement"""
+    async with get_db() as conn:
+        return await conn.fetchval(PREPARED_STATEMENTS[name], *args)
+
+
 async def create_tables() -> None:
     """Create all database tables from migrations"""
     logger.info("Creating database tables...")
@@ -5,10 +5,14 @@ Handles Upstash Redis for queue management and caching
 
 import asyncio
 import logging
-from typing import Optional, Any, Dict, List
+import time
+import uuid
+from typing import Optional, Any, Dict, List, Tuple, Union
 from contextlib import asynccontextmanager
 
 import aioredis
+import msgpack
+import orjson
 from aioredis import Redis
 
 from app.config.settings import settings
@@ -18,10 +22,13 @@ logger = logging.getLogger(__name__)
 # Global Redis connection
 _redis_client: Optional[Redis] = None
 
+# Binary-safe connection for packed payloads (responses are not decoded)
+_redis_binary_client: Optional[Redis] = None
+
 
 async def init_redis() -> None:
     """Initialize Redis connection"""
-    global _redis_client
+    global _redis_client, _redis_binary_client
     
     logger.info("Initializing Redis connection...")
     
@@ -35,6 +42,11 @@ async def init_redis() -> None:
                 decode_responses=True,
                 ssl=True
             )
+            _redis_binary_client = aioredis.from_url(
+                settings.redis_url,
+                decode_responses=False,
+                ssl=True
+            )
         else:
             # Standard connection
             _redis_client = aioredis.from_url(
@@ -42,6 +54,10 @@ async def init_redis() -> None:
                 encoding="utf-8",
                 decode_responses=True
             )
+            _redis_binary_client = aioredis.from_url(
+                settings.redis_url,
+                decode_responses=False
+            )
         
         # Test connection
         await _redis_client.ping()
@@ -55,13 +71,17 @@ async def init_redis() -> None:
 
 async def close_redis() -> None:
     """Close Redis connection"""
-    global _redis_client
+    global _redis_client, _redis_binary_client
     
     if _redis_client:
         logger.info("Closing Redis connection...")
         await _redis_client.close()
         _redis_client = None
         logger.info("Redis connection closed")
+    
+    if _redis_binary_client:
+        await _redis_binary_client.close()
+        _redis_binary_client = None
 
 
 def get_redis() -> Redis:
@@ -71,35 +91,50 @@ def get_redis() -> Redis:
     return _redis_client
 
 
+def get_redis_binary() -> Redis:
+    """Get Redis client instance that returns raw bytes"""
+    if not _redis_binary_client:
+        raise RuntimeError("Redis connection not initialized")
+    return _redis_binary_client
+
+
 # Queue Management
-async def enqueue_task(task_data: Dict[str, Any], priority: int = 0) -> str:
-    """Add task to queue"""
+# The queue is a sorted set; higher priority pops first, FIFO within a priority
+QUEUE_PRIORITY_WEIGHT = 10**13  # exceeds any epoch-ms timestamp
+
+
+def queue_score(priority: int) -> float:
+    """Sorted-set score for a task: priority band, older first within it"""
+    return priority * QUEUE_PRIORITY_WEIGHT - int(time.time() * 1000)
+
+
+async def enqueue_task(task_data: Union[bytes, Dict[str, Any]], priority: int = 0) -> str:
+    """Add task to queue; accepts a task dict or its pre-serialized JSON bytes"""
     redis = get_redis()
     
-    # Use sorted set for priority queue
     queue_name = settings.task_queue_name
-    score = -priority  # Negative for descending order
+    score = queue_score(priority)
     
-    task_json = str(task_data)
-    task_id = await redis.lpush(queue_name, task_json)
+    task_json = task_data if isinstance(task_data, bytes) else orjson.dumps(task_data)
+    await redis.zadd(queue_name, {task_json: score})
     
-    logger.debug(f"Enqueued task {task_id} with priority {priority}")
-    return str(task_id)
+    logger.debug(f"Enqueued task with priority {priority}")
+    return str(score)
 
 
 async def dequeue_task(timeout: int = 30) -> Optional[Dict[str, Any]]:
-    """Get task from queue"""
+    """Get highest-priority task from queue"""
     redis = get_redis()
     
     queue_name = settings.task_queue_name
     
-    # Use BRPOP for blocking pop with timeout
-    result = await redis.brpop(queue_name, timeout=timeout)
+    # Use BZPOPMAX for blocking pop with timeout
+    result = await redis.bzpopmax(queue_name, timeout=timeout)
     
     if result:
-        _, task_data = result
+        _, task_data, _ = result
         logger.debug(f"Dequeued task: {task_data}")
-        return eval(task_data)  # Convert string back to dict
+        return orjson.loads(task_data)
     
     return None
 
@@ -107,7 +142,7 @@ async def dequeue_task(timeout: int = 30) -> Optional[Dict[str, Any]]:
 async def get_queue_length() -> int:
     """Get current queue length"""
     redis = get_redis()
-    return await redis.llen(settings.task_queue_name)
+    return await redis.zcard(settings.task_queue_name)
 
 
 # Rate Limiting
@@ -172,8 +207,7 @@ async def get_embedding_cache(text_hash: str, model: str) -> Optional[List[float
     cached = await redis.get(key)
     
     if cached:
-        import json
-        return json.loads(cached)
+        return orjson.loads(cached)
     
     return None
 
@@ -183,9 +217,8 @@ async def set_embedding_cache(text_hash: str, model: str, embedding: List[float]
     redis = get_redis()
     
     key = f"embedding:{model}:{text_hash}"
-    import json
     
-    embedding_json = json.dumps(embedding)
+    embedding_json = orjson.dumps(embedding, option=orjson.OPT_SERIALIZE_NUMPY)
     
     if ttl:
         return await redis.setex(key, ttl, embedding_json)
@@ -193,6 +226,131 @@ async def set_embedding_cache(text_hash: str, model: str, embedding: List[float]
         return await redis.set(key, embedding_json)
 
 
+# Record Storage (tool calls, skill invocations)
+RECORD_TTL = 86400  # 24 hours
+
+
+def pack_record(record: Dict[str, Any]) -> bytes:
+    """Serialize a record for internal storage"""
+    return msgpack.packb(record, use_bin_type=True, default=str)
+
+
+def unpack_record(data: bytes) -> Dict[str, Any]:
+    """Deserialize a stored record"""
+    return msgpack.unpackb(data, raw=False)
+
+
+def _field_index_key(namespace: str, field: str, value: Any) -> str:
+    """Sorted set of record IDs whose field has value, scored by last save time"""
+    return f"{namespace}:idx:{field}:{value}"
+
+
+async def next_record_id(namespace: str) -> int:
+    """Allocate the next sequential ID for a record namespace"""
+    redis = get_redis()
+    return await redis.incr(f"{namespace}:seq")
+
+
+async def save_record(
+    namespace: str,
+    record_id: str,
+    record: Dict[str, Any],
+    index_fields: Tuple[str, ...] = (),
+    previous: Optional[Dict[str, Any]] = None,
+    ttl: int = RECORD_TTL
+) -> None:
+    """
+    Store a record and maintain its secondary indexes.
+    
+    Records are msgpack-encoded under ``{namespace}:{record_id}`` and ordered by creation
+    time in the ``{namespace}:index`` sorted set. Each field in ``index_fields``
+    gets a ``{namespace}:idx:{field}:{value}`` sorted set scored by save time,
+    trimmed like the main index; pass the previously stored values in
+    ``previous`` so moved records leave their old index sets.
+    """
+    redis = get_redis()
+    now = time.time()
+    index_key = f"{namespace}:index"
+    
+    # Payload goes through the binary client; indexes stay on the text client
+    await get_redis_binary().set(f"{namespace}:{record_id}", pack_record(record), ex=ttl)
+    
+    pipe = redis.pipeline(transaction=True)
+    pipe.zadd(index_key, {record_id: now}, nx=True)
+    pipe.zremrangebyscore(index_key, 0, now - ttl)
+    pipe.expire(index_key, ttl)
+    
+    for field in index_fields:
+        value = record.get(field)
+        old_value = (previous or {}).get(field)
+        if old_value is not None and old_value != value:
+            pipe.zrem(_field_index_key(namespace, field, old_value), record_id)
+        if value is not None:
+            # Score is the last save, when the record's TTL was refreshed, so
+            # entries older than ttl belong to expired records
+            field_key = _field_index_key(namespace, field, value)
+            pipe.zadd(field_key, {record_id: now})
+            pipe.zremrangebyscore(field_key, 0, now - ttl)
+            pipe.expire(field_key, ttl)
+    
+    await pipe.execute()
+
+
+async def load_record(namespace: str, record_id: str) -> Optional[Dict[str, Any]]:
+    """Load a single record"""
+    data = await get_redis_binary().get(f"{namespace}:{record_id}")
+    return unpack_record(data) if data else None
+
+
+async def list_records(
+    namespace: str,
+    filters: Optional[Dict[str, Optional[str]]] = None,
+    limit: int = 100,
+    offset: int = 0
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    List records in creation order, filtered by indexed field values.
+    
+    Returns:
+        Tuple of (page of records, total matching records)
+    """
+    redis = get_redis()
+    index_key = f"{namespace}:index"
+    
+    filter_keys = [
+        _field_index_key(namespace, field, value)
+        for field, value in (filters or {}).items()
+        if value
+    ]
+    
+    if filter_keys:
+        # Intersect the ordered index with the filter sets; they carry weight 0
+        # so the creation timestamp survives as the score
+        source_key = f"{namespace}:query:{uuid.uuid4().hex}"
+        weights = {index_key: 1, **{key: 0 for key in filter_keys}}
+        
+        pipe = redis.pipeline(transaction=True)
+        pipe.zinterstore(source_key, weights)
+        pipe.zrange(source_key, offset, offset + limit - 1)
+        pipe.delete(source_key)
+        total, record_ids, _ = await pipe.execute()
+    else:
+        pipe = redis.pipeline(transaction=False)
+        pipe.zcard(index_key)
+        pipe.zrange(index_key, offset, offset + limit - 1)
+        total, record_ids = await pipe.execute()
+    
+    if not record_ids:
+        return [], total
+    
+    values = await get_redis_binary().mget(
+        [f"{namespace}:{record_id}" for record_id in record_ids]
+    )
+    records = [unpack_record(value) for value in values if value]
+    
+    return records, total
+
+
 # Token Bucket (for rate limiting)
 async def consume_tokens(bucket_name: str, tokens: int = 1, capacity: int = 100, refill_rate: float = 1.0) -> bool:
     """Consume tokens from bucket (token bucket algorithm)"""
@@ -262,8 +420,9 @@ async def set_task_status(task_id: str, status: str, data: Dict[str, Any] = None
         "data": data or {}
     }
     
-    import json
-    return await redis.setex(key, 86400, json.dumps(status_data))  # 24h TTL
+    # Results may carry numpy embeddings
+    payload = orjson.dumps(status_data, option=orjson.OPT_SERIALIZE_NUMPY)
+    return await redis.setex(key, 86400, payload)  # 24h TTL
 
 
 async def get_task_status(task_id: str) -> Optional[Dict[str, Any]]:
@@ -274,12 +433,62 @@ async def get_task_status(task_id: str) -> Optional[Dict[str, Any]]:
     status_data = await redis.get(key)
     
     if status_data:
-        import json
-        return json.loads(status_data)
+        return orjson.loads(status_data)
     
     return None
 
 
+async def get_task_statuses(task_ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+    """Get statuses for several tasks in one MGET; None where missing"""
+    if not task_ids:
+        return []
+    
+    redis = get_redis()
+    
+    raw = await redis.mget([f"task:{task_id}:status" for task_id in task_ids])
+    return [orjson.loads(status_data) if status_data else None for status_data in raw]
+
+
+# Idempotency Keys
+async def acquire_idempotency_key(
+    operation_type: str,
+    idempotency_key: str,
+    payload_hash: str,
+    ttl: int
+) -> Tuple[bool, Optional[str], Optional[Any]]:
+    """
+    Claim an idempotency key with SET NX EX in one round-trip.
+    
+    Returns:
+        Tuple of (acquired, stored payload hash, stored result or None)
+    """
+    redis = get_redis()
+    key = f"idempotency:{operation_type}:{idempotency_key}"
+    
+    pipe = redis.pipeline(transaction=False)
+    pipe.set(key, payload_hash, nx=True, ex=ttl)
+    pipe.get(key)
+    pipe.get(f"{key}:result")
+    acquired, stored_hash, result = await pipe.execute()
+    
+    return bool(acquired), stored_hash, orjson.loads(result) if result else None
+
+
+async def set_idempotency_result(
+    operation_type: str,
+    idempotency_key: str,
+    result: Dict[str, Any],
+    ttl: int
+) -> bool:
+    """Store the result of a claimed idempotency key"""
+    redis = get_redis()
+    return await redis.set(
+        f"idempotency:{operation_type}:{idempotency_key}:result",
+        orjson.dumps(result),
+        ex=ttl
+    )
+
+
 # Health Check
 async def redis_health_check() -> Dict[str, Any]:
     """Check Redis health"""
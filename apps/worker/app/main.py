@@ -4,6 +4,7 @@ bl1nk-agent-builder FastAPI Worker
 Main application entry point for the core API service
 """
 
+import asyncio
 import logging
 import sys
 import signal
@@ -18,25 +19,33 @@ from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on every platform (e.g. Windows)
+    uvloop = None
+
 # Import configuration
 from app.config.settings import settings
 from app.database.connection import init_db, close_db
 from app.database.redis import init_redis, close_redis
 
 # Import route modules
-from app.routes import webhook_poe, webhook_manus, webhook_slack, webhook_github
+from app.routes import webhook_poe, webhook_factory
 from app.routes import tasks, skills, mcp, health, admin
-from app.routes.metrics import metrics_router
+from app.routes.metrics import router as metrics_router
 
 # Import middleware
 from app.middleware.cors import setup_cors
 from app.middleware.auth import setup_auth
 from app.middleware.tracing import setup_tracing
+from app.utils.tracing import use_json_logging
 
 # Import services
 from app.services.task_orchestrator import TaskOrchestrator
-from app.services.provider_manager import ProviderManager
+from app.services.llm_client import ProviderManager
 from app.services.vector_store import VectorStore
+from app.services.billing import BillingService
+from app.services.processor import TaskProcessor
 
 # Setup logging
 logging.basicConfig(
@@ -47,6 +56,8 @@ logging.basicConfig(
         logging.FileHandler("logs/app.log") if settings.log_file else logging.NullHandler()
     ]
 )
+if settings.log_format == "json":
+    use_json_logging()
 logger = logging.getLogger(__name__)
 
 # Initialize rate limiter
@@ -56,6 +67,8 @@ limiter = Limiter(key_func=get_remote_address)
 task_orchestrator: TaskOrchestrator = None
 provider_manager: ProviderManager = None
 vector_store: VectorStore = None
+billing_service: BillingService = None
+task_processor: TaskProcessor = None
 
 
 @asynccontextmanager
@@ -75,18 +88,26 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
         logger.info("Initializing Redis connection...")
         await init_redis()
         
+        # Task processor, provider HTTP pool and DB/Redis clients all share this loop
+        logger.info(f"Event loop: {type(asyncio.get_running_loop()).__module__}")
+        
         # Initialize services
-        global task_orchestrator, provider_manager, vector_store
+        global task_orchestrator, provider_manager, vector_store, billing_service, task_processor
         
         logger.info("Initializing services...")
         provider_manager = ProviderManager()
         vector_store = VectorStore()
         task_orchestrator = TaskOrchestrator(provider_manager, vector_store)
+        billing_service = BillingService()
+        await billing_service.start()
+        task_processor = TaskProcessor(task_orchestrator)
+        await task_processor.start()
         
         # Store services in app state
         app.state.task_orchestrator = task_orchestrator
         app.state.provider_manager = provider_manager
         app.state.vector_store = vector_store
+        app.state.billing_service = billing_service
         
         logger.info("Services initialized successfully")
         logger.info("Application startup completed")
@@ -99,9 +120,30 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     finally:
         logger.info("Shutting down application...")
         
-        # Cleanup services
+        # Cleanup services; each in its own try so one failure doesn't skip the rest
+        if task_processor:
+            try:
+                await task_processor.stop()
+            except Exception as e:
+                logger.error(f"Failed to stop task processor: {e}")
+        
         if task_orchestrator:
-            await task_orchestrator.cleanup()
+            try:
+                await task_orchestrator.shutdown()
+            except Exception as e:
+                logger.error(f"Failed to shut down task orchestrator: {e}")
+        
+        if billing_service:
+            try:
+                await billing_service.stop()
+            except Exception as e:
+                logger.error(f"Failed to stop billing service: {e}")
+        
+        if vector_store:
+            try:
+                vector_store.close()
+            except Exception as e:
+                logger.error(f"Failed to close vector store: {e}")
         
         # Close Redis connection
         await close_redis()
@@ -197,23 +239,12 @@ app.include_router(
     tags=["Webhooks"]
 )
 
-app.include_router(
-    webhook_manus.router,
-    prefix="/webhook",
-    tags=["Webhooks"]
-)
-
-app.include_router(
-    webhook_slack.router,
-    prefix="/webhook",
-    tags=["Webhooks"]
-)
-
-app.include_router(
-    webhook_github.router,
-    prefix="/webhook",
-    tags=["Webhooks"]
-)
+for webhook_source in webhook_factory.WEBHOOK_SOURCES:
+    app.include_router(
+        webhook_factory.make_router(webhook_source),
+        prefix="/webhook",
+        tags=["Webhooks"]
+    )
 
 # Core API routes
 app.include_router(
@@ -331,6 +362,7 @@ if __name__ == "__main__":
         "port": settings.port,
         "reload": settings.reload,
         "workers": settings.workers if not settings.reload else 1,
+        "loop": "uvloop" if uvloop and settings.use_uvloop else "asyncio",  # libuv loop for the I/O-bound DB/Redis paths
         "log_config": None,  # Use our custom logging
         "access_log": True,
         "error_log": True
@@ -217,13 +217,16 @@ async def admin_health_check(current_user: str = Depends(get_current_admin_user)
         
         import psutil
         
+        now = datetime.now()
+        now_iso = now.isoformat()
+        
         health_data = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now_iso,
             "system": {
                 "cpu_percent": psutil.cpu_percent(interval=1),
                 "memory_percent": psutil.virtual_memory().percent,
                 "disk_percent": psutil.disk_usage('/').percent,
-                "uptime_hours": (datetime.now() - datetime.fromtimestamp(psutil.boot_time())).total_seconds() / 3600
+                "uptime_hours": (now - datetime.fromtimestamp(psutil.boot_time())).total_seconds() / 3600
             },
             "database": {
                 "status": "healthy",  # Would check actual DB connection
@@ -236,9 +239,9 @@ async def admin_health_check(current_user: str = Depends(get_current_admin_user)
                 "used_memory_mb": 12.5
             },
             "providers": {
-                "openrouter": {"status": "healthy", "last_check": datetime.now().isoformat()},
-                "cloudflare": {"status": "healthy", "last_check": datetime.now().isoformat()},
-                "bedrock": {"status": "healthy", "last_check": datetime.now().isoformat()}
+                "openrouter": {"status": "healthy", "last_check": now_iso},
+                "cloudflare": {"status": "healthy", "last_check": now_iso},
+                "bedrock": {"status": "healthy", "last_check": now_iso}
             }
         }
         
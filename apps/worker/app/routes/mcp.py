@@ -5,10 +5,13 @@ Provides REST API for MCP tool discovery and invocation
 
 import logging
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Callable, Awaitable, Tuple
 
-from fastapi import APIRouter, HTTPException, status
-from pydantic import BaseModel, Field
+from fastapi import APIRouter, HTTPException, Request, status
+from pydantic import BaseModel, Field, TypeAdapter
+
+from app.database.redis import next_record_id, save_record, load_record, list_records
+from app.utils.http_cache import compute_etag, cached_json_response
 
 logger = logging.getLogger(__name__)
 
@@ -39,11 +42,18 @@ class ToolCallResponse(BaseModel):
     error: Optional[str] = Field(None, description="Error message if execution failed")
 
 
+# Serializers built once so responses go straight through pydantic-core
+_TOOL_LIST_ADAPTER = TypeAdapter(ToolListResponse)
+
+
 router = APIRouter()
 
 # In-memory MCP tools registry (in production, this would be in database)
 mcp_tools_registry = {}
-tool_calls_db = {}
+
+# Tool call records live in Redis so every worker sees the same history
+TOOL_CALL_NAMESPACE = "mcp:call"
+TOOL_CALL_INDEX_FIELDS = ("tool_id", "status")
 
 # Predefined MCP tools
 DEFAULT_TOOLS = [
@@ -92,15 +102,38 @@ DEFAULT_TOOLS = [
 for tool in DEFAULT_TOOLS:
     mcp_tools_registry[tool["id"]] = tool
 
-@router.get("/mcp/tools/list", response_model=ToolListResponse)
-async def list_mcp_tools():
+# Serialized tool list and its ETag; rebuilt lazily after registry changes
+_tool_list_cache: Optional[Tuple[bytes, str]] = None
+
+
+def _invalidate_tool_list_cache() -> None:
+    """Drop the cached tool list after the registry changes"""
+    global _tool_list_cache
+    _tool_list_cache = None
+
+
+def _get_tool_list_payload() -> Tuple[bytes, str]:
+    """Get the serialized tool list and its ETag"""
+    global _tool_list_cache
+    
+    if _tool_list_cache is None:
+        # Registry entries were validated on registration, so skip revalidation
+        tools = []
+        for tool_id, tool_data in mcp_tools_registry.items():
+            tools.append(ToolMetadata.model_construct(**tool_data))
+        
+        payload = _TOOL_LIST_ADAPTER.dump_json(ToolListResponse.model_construct(tools=tools))
+        _tool_list_cache = (payload, compute_etag(payload))
+    
+    return _tool_list_cache
+
+@router.get("/mcp/tools/list", responses={200: {"model": ToolListResponse}})
+async def list_mcp_tools(request: Request):
     """List all available MCP tools"""
     
-    tools = []
-    for tool_id, tool_data in mcp_tools_registry.items():
-        tools.append(ToolMetadata(**tool_data))
+    payload, etag = _get_tool_list_payload()
     
-    return ToolListResponse(tools=tools)
+    return cached_json_response(request, payload, etag)
 
 
 @router.get("/mcp/tools/{tool_id}")
@@ -134,7 +167,7 @@ async def call_mcp_tool(request: ToolCallRequest):
     tool_data = mcp_tools_registry[request.tool_id]
     
     # Generate call ID
-    call_id = f"call_{len(tool_calls_db) + 1}"
+    call_id = f"call_{await next_record_id(TOOL_CALL_NAMESPACE)}"
     
     # Store call record
     call_data = {
@@ -146,112 +179,144 @@ async def call_mcp_tool(request: ToolCallRequest):
         "created_at": datetime.now().isoformat()
     }
     
-    tool_calls_db[call_id] = call_data
-    
     # Simulate tool execution
     try:
         # Mark as processing
         call_data["status"] = "processing"
+        await save_record(TOOL_CALL_NAMESPACE, call_id, call_data, TOOL_CALL_INDEX_FIELDS)
         
         # Execute tool based on type
         result = await execute_tool(request.tool_id, request.inputs)
         
         call_data["status"] = "completed"
         call_data["result"] = result
+        await save_record(
+            TOOL_CALL_NAMESPACE, call_id, call_data, TOOL_CALL_INDEX_FIELDS,
+            previous={"status": "processing"}
+        )
         
         logger.info(f"MCP tool call completed: {call_id}")
         
         return ToolCallResponse(result=result)
         
     except Exception as e:
+        previous_status = call_data["status"]
         call_data["status"] = "failed"
         call_data["error"] = str(e)
+        await save_record(
+            TOOL_CALL_NAMESPACE, call_id, call_data, TOOL_CALL_INDEX_FIELDS,
+            previous={"status": previous_status}
+        )
         
         logger.error(f"MCP tool call failed: {call_id} - {e}")
         
         return ToolCallResponse(error=str(e))
 
 
-async def execute_tool(tool_id: str, inputs: Dict[str, Any]) -> Dict[str, Any]:
-    """Execute an MCP tool (simulated implementation)"""
+SEARCH_RESULT_URL_TPL = "https://example.com/result%d"
+
+
+async def _exec_search(inputs: Dict[str, Any]) -> Dict[str, Any]:
+    """Simulate web search"""
     
-    if tool_id == "search":
-        # Simulate web search
-        query = inputs.get("query", "")
-        max_results = inputs.get("max_results", 10)
-        
-        return {
-            "query": query,
-            "results": [
-                {
-                    "title": f"Result {i+1} for '{query}'",
-                    "url": f"https://example.com/result{i+1}",
-                    "snippet": f"This is a simulated search result for '{query}'"
-                }
-                for i in range(min(max_results, 5))
-            ],
-            "total_results": max_results
-        }
+    query = inputs.get("query", "")
+    max_results = inputs.get("max_results", 10)
     
-    elif tool_id == "calculator":
-        # Simulate calculator
-        expression = inputs.get("expression", "")
-        precision = inputs.get("precision", 2)
-        
-        try:
-            # Simple evaluation (in production, use a proper math parser)
-            result = eval(expression)  # Note: eval is dangerous, use safe evaluation in production
-            return {
-                "expression": expression,
-                "result": round(result, precision),
-                "precision": precision
+    # Per-query strings are built once; only the result number varies per row
+    title_tpl = "Result %d for '" + str(query).replace("%", "%%") + "'"
+    snippet = f"This is a simulated search result for '{query}'"
+    
+    return {
+        "query": query,
+        "results": [
+            {
+                "title": title_tpl % i,
+                "url": SEARCH_RESULT_URL_TPL % i,
+                "snippet": snippet
             }
-        except Exception as e:
-            raise ValueError(f"Invalid expression: {e}")
+            for i in range(1, min(max_results, 5) + 1)
+        ],
+        "total_results": max_results
+    }
+
+
+async def _exec_calculator(inputs: Dict[str, Any]) -> Dict[str, Any]:
+    """Simulate calculator"""
     
-    elif tool_id == "weather":
-        # Simulate weather lookup
-        location = inputs.get("location", "")
-        units = inputs.get("units", "celsius")
-        
-        # Simulate weather data
-        temp_celsius = 22.5
-        if units == "fahrenheit":
-            temp = round(temp_celsius * 9/5 + 32, 1)
-            temp_unit = "°F"
-        else:
-            temp = temp_celsius
-            temp_unit = "°C"
-        
+    expression = inputs.get("expression", "")
+    precision = inputs.get("precision", 2)
+    
+    try:
+        # Simple evaluation (in production, use a proper math parser)
+        result = eval(expression)  # Note: eval is dangerous, use safe evaluation in production
         return {
-            "location": location,
-            "temperature": temp,
-            "unit": temp_unit,
-            "condition": "Partly Cloudy",
-            "humidity": 65,
-            "wind_speed": 10,
-            "forecast": [
-                {"day": "Today", "high": temp + 5, "low": temp - 3, "condition": "Sunny"},
-                {"day": "Tomorrow", "high": temp + 2, "low": temp - 5, "condition": "Cloudy"}
-            ]
+            "expression": expression,
+            "result": round(result, precision),
+            "precision": precision
         }
+    except Exception as e:
+        raise ValueError(f"Invalid expression: {e}")
+
+
+async def _exec_weather(inputs: Dict[str, Any]) -> Dict[str, Any]:
+    """Simulate weather lookup"""
+    
+    location = inputs.get("location", "")
+    units = inputs.get("units", "celsius")
     
+    # Simulate weather data
+    temp_celsius = 22.5
+    if units == "fahrenheit":
+        temp = round(temp_celsius * 9/5 + 32, 1)
+        temp_unit = "°F"
     else:
+        temp = temp_celsius
+        temp_unit = "°C"
+    
+    return {
+        "location": location,
+        "temperature": temp,
+        "unit": temp_unit,
+        "condition": "Partly Cloudy",
+        "humidity": 65,
+        "wind_speed": 10,
+        "forecast": [
+            {"day": "Today", "high": temp + 5, "low": temp - 3, "condition": "Sunny"},
+            {"day": "Tomorrow", "high": temp + 2, "low": temp - 5, "condition": "Cloudy"}
+        ]
+    }
+
+
+# Tool handlers keyed by tool ID; add an entry here to back a new tool
+_TOOL_HANDLERS: Dict[str, Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]] = {
+    "search": _exec_search,
+    "calculator": _exec_calculator,
+    "weather": _exec_weather,
+}
+
+
+async def execute_tool(tool_id: str, inputs: Dict[str, Any]) -> Dict[str, Any]:
+    """Execute an MCP tool (simulated implementation)"""
+    
+    handler = _TOOL_HANDLERS.get(tool_id)
+    if handler is None:
         raise ValueError(f"Unknown tool: {tool_id}")
+    
+    return await handler(inputs)
 
 
 @router.get("/mcp/tools/calls/{call_id}")
 async def get_tool_call(call_id: str):
     """Get tool call status and result"""
     
-    if call_id not in tool_calls_db:
+    call_data = await load_record(TOOL_CALL_NAMESPACE, call_id)
+    
+    if call_data is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Tool call {call_id} not found"
         )
     
-    call_data = tool_calls_db[call_id]
-    
     return {
         "call_id": call_id,
         "tool_id": call_data["tool_id"],
@@ -271,23 +336,17 @@ async def list_tool_calls(
 ):
     """List tool calls with optional filtering"""
     
-    filtered_calls = []
-    
-    for call_id, call_data in tool_calls_db.items():
-        # Apply filters
-        if tool_id and call_data["tool_id"] != tool_id:
-            continue
-        if status and call_data["status"] != status:
-            continue
-        
-        filtered_calls.append(call_data)
-    
-    # Apply pagination
-    paginated_calls = filtered_calls[offset:offset + limit]
+    # Filtering and pagination are resolved against the Redis indexes
+    paginated_calls, total = await list_records(
+        TOOL_CALL_NAMESPACE,
+        filters={"tool_id": tool_id, "status": status},
+        limit=limit,
+        offset=offset
+    )
     
     return {
         "calls": paginated_calls,
-        "total": len(filtered_calls),
+        "total": total,
         "limit": limit,
         "offset": offset
     }
@@ -304,6 +363,7 @@ async def register_mcp_tool(tool: ToolMetadata):
         )
     
     mcp_tools_registry[tool.id] = tool.dict()
+    _invalidate_tool_list_cache()
     
     logger.info(f"MCP tool registered: {tool.id}")
     
@@ -321,6 +381,7 @@ async def unregister_mcp_tool(tool_id: str):
         )
     
     del mcp_tools_registry[tool_id]
+    _invalidate_tool_list_cache()
     
     logger.info(f"MCP tool unregistered: {tool_id}")
     
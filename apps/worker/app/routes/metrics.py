@@ -9,9 +9,16 @@ import time
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
 
+import orjson
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
 from fastapi import FastAPI, HTTPException, status, Query
-from fastapi.responses import Response, PlainTextResponse
-from pydantic import BaseModel
+from fastapi.responses import Response
+from pydantic import BaseModel, TypeAdapter
 
 from app.database.connection import fetch_val, fetch_many
 from app.database.redis import get_redis
@@ -19,6 +26,43 @@ from app.config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Prometheus text exposition format
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# orjson options for metric payloads (numpy scalars may come from system probes)
+METRICS_JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY
+
+# Returned when psutil is unavailable (shared, never mutated)
+_EMPTY_SYS_METRICS: Dict[str, Any] = {
+    "cpu": {"percent": 0.0, "count": 1},
+    "memory": {"percent": 0.0, "used_gb": 0.0, "total_gb": 0.0},
+    "disk": {"percent": 0.0, "used_gb": 0.0, "total_gb": 0.0},
+    "network": {"bytes_sent": 0, "bytes_recv": 0, "packets_sent": 0, "packets_recv": 0}
+}
+
+# Metric queries are kept as constant SQL text so asyncpg's per-connection
+# statement cache reuses the prepared statements across requests
+TASK_COUNT_SQL = "SELECT COUNT(*) FROM tasks"
+TASK_STATUS_COUNT_SQL = "SELECT COUNT(*) FROM tasks WHERE status = $1"
+TASK_AVG_PROCESSING_SQL = """
+    SELECT AVG(EXTRACT(EPOCH FROM (updated_at - created_at))) 
+    FROM tasks 
+    WHERE status = 'completed' 
+    ORDER BY updated_at DESC 
+    LIMIT 100
+"""
+PROVIDER_USAGE_SQL = """
+    SELECT 
+        provider,
+        COUNT(*) as requests_total,
+        SUM(CASE WHEN cost_usd > 0 THEN 1 ELSE 0 END) as errors_total,
+        AVG(cost_usd) as avg_cost,
+        SUM(cost_usd) as total_cost
+    FROM usage_logs 
+    WHERE created_at >= NOW() - INTERVAL '24 hours'
+    GROUP BY provider
+"""
+
 
 # Prometheus metric counters and gauges
 class MetricsCollector:
@@ -64,6 +108,10 @@ class MetricsSummary(BaseModel):
     redis_status: str
 
 
+# Serializer built once so the summary goes straight through pydantic-core
+_SUMMARY_ADAPTER = TypeAdapter(MetricsSummary)
+
+
 class ProviderMetrics(BaseModel):
     provider: str
     requests_total: int
@@ -90,7 +138,7 @@ async def get_basic_metrics() -> MetricsSummary:
         
         # Get queue length from Redis
         redis = get_redis()
-        queue_length = await redis.llen(settings.task_queue_name)
+        queue_length = await redis.zcard(settings.task_queue_name)
         
         # Calculate error rate
         error_rate = 0.0
@@ -137,20 +185,14 @@ async def get_task_metrics() -> TaskMetrics:
     
     try:
         # Get task counts from database
-        total_tasks = await fetch_val("SELECT COUNT(*) FROM tasks")
-        pending_tasks = await fetch_val("SELECT COUNT(*) FROM tasks WHERE status = 'pending'")
-        processing_tasks = await fetch_val("SELECT COUNT(*) FROM tasks WHERE status = 'processing'")
-        completed_tasks = await fetch_val("SELECT COUNT(*) FROM tasks WHERE status = 'completed'")
-        failed_tasks = await fetch_val("SELECT COUNT(*) FROM tasks WHERE status = 'failed'")
+        total_tasks = await fetch_val(TASK_COUNT_SQL)
+        pending_tasks = await fetch_val(TASK_STATUS_COUNT_SQL, "pending")
+        processing_tasks = await fetch_val(TASK_STATUS_COUNT_SQL, "processing")
+        completed_tasks = await fetch_val(TASK_STATUS_COUNT_SQL, "completed")
+        failed_tasks = await fetch_val(TASK_STATUS_COUNT_SQL, "failed")
         
         # Get average processing time (last 100 completed tasks)
-        avg_processing_time = await fetch_val("""
-            SELECT AVG(EXTRACT(EPOCH FROM (updated_at - created_at))) 
-            FROM tasks 
-            WHERE status = 'completed' 
-            ORDER BY updated_at DESC 
-            LIMIT 100
-        """)
+        avg_processing_time = await fetch_val(TASK_AVG_PROCESSING_SQL)
         
         return TaskMetrics(
             total_tasks=total_tasks or 0,
@@ -174,17 +216,7 @@ async def get_provider_metrics() -> list[ProviderMetrics]:
     
     try:
         # Get provider usage from usage_logs table
-        usage_data = await fetch_many("""
-            SELECT 
-                provider,
-                COUNT(*) as requests_total,
-                SUM(CASE WHEN cost_usd > 0 THEN 1 ELSE 0 END) as errors_total,
-                AVG(cost_usd) as avg_cost,
-                SUM(cost_usd) as total_cost
-            FROM usage_logs 
-            WHERE created_at >= NOW() - INTERVAL '24 hours'
-            GROUP BY provider
-        """)
+        usage_data = await fetch_many(PROVIDER_USAGE_SQL)
         
         metrics = []
         for row in usage_data:
@@ -209,9 +241,11 @@ async def get_provider_metrics() -> list[ProviderMetrics]:
 async def get_system_metrics() -> Dict[str, Any]:
     """Get system-level metrics"""
     
+    if psutil is None:
+        logger.warning("psutil not installed, skipping system metrics")
+        return _EMPTY_SYS_METRICS
+    
     try:
-        import psutil
-        
         # CPU metrics
         cpu_percent = psutil.cpu_percent(interval=1)
         cpu_count = psutil.cpu_count()
@@ -255,14 +289,6 @@ async def get_system_metrics() -> Dict[str, Any]:
             }
         }
         
-    except ImportError:
-        logger.warning("psutil not installed, skipping system metrics")
-        return {
-            "cpu": {"percent": 0.0, "count": 1},
-            "memory": {"percent": 0.0, "used_gb": 0.0, "total_gb": 0.0},
-            "disk": {"percent": 0.0, "used_gb": 0.0, "total_gb": 0.0},
-            "network": {"bytes_sent": 0, "bytes_recv": 0, "packets_sent": 0, "packets_recv": 0}
-        }
     except Exception as e:
         logger.error(f"Failed to collect system metrics: {e}")
         return {
@@ -274,8 +300,8 @@ async def get_system_metrics() -> Dict[str, Any]:
         }
 
 
-def generate_prometheus_metrics() -> str:
-    """Generate Prometheus-formatted metrics"""
+def generate_prometheus_metrics() -> bytes:
+    """Generate Prometheus-formatted metrics, encoded and ready to serve"""
     
     uptime_seconds = metrics_collector.get_uptime_seconds()
     error_rate = 0.0
@@ -310,7 +336,15 @@ def generate_prometheus_metrics() -> str:
     timestamp = int(time.time())
     metrics.append(f"# Generated at {datetime.fromtimestamp(timestamp).isoformat()}")
     
-    return "\n".join(metrics)
+    return "\n".join(metrics).encode("utf-8")
+
+
+def metrics_json_response(payload: Any) -> Response:
+    """Serialize a metrics payload with orjson"""
+    return Response(
+        orjson.dumps(payload, option=METRICS_JSON_OPTIONS, default=str),
+        media_type="application/json"
+    )
 
 
 # FastAPI routes
@@ -324,7 +358,8 @@ async def prometheus_metrics():
     """Prometheus metrics endpoint"""
     try:
         metrics_output = generate_prometheus_metrics()
-        return PlainTextResponse(metrics_output, media_type="text/plain")
+        # Body is already bytes, so Starlette only has to set Content-Length
+        return Response(content=metrics_output, media_type=PROMETHEUS_CONTENT_TYPE)
     except Exception as e:
         logger.error(f"Failed to generate Prometheus metrics: {e}")
         raise HTTPException(
@@ -333,28 +368,31 @@ async def prometheus_metrics():
         )
 
 
-@router.get("/metrics/summary")
+@router.get("/metrics/summary", responses={200: {"model": MetricsSummary}})
 async def metrics_summary():
     """JSON metrics summary"""
-    return await get_basic_metrics()
+    summary = await get_basic_metrics()
+    return Response(_SUMMARY_ADAPTER.dump_json(summary), media_type="application/json")
 
 
 @router.get("/metrics/tasks")
 async def metrics_tasks():
     """Task-related metrics"""
-    return await get_task_metrics()
+    task_metrics = await get_task_metrics()
+    return metrics_json_response(task_metrics.model_dump())
 
 
 @router.get("/metrics/providers")
 async def metrics_providers():
     """Provider-related metrics"""
-    return await get_provider_metrics()
+    provider_metrics = await get_provider_metrics()
+    return metrics_json_response([m.model_dump() for m in provider_metrics])
 
 
 @router.get("/metrics/system")
 async def metrics_system():
     """System-level metrics"""
-    return await get_system_metrics()
+    return metrics_json_response(await get_system_metrics())
 
 
 @router.get("/metrics/all")
@@ -366,13 +404,13 @@ async def metrics_all():
         provider_metrics = await get_provider_metrics()
         system_metrics = await get_system_metrics()
         
-        return {
-            "basic": basic_metrics.dict(),
-            "tasks": task_metrics.dict(),
-            "providers": [m.dict() for m in provider_metrics],
+        return metrics_json_response({
+            "basic": basic_metrics.model_dump(),
+            "tasks": task_metrics.model_dump(),
+            "providers": [m.model_dump() for m in provider_metrics],
             "system": system_metrics,
-            "timestamp": datetime.now().isoformat()
-        }
+            "timestamp": datetime.now()
+        })
     except Exception as e:
         logger.error(f"Failed to collect all metrics: {e}")
         raise HTTPException(
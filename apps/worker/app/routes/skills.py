@@ -5,10 +5,14 @@ Provides REST API for skill registration and invocation
 
 import logging
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 
-from fastapi import APIRouter, HTTPException, status
-from pydantic import BaseModel, Field
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import Response
+from pydantic import BaseModel, Field, TypeAdapter
+
+from app.database.redis import next_record_id, save_record, load_record, list_records
+from app.utils.http_cache import compute_etag, cached_json_response
 
 logger = logging.getLogger(__name__)
 
@@ -39,11 +43,42 @@ class InvocationResponse(BaseModel):
     result: Optional[Dict[str, Any]] = Field(None, description="Skill result")
 
 
+class SkillSummary(BaseModel):
+    """Skill entry in the skill list"""
+    skill_id: str = Field(..., description="Unique skill identifier")
+    name: str = Field(..., description="Human-readable skill name")
+    description: Optional[str] = Field(None, description="Skill description")
+    registered_at: Optional[datetime] = Field(None, description="Registration time")
+
+
+class SkillListResponse(BaseModel):
+    """Response model for the skill list"""
+    skills: List[SkillSummary] = Field(..., description="Registered skills")
+
+
+# Serializers built once so responses go straight through pydantic-core
+_INV_ADAPTER = TypeAdapter(InvocationResponse)
+_SKILL_LIST_ADAPTER = TypeAdapter(SkillListResponse)
+
+
 router = APIRouter()
 
 # In-memory skill registry (in production, this would be in database)
 skills_registry = {}
-invocations_db = {}
+
+# Invocation records live in Redis so every worker sees the same history
+INVOCATION_NAMESPACE = "skills:invocation"
+INVOCATION_INDEX_FIELDS = ("skill_id", "status")
+
+# Serialized skill list and its ETag; rebuilt lazily after registry changes
+_skill_list_cache: Optional[Tuple[bytes, str]] = None
+
+
+def _invalidate_skill_list_cache() -> None:
+    """Drop the cached skill list after the registry changes"""
+    global _skill_list_cache
+    _skill_list_cache = None
+
 
 @router.post("/skills/register")
 async def register_skill(skill: SkillDefinition):
@@ -56,26 +91,36 @@ async def register_skill(skill: SkillDefinition):
         )
     
     skills_registry[skill.skill_id] = skill.dict()
+    _invalidate_skill_list_cache()
     
     logger.info(f"Skill registered: {skill.skill_id}")
     
     return {"message": f"Skill {skill.skill_id} registered successfully"}
 
 
-@router.get("/skills")
-async def list_skills():
+@router.get("/skills", responses={200: {"model": SkillListResponse}})
+async def list_skills(request: Request):
     """List all registered skills"""
     
-    skills = []
-    for skill_id, skill_data in skills_registry.items():
-        skills.append({
-            "skill_id": skill_id,
-            "name": skill_data["name"],
-            "description": skill_data.get("description"),
-            "registered_at": skill_data.get("registered_at")
-        })
+    global _skill_list_cache
+    
+    if _skill_list_cache is None:
+        # Registry entries were validated on registration, so skip revalidation
+        skills = []
+        for skill_id, skill_data in skills_registry.items():
+            skills.append(SkillSummary.model_construct(
+                skill_id=skill_id,
+                name=skill_data["name"],
+                description=skill_data.get("description"),
+                registered_at=skill_data.get("registered_at")
+            ))
+        
+        payload = _SKILL_LIST_ADAPTER.dump_json(SkillListResponse.model_construct(skills=skills))
+        _skill_list_cache = (payload, compute_etag(payload))
+    
+    payload, etag = _skill_list_cache
     
-    return {"skills": skills}
+    return cached_json_response(request, payload, etag)
 
 
 @router.get("/skills/{skill_id}")
@@ -96,7 +141,7 @@ async def get_skill(skill_id: str):
     }
 
 
-@router.post("/skills/invoke", response_model=InvocationResponse)
+@router.post("/skills/invoke", responses={200: {"model": InvocationResponse}})
 async def invoke_skill(request: SkillInvokeRequest):
     """Invoke a skill"""
     
@@ -107,7 +152,7 @@ async def invoke_skill(request: SkillInvokeRequest):
         )
     
     # Generate invocation ID
-    invocation_id = f"inv_{len(invocations_db) + 1}"
+    invocation_id = f"inv_{await next_record_id(INVOCATION_NAMESPACE)}"
     
     # Store invocation record
     invocation_data = {
@@ -120,8 +165,6 @@ async def invoke_skill(request: SkillInvokeRequest):
         "created_at": datetime.now().isoformat()
     }
     
-    invocations_db[invocation_id] = invocation_data
-    
     # Simulate skill execution
     # In production, this would call the actual skill handler
     try:
@@ -146,25 +189,31 @@ async def invoke_skill(request: SkillInvokeRequest):
         
         logger.error(f"Skill invocation failed: {invocation_id} - {e}")
     
-    return InvocationResponse(
+    await save_record(
+        INVOCATION_NAMESPACE, invocation_id, invocation_data, INVOCATION_INDEX_FIELDS
+    )
+    
+    response = InvocationResponse(
         invocation_id=invocation_id,
         status=invocation_data["status"],
         result=invocation_data.get("result")
     )
+    
+    return Response(_INV_ADAPTER.dump_json(response), media_type="application/json")
 
 
 @router.get("/skills/invocations/{invocation_id}")
 async def get_invocation(invocation_id: str):
     """Get invocation status and result"""
     
-    if invocation_id not in invocations_db:
+    invocation_data = await load_record(INVOCATION_NAMESPACE, invocation_id)
+    
+    if invocation_data is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Invocation {invocation_id} not found"
         )
     
-    invocation_data = invocations_db[invocation_id]
-    
     return {
         "invocation_id": invocation_id,
         "skill_id": invocation_data["skill_id"],
@@ -184,23 +233,17 @@ async def list_invocations(
 ):
     """List skill invocations with optional filtering"""
     
-    filtered_invocations = []
-    
-    for invocation_id, invocation_data in invocations_db.items():
-        # Apply filters
-        if skill_id and invocation_data["skill_id"] != skill_id:
-            continue
-        if status and invocation_data["status"] != status:
-            continue
-        
-        filtered_invocations.append(invocation_data)
-    
-    # Apply pagination
-    paginated_invocations = filtered_invocations[offset:offset + limit]
+    # Filtering and pagination are resolved against the Redis indexes
+    paginated_invocations, total = await list_records(
+        INVOCATION_NAMESPACE,
+        filters={"skill_id": skill_id, "status": status},
+        limit=limit,
+        offset=offset
+    )
     
     return {
         "invocations": paginated_invocations,
-        "total": len(filtered_invocations),
+        "total": total,
         "limit": limit,
         "offset": offset
     }
@@ -217,6 +260,7 @@ async def unregister_skill(skill_id: str):
         )
     
     del skills_registry[skill_id]
+    _invalidate_skill_list_cache()
     
     logger.info(f"Skill unregistered: {skill_id}")
     
@@ -5,12 +5,16 @@ Provides REST API for task creation, status, and streaming
 
 import asyncio
 import logging
+from collections import OrderedDict, defaultdict
 from datetime import datetime
-from typing import Dict, Any, Optional
+from itertools import count
+from typing import Dict, Any, Optional, Set
 
 from fastapi import APIRouter, HTTPException, status, Request, Depends
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
+import orjson
 from pydantic import BaseModel, Field
+from sse_starlette.sse import EventSourceResponse
 
 logger = logging.getLogger(__name__)
 
@@ -34,23 +38,73 @@ class TaskResponse(BaseModel):
     error: Optional[str] = None
 
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 # Placeholder task storage (in production, this would be in database)
-tasks_db = {}
+# Oldest tasks are evicted once MAX_TASKS is exceeded
+MAX_TASKS = 10000
+tasks_db: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+_next_task_id = count(1)
 
-@router.post("/tasks", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
+# Secondary indexes over tasks_db for filtered listing
+status_index: Dict[str, Set[int]] = defaultdict(set)
+type_index: Dict[str, Set[int]] = defaultdict(set)
+
+
+def _index_task(task_data: Dict[str, Any]) -> None:
+    """Add a newly stored task to the secondary indexes"""
+    task_id = task_data["task_id"]
+    status_index[task_data["status"]].add(task_id)
+    type_index[task_data["task_type"]].add(task_id)
+
+
+def _evict_oldest_tasks() -> None:
+    """Drop the oldest tasks until tasks_db is back under MAX_TASKS"""
+    while len(tasks_db) > MAX_TASKS:
+        task_id, task_data = tasks_db.popitem(last=False)
+        status_index[task_data["status"]].discard(task_id)
+        type_index[task_data["task_type"]].discard(task_id)
+
+
+def _sse_frame(event: Dict[str, Any]) -> bytes:
+    """Encode an event as a complete SSE data frame"""
+    return b"data: " + orjson.dumps(event) + b"\n\n"
+
+
+# Prebuilt frames for the fixed status transitions
+_FRAME_PROCESSING = _sse_frame({"type": "meta", "data": {"status": "processing"}})
+_FRAME_COMPLETED = _sse_frame({"type": "meta", "data": {"status": "completed"}})
+_FRAME_FAILED = _sse_frame({"type": "meta", "data": {"status": "failed"}})
+
+
+def _set_task_status(task_data: Dict[str, Any], new_status: str) -> None:
+    """Change a task's status and keep the status index in sync"""
+    task_id = task_data["task_id"]
+    # A stream or cancel may still hold a task that was evicted meanwhile;
+    # re-indexing it would leave an id list_tasks can't resolve
+    if task_id in tasks_db:
+        status_index[task_data["status"]].discard(task_id)
+        status_index[new_status].add(task_id)
+    task_data["status"] = new_status
+
+@router.post(
+    "/tasks",
+    response_class=ORJSONResponse,
+    responses={201: {"model": TaskResponse}},
+    status_code=status.HTTP_201_CREATED
+)
 async def create_task(request: TaskCreateRequest, current_user: str = "demo_user"):
     """Create a new task"""
     
-    task_id = len(tasks_db) + 1
+    task_id = next(_next_task_id)
+    now_iso = datetime.now().isoformat()
     
     task_data = {
         "task_id": task_id,
         "status": "pending",
         "task_type": request.task_type,
-        "created_at": datetime.now().isoformat(),
-        "updated_at": datetime.now().isoformat(),
+        "created_at": now_iso,
+        "updated_at": now_iso,
         "input_data": request.input_data,
         "priority": request.priority,
         "metadata": request.metadata,
@@ -58,18 +112,27 @@ async def create_task(request: TaskCreateRequest, current_user: str = "demo_user
     }
     
     tasks_db[task_id] = task_data
+    _index_task(task_data)
+    _evict_oldest_tasks()
     
     logger.info(f"Task created: {task_id}")
     
-    return TaskResponse(
-        task_id=task_id,
-        status="pending",
-        task_type=request.task_type,
-        created_at=task_data["created_at"]
+    # Built in TaskResponse shape; returned directly to skip response_model revalidation
+    return ORJSONResponse(
+        {
+            "task_id": task_id,
+            "status": "pending",
+            "task_type": request.task_type,
+            "created_at": task_data["created_at"],
+            "updated_at": None,
+            "result": None,
+            "error": None
+        },
+        status_code=status.HTTP_201_CREATED
     )
 
 
-@router.get("/tasks/{task_id}", response_model=TaskResponse)
+@router.get("/tasks/{task_id}", response_class=ORJSONResponse, responses={200: {"model": TaskResponse}})
 async def get_task(task_id: int):
     """Get task status and details"""
     
@@ -81,15 +144,15 @@ async def get_task(task_id: int):
     
     task_data = tasks_db[task_id]
     
-    return TaskResponse(
-        task_id=task_id,
-        status=task_data["status"],
-        task_type=task_data.get("task_type"),
-        created_at=task_data["created_at"],
-        updated_at=task_data["updated_at"],
-        result=task_data.get("result"),
-        error=task_data.get("error")
-    )
+    return ORJSONResponse({
+        "task_id": task_id,
+        "status": task_data["status"],
+        "task_type": task_data.get("task_type"),
+        "created_at": task_data["created_at"],
+        "updated_at": task_data["updated_at"],
+        "result": task_data.get("result"),
+        "error": task_data.get("error")
+    })
 
 
 @router.get("/tasks/{task_id}/stream")
@@ -106,45 +169,40 @@ async def stream_task_output(task_id: int):
         task_data = tasks_db[task_id]
         
         # Send initial meta event
-        yield f"data: {{\"type\": \"meta\", \"data\": {{\"task_id\": {task_id}, \"status\": \"{task_data['status']}\"}}}}\n\n"
+        yield _sse_frame({"type": "meta", "data": {"task_id": task_id, "status": task_data["status"]}})
         
         # Simulate streaming output
         if task_data["status"] == "pending":
             # Mark as processing
-            task_data["status"] = "processing"
-            yield f"data: {{\"type\": \"meta\", \"data\": {{\"status\": \"processing\"}}}}\n\n"
+            _set_task_status(task_data, "processing")
+            yield _FRAME_PROCESSING
             
             # Send some text events
             messages = ["Hello", ", how can", " I help", " you today?"]
             for message in messages:
-                yield f"data: {{\"type\": \"text\", \"data\": \"{message}\"}}\n\n"
+                yield _sse_frame({"type": "text", "data": message})
                 await asyncio.sleep(0.5)
             
             # Mark as completed
-            task_data["status"] = "completed"
+            _set_task_status(task_data, "completed")
             task_data["result"] = {"response": "Hello, how can I help you today?"}
-            yield f"data: {{\"type\": \"meta\", \"data\": {{\"status\": \"completed\"}}}}\n\n"
-            yield f"data: {{\"type\": \"done\", \"data\": {{\"result\": {task_data['result']}}}}}\n\n"
+            yield _FRAME_COMPLETED
+            yield _sse_frame({"type": "done", "data": {"result": task_data["result"]}})
         
         elif task_data["status"] == "completed":
             # Send completion event
-            yield f"data: {{\"type\": \"meta\", \"data\": {{\"status\": \"completed\"}}}}\n\n"
-            yield f"data: {{\"type\": \"done\", \"data\": {{\"result\": {task_data.get('result', '{}')}}}}}\n\n"
+            yield _FRAME_COMPLETED
+            yield _sse_frame({"type": "done", "data": {"result": task_data.get("result", {})}})
         
         elif task_data["status"] == "failed":
             # Send error event
-            yield f"data: {{\"type\": \"meta\", \"data\": {{\"status\": \"failed\"}}}}\n\n"
-            yield f"data: {{\"type\": \"error\", \"data\": {{\"error\": \"{task_data.get('error', 'Unknown error')}\"}}}}\n\n"
-    
-    return StreamingResponse(
-        event_generator(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no"
-        }
-    )
+            yield _FRAME_FAILED
+            yield _sse_frame({"type": "error", "data": {"error": task_data.get("error", "Unknown error")}})
+    
+    # EventSourceResponse sets the no-cache/keep-alive/no-buffering headers
+    # and sends keep-alive pings while the generator is idle; byte frames are
+    # written through unchanged
+    return EventSourceResponse(event_generator(), ping=15)
 
 
 @router.get("/tasks")
@@ -156,26 +214,26 @@ async def list_tasks(
 ):
     """List tasks with optional filtering"""
     
-    filtered_tasks = []
-    
-    for task_id, task_data in tasks_db.items():
-        # Apply filters
-        if status and task_data["status"] != status:
-            continue
-        if task_type and task_data.get("task_type") != task_type:
-            continue
-        
-        filtered_tasks.append(task_data)
+    # Resolve filters against the indexes; task IDs increase with creation
+    # time, so sorting them restores insertion order
+    if status and task_type:
+        matching_ids = sorted(status_index.get(status, set()) & type_index.get(task_type, set()))
+    elif status:
+        matching_ids = sorted(status_index.get(status, ()))
+    elif task_type:
+        matching_ids = sorted(type_index.get(task_type, ()))
+    else:
+        matching_ids = list(tasks_db)
     
     # Apply pagination
-    paginated_tasks = filtered_tasks[offset:offset + limit]
+    paginated_tasks = [tasks_db[task_id] for task_id in matching_ids[offset:offset + limit]]
     
-    return {
+    return ORJSONResponse({
         "tasks": paginated_tasks,
-        "total": len(filtered_tasks),
+        "total": len(matching_ids),
         "limit": limit,
         "offset": offset
-    }
+    })
 
 
 @router.delete("/tasks/{task_id}")
@@ -196,7 +254,7 @@ async def cancel_task(task_id: int):
             detail=f"Cannot cancel task in {task_data['status']} state"
         )
     
-    task_data["status"] = "cancelled"
+    _set_task_status(task_data, "cancelled")
     task_data["updated_at"] = datetime.now().isoformat()
     
-    return {"message": f"Task {task_id} cancelled"}
\ No newline at end of file
+    return ORJSONResponse({"message": f"Task {task_id} cancelled"})
\ No newline at end of file
@@ -0,0 +1,45 @@
+"""
+Generic webhook handlers for bl1nk-agent-builder
+Builds the routers for sources that share the placeholder webhook flow
+"""
+
+import logging
+from typing import Dict, Any, Optional
+
+from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+# Sources served by the generic handler, with their display names
+WEBHOOK_SOURCES: Dict[str, str] = {
+    "manus": "Manus",
+    "slack": "Slack",
+    "github": "GitHub",
+}
+
+
+# Placeholder implementation; one model shared by every generic source
+class WebhookPayload(BaseModel):
+    source: Optional[str] = None
+    external_id: str
+    user_id: str
+    message: str
+    metadata: Dict[str, Any] = {}
+
+
+def make_router(source: str) -> APIRouter:
+    """Build the webhook router for a generic source"""
+    
+    display_name = WEBHOOK_SOURCES[source]
+    accepted = {"status": "accepted", "message": f"{display_name} webhook processed"}
+    
+    router = APIRouter(default_response_class=ORJSONResponse)
+    
+    @router.post(f"/webhook/{source}", name=f"{source}_webhook_handler")
+    async def webhook_handler(payload: WebhookPayload):
+        logger.info(f"{display_name} webhook received: {payload.external_id}")
+        return ORJSONResponse(accepted)
+    
+    return router
@@ -1,28 +0,0 @@
-"""
-GitHub webhook handler for bl1nk-agent-builder
-Handles incoming webhooks from GitHub platform
-"""
-
-import logging
-from datetime import datetime
-from typing import Dict, Any
-
-from fastapi import APIRouter, HTTPException, status
-from pydantic import BaseModel
-
-logger = logging.getLogger(__name__)
-
-# Placeholder implementation
-class GitHubWebhookPayload(BaseModel):
-    source: str = "github"
-    external_id: str
-    user_id: str
-    message: str
-    metadata: Dict[str, Any] = {}
-
-router = APIRouter()
-
-@router.post("/webhook/github")
-async def github_webhook_handler(payload: GitHubWebhookPayload):
-    logger.info(f"GitHub webhook received: {payload.external_id}")
-    return {"status": "accepted", "message": "GitHub webhook processed"}
\ No newline at end of file
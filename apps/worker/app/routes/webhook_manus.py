@@ -1,28 +0,0 @@
-"""
-Manus webhook handler for bl1nk-agent-builder
-Handles incoming webhooks from Manus platform
-"""
-
-import logging
-from datetime import datetime
-from typing import Dict, Any
-
-from fastapi import APIRouter, HTTPException, status
-from pydantic import BaseModel
-
-logger = logging.getLogger(__name__)
-
-# Placeholder implementation
-class ManusWebhookPayload(BaseModel):
-    source: str = "manus"
-    external_id: str
-    user_id: str
-    message: str
-    metadata: Dict[str, Any] = {}
-
-router = APIRouter()
-
-@router.post("/webhook/manus")
-async def manus_webhook_handler(payload: ManusWebhookPayload):
-    logger.info(f"Manus webhook received: {payload.external_id}")
-    return {"status": "accepted", "message": "Manus webhook processed"}
\ No newline at end of file
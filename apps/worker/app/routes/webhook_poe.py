@@ -9,17 +9,49 @@ import hmac
 from datetime import datetime
 from typing import Dict, Any, Optional
 
+import orjson
 from fastapi import FastAPI, Request, HTTPException, status, Depends
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from pydantic import BaseModel, Field
 from jose import jwt
 
+from app.config.settings import settings
 from app.utils.tracing import get_trace_id
 from app.utils.idempotency import get_or_create_task
 from app.middleware.auth import get_current_user
 
 logger = logging.getLogger(__name__)
 
+# Webhook secret bound once at import; None when signatures are not configured
+_POE_SECRET: Optional[bytes] = (
+    settings.poe_webhook_secret.encode('utf-8')
+    if getattr(settings, "poe_webhook_secret", None)
+    else None
+)
+
+# Pre-keyed HMAC state; copied per request so the key schedule runs once
+_POE_HMAC_PROTO = (
+    hmac.new(_POE_SECRET, digestmod=hashlib.sha256)
+    if _POE_SECRET is not None
+    else None
+)
+
+
+# Constants shared by every Poe request
+POE_SOURCE = "poe"
+POE_TASK_TYPE = "poe_chat"
+POE_TASK_PRIORITY = 3  # TaskPriority.HIGH; interactive chat goes ahead of batch work
+
+# Task record fields that make up the idempotency payload
+_IDEMPOTENCY_FIELDS = ("user_id", "conversation_id", "message", "metadata", "trace_id")
+
+
+def _poe_signature(payload: bytes) -> bytes:
+    """Compute the raw HMAC-SHA256 signature of a Poe payload"""
+    mac = _POE_HMAC_PROTO.copy()
+    mac.update(payload)
+    return mac.digest()
+
 
 # Pydantic models
 class PoeWebhookPayload(BaseModel):
@@ -65,22 +97,18 @@ async def verify_poe_signature(request: Request, payload: bytes) -> bool:
         logger.warning("No Poe signature found in headers")
         return False
     
-    # Get webhook secret from environment (if configured)
-    webhook_secret = "poe_webhook_secret"  # This should come from settings
-    
-    if not webhook_secret:
+    if _POE_HMAC_PROTO is None:
         logger.warning("No Poe webhook secret configured")
         return False
     
-    # Calculate expected signature
-    expected_signature = hmac.new(
-        webhook_secret.encode('utf-8'),
-        payload,
-        hashlib.sha256
-    ).hexdigest()
+    # Compare raw digests rather than hex strings
+    try:
+        provided_signature = bytes.fromhex(signature)
+    except ValueError:
+        logger.warning("Malformed Poe signature header")
+        return False
     
-    # Compare signatures
-    return hmac.compare_digest(signature, expected_signature)
+    return hmac.compare_digest(provided_signature, _poe_signature(payload))
 
 
 async def process_poe_webhook(payload: PoeWebhookPayload, request: Request) -> PoeAckResponse:
@@ -108,61 +136,63 @@ async def process_poe_webhook(payload: PoeWebhookPayload, request: Request) -> P
                 detail="message is required"
             )
         
+        now_iso = datetime.now().isoformat()
+        
         logger.info(
             f"Processing Poe webhook - external_id: {payload.external_id}, user_id: {payload.user_id}",
             extra={
                 "event": "webhook_received",
-                "source": "poe",
+                "source": POE_SOURCE,
                 "external_id": payload.external_id,
                 "user_id": payload.user_id,
-                "trace_id": trace_id
-            }
-        )
-        
-        # Use idempotency to get or create task
-        task_id = await get_or_create_task(
-            source="poe",
-            external_id=payload.external_id,
-            payload={
-                "user_id": payload.user_id,
-                "conversation_id": payload.conversation_id,
-                "message": payload.message,
-                "metadata": payload.metadata,
-                "trace_id": trace_id
+                "trace_id": trace_id,
+                "timestamp": now_iso
             }
         )
         
-        # Enqueue task for processing
-        # This would typically add the task to a queue for background processing
-        from app.database.redis import enqueue_task
-        
+        # Single task record; the idempotency payload is a view of its fields
         task_data = {
-            "task_id": task_id,
-            "type": "poe_chat",
-            "source": "poe",
+            "task_id": None,
+            "type": POE_TASK_TYPE,
+            "source": POE_SOURCE,
             "external_id": payload.external_id,
             "user_id": payload.user_id,
             "conversation_id": payload.conversation_id,
             "message": payload.message,
             "metadata": payload.metadata,
             "trace_id": trace_id,
-            "created_at": datetime.now().isoformat()
+            "created_at": now_iso
         }
         
-        await enqueue_task(task_data, priority=1)  # Priority 1 for chat tasks
+        # Use idempotency to get or create task
+        task_id = await get_or_create_task(
+            source=POE_SOURCE,
+            external_id=payload.external_id,
+            payload={field: task_data[field] for field in _IDEMPOTENCY_FIELDS}
+        )
+        task_data["task_id"] = task_id
+        
+        # Enqueue task for processing
+        # This would typically add the task to a queue for background processing
+        from app.database.redis import enqueue_task
+        
+        # Serialized once here; enqueue_task pushes the bytes as-is
+        await enqueue_task(orjson.dumps(task_data), priority=POE_TASK_PRIORITY)
         
         logger.info(
             f"Poe webhook processed successfully - task_id: {task_id}",
             extra={
                 "event": "webhook_processed",
-                "source": "poe",
+                "source": POE_SOURCE,
                 "task_id": task_id,
                 "external_id": payload.external_id,
-                "trace_id": trace_id
+                "trace_id": trace_id,
+                "timestamp": now_iso
             }
         )
         
-        return PoeAckResponse(
+        # Fields are already known-good; skip validation on the way out
+        return PoeAckResponse.model_construct(
             status="accepted",
             task_id=task_id,
             message=f"Task {task_id} accepted for processing"
@@ -175,7 +205,7 @@ async def process_poe_webhook(payload: PoeWebhookPayload, request: Request) -> P
             f"Failed to process Poe webhook: {e}",
             extra={
                 "event": "webhook_error",
-                "source": "poe",
+                "source": POE_SOURCE,
                 "external_id": payload.external_id,
                 "trace_id": trace_id,
                 "error": str(e)
@@ -192,12 +222,13 @@ async def process_poe_webhook(payload: PoeWebhookPayload, request: Request) -> P
 # FastAPI router
 from fastapi import APIRouter
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 
 @router.post(
     "/webhook/poe",
-    response_model=PoeAckResponse,
+    response_class=ORJSONResponse,
+    responses={200: {"model": PoeAckResponse}},
     status_code=status.HTTP_200_OK,
     tags=["Webhooks"],
     summary="Poe webhook receiver",
@@ -221,23 +252,19 @@ async def poe_webhook_handler(
 ):
     """Handle incoming Poe webhooks"""
     
-    # Verify signature (optional, depends on Poe's webhook configuration)
-    if settings.poe_webhook_secret:
-        try:
-            body = await request.body()
-            if not await verify_poe_signature(request, body):
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Invalid signature"
-                )
-        except Exception as e:
-            logger.warning(f"Signature verification failed: {e}")
-            # Continue processing if signature verification fails
+    # Verify signature whenever a secret is configured; reject on any mismatch
+    if _POE_SECRET is not None:
+        body = await request.body()
+        if not await verify_poe_signature(request, body):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid signature"
+            )
     
     # Process the webhook
     result = await process_poe_webhook(payload, request)
     
-    return result
+    return ORJSONResponse(result.model_dump())
 
 
 # Additional utility endpoints for Poe integration
@@ -250,12 +277,12 @@ async def poe_webhook_handler(
 )
 async def poe_webhook_test():
     """Test Poe webhook connectivity"""
-    return {
+    return ORJSONResponse({
         "status": "ok",
         "service": "bl1nk-agent-builder",
         "webhook": "poe",
         "timestamp": datetime.now().isoformat()
-    }
+    })
 
 
 @router.post(
@@ -274,27 +301,26 @@ async def poe_webhook_verify(
     
     try:
         # Calculate expected signature
-        if not settings.poe_webhook_secret:
-            return {
+        if _POE_SECRET is None:
+            return ORJSONResponse({
                 "valid": False,
                 "error": "No webhook secret configured"
-            }
+            })
         
-        expected_signature = hmac.new(
-            settings.poe_webhook_secret.encode('utf-8'),
-            body.encode('utf-8'),
-            hashlib.sha256
-        ).hexdigest()
+        expected_digest = _poe_signature(body.encode('utf-8'))
         
         # Compare signatures
-        is_valid = hmac.compare_digest(signature, expected_signature)
+        try:
+            is_valid = hmac.compare_digest(bytes.fromhex(signature), expected_digest)
+        except ValueError:
+            is_valid = False
         
-        return {
+        return ORJSONResponse({
             "valid": is_valid,
             "provided_signature": signature,
-            "expected_signature": expected_signature,
+            "expected_signature": expected_digest.hex(),
             "timestamp": datetime.now().isoformat()
-        }
+        })
         
     except Exception as e:
         logger.error(f"Signature verification failed: {e}")
@@ -1,28 +0,0 @@
-"""
-Slack webhook handler for bl1nk-agent-builder
-Handles incoming webhooks from Slack platform
-"""
-
-import logging
-from datetime import datetime
-from typing import Dict, Any
-
-from fastapi import APIRouter, HTTPException, status
-from pydantic import BaseModel
-
-logger = logging.getLogger(__name__)
-
-# Placeholder implementation
-class SlackWebhookPayload(BaseModel):
-    source: str = "slack"
-    external_id: str
-    user_id: str
-    message: str
-    metadata: Dict[str, Any] = {}
-
-router = APIRouter()
-
-@router.post("/webhook/slack")
-async def slack_webhook_handler(payload: SlackWebhookPayload):
-    logger.info(f"Slack webhook received: {payload.external_id}")
-    return {"status": "accepted", "message": "Slack webhook processed"}
\ No newline at end of file
@@ -3,20 +3,157 @@ Billing service for bl1nk-agent-builder
 Handles usage tracking and billing
 """
 
+import asyncio
 import logging
-from typing import Dict, Any, Optional
-from datetime import datetime
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# Initial row capacity of the usage log; columns double when full
+USAGE_LOG_INITIAL_CAPACITY = 1024
+
+NS_PER_DAY = 86400 * 10**9
+
+# Pending usage records buffered for the background flush, and max rows per flush
+USAGE_QUEUE_MAXSIZE = 10_000
+USAGE_FLUSH_BATCH_SIZE = 256
+
+# (user_id, task_id, provider, model, tokens_input, tokens_output, cost_usd, created_at_ns)
+UsageRecord = Tuple[str, int, str, str, int, int, float, int]
+
+
+class UsageLog:
+    """Columnar (struct-of-arrays) usage log backed by NumPy arrays"""
+    
+    def __init__(self, capacity: int = USAGE_LOG_INITIAL_CAPACITY):
+        self.size = 0
+        self.user_code = np.empty(capacity, dtype=np.int32)
+        self.task_id = np.empty(capacity, dtype=np.int64)
+        self.provider_code = np.empty(capacity, dtype=np.int16)
+        self.model_code = np.empty(capacity, dtype=np.int16)
+        self.tokens_in = np.empty(capacity, dtype=np.int32)
+        self.tokens_out = np.empty(capacity, dtype=np.int32)
+        self.cost_usd = np.empty(capacity, dtype=np.float32)
+        self.created_at = np.empty(capacity, dtype=np.int64)  # epoch ns
+        
+        # String columns are dictionary-encoded into small integer codes
+        self.user_codes: Dict[str, int] = {}
+        self.provider_codes: Dict[str, int] = {}
+        self.model_codes: Dict[str, int] = {}
+        self.providers: List[str] = []
+        self.models: List[str] = []
+    
+    def __len__(self) -> int:
+        return self.size
+    
+    def _grow(self):
+        """Double the capacity of every column"""
+        capacity = len(self.cost_usd) * 2
+        for name in (
+            "user_code", "task_id", "provider_code", "model_code",
+            "tokens_in", "tokens_out", "cost_usd", "created_at"
+        ):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+    
+    @staticmethod
+    def _encode(codes: Dict[str, int], values: Optional[List[str]], value: str) -> int:
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+            if values is not None:
+                values.append(value)
+        return code
+    
+    def append(
+        self,
+        user_id: str,
+        task_id: int,
+        provider: str,
+        model: str,
+        tokens_input: int,
+        tokens_output: int,
+        cost_usd: float,
+        created_at_ns: int
+    ) -> int:
+        """Append one usage row and return its 1-based record id"""
+        
+        if self.size == len(self.cost_usd):
+            self._grow()
+        
+        i = self.size
+        self.user_code[i] = self._encode(self.user_codes, None, user_id)
+        self.task_id[i] = task_id
+        self.provider_code[i] = self._encode(self.provider_codes, self.providers, provider)
+        self.model_code[i] = self._encode(self.model_codes, self.models, model)
+        self.tokens_in[i] = tokens_input
+        self.tokens_out[i] = tokens_output
+        self.cost_usd[i] = cost_usd
+        self.created_at[i] = created_at_ns
+        self.size = i + 1
+        
+        return self.size
+    
+    def user_mask(self, user_id: str, since_ns: int) -> Optional[np.ndarray]:
+        """Boolean row mask for a user's records at or after since_ns"""
+        
+        code = self.user_codes.get(user_id)
+        if code is None:
+            return None
+        
+        n = self.size
+        return (self.user_code[:n] == code) & (self.created_at[:n] >= since_ns)
+
 
 class BillingService:
     """Service for handling billing and usage tracking"""
     
     def __init__(self):
-        self.usage_logs = []  # In-memory (would use database in production)
+        self.usage_logs = UsageLog()  # In-memory (would use database in production)
+        
+        # log_usage only enqueues; a background task flushes in batches
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=USAGE_QUEUE_MAXSIZE)
+        self._flush_task: Optional[asyncio.Task] = None
     
-    async def log_usage(
+    async def start(self):
+        """Start the background usage flush"""
+        
+        if self._flush_task is not None:
+            logger.warning("Billing flush is already running")
+            return
+        
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        
+        logger.info("Billing service started")
+    
+    async def stop(self):
+        """Stop the background usage flush and drain pending records"""
+        
+        if self._flush_task is None:
+            return
+        
+        self._flush_task.cancel()
+        try:
+            await self._flush_task
+        except asyncio.CancelledError:
+            pass
+        self._flush_task = None
+        
+        # Record whatever was still queued
+        batch = []
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        if batch:
+            self._flush(batch)
+        
+        logger.info("Billing service stopped")
+    
+    def log_usage(
         self,
         user_id: str,
         task_id: int,
@@ -26,32 +163,61 @@ class BillingService:
         tokens_output: int,
         cost_usd: float
     ):
-        """Log usage for billing"""
+        """Queue usage for billing; recorded by the background flush"""
         
-        usage_record = {
-            "id": len(self.usage_logs) + 1,
-            "user_id": user_id,
-            "task_id": task_id,
-            "provider": provider,
-            "model": model,
-            "tokens_input": tokens_input,
-            "tokens_output": tokens_output,
-            "cost_usd": cost_usd,
-            "created_at": datetime.now()
-        }
-        
-        self.usage_logs.append(usage_record)
-        
-        logger.info(
-            "Usage logged",
-            extra={
-                "event": "usage_logged",
-                "user_id": user_id,
-                "task_id": task_id,
-                "provider": provider,
-                "cost_usd": cost_usd
-            }
+        record = (
+            user_id, task_id, provider, model,
+            tokens_input, tokens_output, cost_usd, time.time_ns()
         )
+        
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            # Flush is falling behind; record inline rather than drop usage
+            logger.warning("Billing queue full, recording usage inline")
+            self._flush([record])
+    
+    async def _flush_loop(self):
+        """Drain the usage queue in batches"""
+        
+        while True:
+            try:
+                batch = [await self._queue.get()]
+                while len(batch) < USAGE_FLUSH_BATCH_SIZE and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                
+                self._flush(batch)
+                
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Billing flush error: {e}")
+    
+    def _flush(self, batch: List[UsageRecord]):
+        """Append a batch of usage records to the usage log"""
+        
+        for user_id, task_id, provider, model, tokens_input, tokens_output, cost_usd, created_at_ns in batch:
+            self.usage_logs.append(
+                user_id=user_id,
+                task_id=task_id,
+                provider=provider,
+                model=model,
+                tokens_input=tokens_input,
+                tokens_output=tokens_output,
+                cost_usd=cost_usd,
+                created_at_ns=created_at_ns
+            )
+            
+            logger.info(
+                "Usage logged",
+                extra={
+                    "event": "usage_logged",
+                    "user_id": user_id,
+                    "task_id": task_id,
+                    "provider": provider,
+                    "cost_usd": cost_usd
+                }
+            )
     
     async def get_user_usage(
         self, 
@@ -60,22 +226,28 @@ class BillingService:
     ) -> Dict[str, Any]:
         """Get usage statistics for user"""
         
-        # Filter usage logs for user and timeframe
-        cutoff_date = datetime.now() - timedelta(days=days)
-        
-        user_logs = [
-            log for log in self.usage_logs 
-            if log["user_id"] == user_id and log["created_at"] >= cutoff_date
-        ]
+        # Vectorized scan over the columns for the user's rows inside the timeframe
+        logs = self.usage_logs
+        mask = logs.user_mask(user_id, time.time_ns() - days * NS_PER_DAY)
         
-        total_cost = sum(log["cost_usd"] for log in user_logs)
-        total_tokens = sum(log["tokens_input"] + log["tokens_output"] for log in user_logs)
+        if mask is None:
+            total_cost = 0.0
+            total_tokens = 0
+            total_requests = 0
+        else:
+            n = logs.size
+            total_requests = int(np.count_nonzero(mask))
+            total_cost = float(logs.cost_usd[:n][mask].sum(dtype=np.float64))
+            total_tokens = int(
+                logs.tokens_in[:n][mask].sum(dtype=np.int64)
+                + logs.tokens_out[:n][mask].sum(dtype=np.int64)
+            )
         
         return {
             "user_id": user_id,
             "period_days": days,
-            "total_requests": len(user_logs),
+            "total_requests": total_requests,
             "total_cost_usd": total_cost,
             "total_tokens": total_tokens,
-            "average_cost_per_request": total_cost / len(user_logs) if user_logs else 0
+            "average_cost_per_request": total_cost / total_requests if total_requests else 0
         }
\ No newline at end of file
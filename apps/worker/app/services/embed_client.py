@@ -6,41 +6,77 @@ Handles embedding generation and caching
 import asyncio
 import hashlib
 import logging
+from collections import OrderedDict
 from typing import List, Optional
 
+import numpy as np
+
 from app.config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+EMBEDDING_CACHE_MAXSIZE = 10000
+
+# Process-wide LRU shared by every client instance; float32 vectors keep a
+# 768-d embedding at ~3 KB instead of ~24 KB as a list of Python floats
+_embed_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+# Generator for mock embeddings
+_rng = np.random.default_rng()
+
+
+def _cache_get(cache_key: str) -> Optional[np.ndarray]:
+    """Look up an embedding and mark it as recently used"""
+    embedding = _embed_cache.get(cache_key)
+    if embedding is not None:
+        _embed_cache.move_to_end(cache_key)
+    return embedding
+
+
+def _cache_put(cache_key: str, embedding: np.ndarray) -> None:
+    """Store an embedding, evicting the least recently used entries"""
+    # Cached arrays are handed to every caller; freeze them so in-place edits
+    # raise instead of corrupting the shared entry
+    embedding.flags.writeable = False
+    _embed_cache[cache_key] = embedding
+    _embed_cache.move_to_end(cache_key)
+    while len(_embed_cache) > EMBEDDING_CACHE_MAXSIZE:
+        _embed_cache.popitem(last=False)
+
 
 class EmbeddingClient:
     """Client for generating embeddings"""
     
     def __init__(self):
-        self.cache = {}
+        self.cache = _embed_cache
     
     async def generate_embedding(
         self, 
         text: str, 
         model: str = "gamma-300"
-    ) -> List[float]:
-        """Generate embedding for text"""
+    ) -> np.ndarray:
+        """
+        Generate embedding for text
+        
+        Returns a read-only float32 array (not a list of floats) that may be
+        shared with other callers; copy it before modifying.
+        """
         
         # Check cache first
         cache_key = self._get_cache_key(text, model)
-        if cache_key in self.cache:
+        cached = _cache_get(cache_key)
+        if cached is not None:
             logger.debug("Embedding cache hit")
-            return self.cache[cache_key]
+            return cached
         
         # Generate embedding (placeholder)
         await asyncio.sleep(0.1)  # Simulate API call
         
         # Mock embedding (768 dimensions)
-        import random
-        embedding = [random.uniform(-1, 1) for _ in range(768)]
+        embedding = _rng.uniform(-1.0, 1.0, size=768).astype(np.float32)
         
         # Cache the result
-        self.cache[cache_key] = embedding
+        _cache_put(cache_key, embedding)
         
         logger.info(
             f"Embedding generated for text (length: {len(text)})",
@@ -54,8 +90,46 @@ class EmbeddingClient:
         
         return embedding
     
+    async def generate_embeddings_batch(
+        self,
+        texts: List[str],
+        model: str = "gamma-300"
+    ) -> List[np.ndarray]:
+        """Generate embeddings for several texts with one provider call; arrays are read-only as above"""
+        
+        cache_keys = [self._get_cache_key(text, model) for text in texts]
+        embeddings: List[Optional[np.ndarray]] = [_cache_get(key) for key in cache_keys]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        
+        if missing:
+            # Generate embeddings (placeholder); one round-trip for the whole batch
+            await asyncio.sleep(0.1)  # Simulate API call
+            
+            # Mock embeddings (768 dimensions)
+            generated = _rng.uniform(-1.0, 1.0, size=(len(missing), 768)).astype(np.float32)
+            
+            for row, i in enumerate(missing):
+                embeddings[i] = generated[row]
+                _cache_put(cache_keys[i], generated[row])
+            
+            logger.info(
+                f"Embeddings generated for {len(missing)} texts",
+                extra={
+                    "event": "embeddings_batch_generated",
+                    "model": model,
+                    "batch_size": len(texts),
+                    "generated": len(missing)
+                }
+            )
+        
+        return embeddings
+    
     def _get_cache_key(self, text: str, model: str) -> str:
         """Generate cache key for text and model"""
         
-        content = f"{model}:{text}"
-        return hashlib.md5(content.encode()).hexdigest()
\ No newline at end of file
+        # Non-cryptographic use; blake2b is faster than md5 for short inputs
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(model.encode())
+        digest.update(b":")
+        digest.update(text.encode())
+        return digest.hexdigest()
\ No newline at end of file
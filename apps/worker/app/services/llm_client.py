@@ -5,138 +5,609 @@ Handles communication with multiple LLM providers
 
 import logging
 import asyncio
-from typing import Dict, Any, Optional, List
+import hashlib
+import re
+import time
+from enum import Enum
+from functools import lru_cache
+from typing import Dict, Any, Optional, List, AsyncIterator
+
+import httpx
+import orjson
 
 from app.config.settings import settings
+from app.database.redis import cache_get, cache_set
+from app.services.embed_client import EmbeddingClient
 from app.utils.retry import retry_async, RetryConfig, RetryStrategy
 
 logger = logging.getLogger(__name__)
 
+# Connection pool shared by every provider client
+HTTP_LIMITS = httpx.Limits(
+    max_connections=100,
+    max_keepalive_connections=20,
+    keepalive_expiry=60
+)
+HTTP_TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+
+# Seconds between provider pings; well under keepalive_expiry so idle
+# pooled connections are reused instead of dropped
+PROVIDER_KEEPALIVE_INTERVAL = 30.0
+
+# Timeout for a single warmup/keepalive ping
+PROVIDER_PING_TIMEOUT = 5.0
+
+# Marks the end of a reusable prompt prefix for provider-side prompt caching
+CACHE_CONTROL_EPHEMERAL = {"type": "ephemeral"}
+
+
+# Circuit breaker tuning
+FAILURE_THRESHOLD = 3        # consecutive failures before a provider cools down
+COOLDOWN_INITIAL = 1.0       # seconds; doubles on every failed probe
+COOLDOWN_MAX = 60.0
+LATENCY_EWMA_ALPHA = 0.2
+
+
+class ProviderState(Enum):
+    """Circuit breaker state of a provider"""
+    HEALTHY = "healthy"
+    COOLDOWN = "cooldown"
+
+
+class ProviderHealth:
+    """Per-provider circuit breaker with smoothed latency"""
+    
+    def __init__(self):
+        self.state = ProviderState.HEALTHY
+        self.latency_ms: Optional[float] = None
+        self.consecutive_failures = 0
+        self.cooldown = COOLDOWN_INITIAL
+        self.next_probe_at = 0.0
+    
+    def is_available(self, now: float) -> bool:
+        """Healthy, or cooled down long enough to let one probe through"""
+        return self.state is ProviderState.HEALTHY or now >= self.next_probe_at
+    
+    def admit(self, now: float) -> bool:
+        """Claim a request slot; while cooling down only one probe is admitted per cooldown"""
+        
+        if self.state is ProviderState.HEALTHY:
+            return True
+        if now < self.next_probe_at:
+            return False
+        
+        # Hold other requests back until this probe records a result; if it
+        # never does, another probe is allowed after one more cooldown
+        self.next_probe_at = now + self.cooldown
+        return True
+    
+    def record_success(self, latency_ms: float):
+        if self.latency_ms is None:
+            self.latency_ms = latency_ms
+        else:
+            self.latency_ms += LATENCY_EWMA_ALPHA * (latency_ms - self.latency_ms)
+        
+        self.state = ProviderState.HEALTHY
+        self.consecutive_failures = 0
+        self.cooldown = COOLDOWN_INITIAL
+    
+    def record_failure(self, now: float):
+        self.consecutive_failures += 1
+        
+        if self.state is ProviderState.COOLDOWN or self.consecutive_failures >= FAILURE_THRESHOLD:
+            # Trip (or re-trip after a failed probe) with exponential cooldown
+            if self.state is ProviderState.COOLDOWN:
+                self.cooldown = min(self.cooldown * 2, COOLDOWN_MAX)
+            self.state = ProviderState.COOLDOWN
+            self.next_probe_at = now + self.cooldown
+
+
+# Delay before a hedged request races a second provider (seconds)
+HEDGE_DELAY = 0.3
+
+# Model routing rules, checked in order; the first pattern found in the model name wins
+MODEL_ROUTES = (
+    (re.compile("claude", re.IGNORECASE), "bedrock"),
+    (re.compile("llama", re.IGNORECASE), "openrouter"),
+)
+DEFAULT_PROVIDER = "openrouter"
+
+
+@lru_cache(maxsize=256)
+def route_model(model: str) -> str:
+    """Preferred provider for a model; memoized, so repeat models are a dict lookup"""
+    for pattern, provider in MODEL_ROUTES:
+        if pattern.search(model):
+            return provider
+    return DEFAULT_PROVIDER
+
+
+def _parse_sse_line(line: str) -> Optional[Dict[str, Any]]:
+    """Decode one SSE line into its JSON payload; None for comments, blanks and [DONE]"""
+    if not line.startswith("data:"):
+        return None
+    data = line[5:].strip()
+    if not data or data == "[DONE]":
+        return None
+    return orjson.loads(data)
+
+
+def _cached_system_blocks(system: str) -> List[Dict[str, Any]]:
+    """Static system prompt as a content block flagged for prompt caching"""
+    return [{"type": "text", "text": system, "cache_control": CACHE_CONTROL_EPHEMERAL}]
+
 
 class LLMClient:
     """LLM client for handling multiple providers"""
     
     def __init__(self):
         self.providers = {}
+        self.health: Dict[str, ProviderHealth] = {}
+        
+        # Negotiated HTTP version per provider response, e.g. {"HTTP/2": 120}
+        self.http_versions: Dict[str, int] = {}
+        
+        # One pooled client for all providers; HTTP/2 multiplexes concurrent
+        # calls to the same host over a single connection
+        self._http = httpx.AsyncClient(
+            http2=True,
+            limits=HTTP_LIMITS,
+            timeout=HTTP_TIMEOUT,
+            event_hooks={"response": [self._record_http_version]}
+        )
+        self._keepalive_task: Optional[asyncio.Task] = None
+        
         self._initialize_providers()
     
     def _initialize_providers(self):
         """Initialize available LLM providers"""
         
         if settings.openrouter_enabled:
-            self.providers['openrouter'] = OpenRouterClient()
+            self.providers['openrouter'] = OpenRouterClient(self._http)
         
         if settings.cloudflare_enabled:
-            self.providers['cloudflare'] = CloudflareClient()
+            self.providers['cloudflare'] = CloudflareClient(self._http)
         
         if settings.bedrock_enabled:
-            self.providers['bedrock'] = BedrockClient()
+            self.providers['bedrock'] = BedrockClient(self._http)
+        
+        self.health = {name: ProviderHealth() for name in self.providers}
+    
+    async def warmup(self):
+        """Open a connection to every provider and keep the pool warm from then on"""
+        
+        await self._ping_providers()
+        
+        if self._keepalive_task is None:
+            self._keepalive_task = asyncio.create_task(self._keepalive_loop())
+    
+    async def _ping_providers(self):
+        """Ping all providers concurrently; failures are logged, not raised"""
+        
+        names = list(self.providers)
+        results = await asyncio.gather(
+            *(self.providers[name].ping() for name in names),
+            return_exceptions=True
+        )
+        
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Provider warmup failed for {name}: {result}")
+    
+    async def _keepalive_loop(self):
+        """Ping providers periodically so idle connections are not dropped"""
+        
+        while True:
+            await asyncio.sleep(PROVIDER_KEEPALIVE_INTERVAL)
+            await self._ping_providers()
+    
+    async def _record_http_version(self, response: httpx.Response):
+        """Count the HTTP version each provider response was served over"""
+        version = response.http_version
+        self.http_versions[version] = self.http_versions.get(version, 0) + 1
+    
+    async def aclose(self):
+        """Close the shared HTTP connection pool"""
+        
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+            try:
+                await self._keepalive_task
+            except asyncio.CancelledError:
+                pass
+            self._keepalive_task = None
+        
+        await self._http.aclose()
     
     async def generate_response(
         self,
         prompt: str,
         model: str = "claude-3-haiku",
         provider: Optional[str] = None,
-        parameters: Optional[Dict[str, Any]] = None
+        parameters: Optional[Dict[str, Any]] = None,
+        system: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Generate response from LLM"""
-        
-        # Determine provider
-        if not provider:
-            provider = self._select_provider(model)
+        """Generate response from LLM, failing over across healthy providers"""
         
-        if provider not in self.providers:
-            raise ValueError(f"Provider {provider} not available")
+        # An explicit provider is honored as-is; otherwise walk the fallback chain
+        if provider:
+            if provider not in self.providers:
+                raise ValueError(f"Provider {provider} not available")
+            chain = [provider]
+        else:
+            chain = self._select_chain(model)
+            if not chain:
+                raise ValueError(f"No provider available for model {model}")
         
-        client = self.providers[provider]
+        last_error: Optional[Exception] = None
         
-        try:
-            result = await client.generate(prompt, model, parameters or {})
+        for name in chain:
+            health = self.health[name]
+            started = time.monotonic()
+            
+            # Explicit providers are tried regardless; chain entries may have
+            # lost their probe slot to a concurrent request
+            if not health.admit(started) and not provider:
+                continue
+            
+            try:
+                result = await self.providers[name].generate(
+                    prompt, model, parameters or {}, system=system
+                )
+            except (asyncio.TimeoutError, httpx.HTTPError) as e:
+                health.record_failure(time.monotonic())
+                last_error = e
+                logger.warning(f"LLM generation via {name} failed, trying next provider: {e}")
+                continue
+            except Exception as e:
+                logger.error(f"LLM generation failed: {e}")
+                raise
+            
+            health.record_success((time.monotonic() - started) * 1000)
             
             logger.info(
-                f"LLM response generated via {provider}",
+                f"LLM response generated via {name}",
                 extra={
                     "event": "llm_response_generated",
-                    "provider": provider,
+                    "provider": name,
                     "model": model,
                     "tokens": result.get("tokens", {})
                 }
             )
             
             return result
-            
-        except Exception as e:
-            logger.error(f"LLM generation failed: {e}")
-            raise
+        
+        if last_error is None:
+            raise ValueError(f"No provider available for model {model}")
+        
+        logger.error(f"LLM generation failed on all providers: {last_error}")
+        raise last_error
     
     def _select_provider(self, model: str) -> str:
         """Select best provider for model"""
+        return route_model(model)
+    
+    def _select_chain(self, model: str) -> List[str]:
+        """Ordered providers to try: preferred first, then healthy peers by latency"""
+        
+        now = time.monotonic()
+        available = [name for name, health in self.health.items() if health.is_available(now)]
+        
+        preferred = self._select_provider(model)
+        if not settings.failover_enabled:
+            return [preferred] if preferred in available else []
+        
+        fallbacks = sorted(
+            (name for name in available if name != preferred),
+            key=lambda name: (
+                self.health[name].latency_ms is None,
+                self.health[name].latency_ms or 0.0,
+                settings.get_provider_priority(name)
+            )
+        )
+        chain = [preferred] + fallbacks if preferred in available else fallbacks
+        
+        return chain[:settings.failover_max_attempts]
+    
+    async def generate_stream(
+        self,
+        prompt: str,
+        model: str = "claude-3-haiku",
+        provider: Optional[str] = None,
+        parameters: Optional[Dict[str, Any]] = None,
+        system: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a response from one provider; no mid-stream failover"""
+        
+        started = time.monotonic()
         
-        # Simple routing logic
-        if "claude" in model.lower():
-            return "bedrock"
-        elif "llama" in model.lower():
-            return "openrouter"
+        if not provider:
+            chain = self._select_chain(model)
+            provider = next((name for name in chain if self.health[name].admit(started)), None)
+            if provider is None:
+                raise ValueError(f"No provider available for model {model}")
+        elif provider not in self.providers:
+            raise ValueError(f"Provider {provider} not available")
         else:
-            return "openrouter"  # Default
+            self.health[provider].admit(started)
+        
+        health = self.health[provider]
+        
+        try:
+            async for chunk in self.providers[provider].generate_stream(
+                prompt, model, parameters or {}, system=system
+            ):
+                if chunk["type"] == "usage":
+                    chunk = {**chunk, "provider": provider, "model": model}
+                yield chunk
+        except (asyncio.TimeoutError, httpx.HTTPError):
+            health.record_failure(time.monotonic())
+            raise
+        
+        health.record_success((time.monotonic() - started) * 1000)
+
+
+class Throttler:
+    """In-process token bucket; `async with` waits until a request slot is free"""
+    
+    def __init__(self, rate_limit: int, period: float = 60.0):
+        self.capacity = float(rate_limit)
+        self.refill_rate = rate_limit / period
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def __aenter__(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_rate)
+                self.updated_at = now
+                
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return self
+                
+                await asyncio.sleep((1 - self.tokens) / self.refill_rate)
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
 
 
 class BaseLLMClient:
     """Base LLM client interface"""
     
+    # Endpoint pinged to pre-open connections; None for providers without real HTTP calls
+    base_url: Optional[str] = None
+    
+    def __init__(self, http: httpx.AsyncClient):
+        self._http = http
+        self.throttler = Throttler(settings.provider_rate_limit_per_minute)
+    
+    async def ping(self):
+        """Open (or refresh) a pooled connection to the provider"""
+        
+        if self.base_url:
+            await self._http.head(self.base_url, timeout=PROVIDER_PING_TIMEOUT)
+    
     async def generate(
         self, 
         prompt: str, 
         model: str, 
-        parameters: Dict[str, Any]
+        parameters: Dict[str, Any],
+        system: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Generate response"""
+        """
+        Generate response.
+        
+        The static system prompt is sent ahead of the per-request prompt so
+        providers with prefix caching can reuse it across calls.
+        """
         raise NotImplementedError
+    
+    async def generate_stream(
+        self,
+        prompt: str,
+        model: str,
+        parameters: Dict[str, Any],
+        system: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a response as {"type": "text"} chunks followed by one {"type": "usage"} chunk.
+        
+        Providers without native streaming yield the buffered response as a single chunk.
+        """
+        result = await self.generate(prompt, model, parameters, system=system)
+        yield {"type": "text", "data": result["response"]}
+        yield {"type": "usage", "tokens": result.get("tokens", {}), "cost": result.get("cost", 0.0)}
 
 
 class OpenRouterClient(BaseLLMClient):
     """OpenRouter LLM client"""
     
+    @property
+    def base_url(self) -> str:
+        return settings.openrouter_base_url
+    
     async def generate(
         self, 
         prompt: str, 
         model: str, 
-        parameters: Dict[str, Any]
+        parameters: Dict[str, Any],
+        system: Optional[str] = None
     ) -> Dict[str, Any]:
         """Generate response via OpenRouter"""
         
-        # Placeholder implementation
-        await asyncio.sleep(1)  # Simulate API call
+        async with self.throttler:
+            response = await self._http.post(
+                f"{settings.openrouter_base_url}/chat/completions",
+                headers={"Authorization": f"Bearer {settings.openrouter_api_key}"},
+                json=self._request_body(prompt, model, parameters, system)
+            )
+        response.raise_for_status()
+        data = response.json()
         
         return {
-            "response": f"Response from OpenRouter using {model}",
+            "response": data["choices"][0]["message"]["content"],
             "model": model,
             "provider": "openrouter",
-            "tokens": {"input": 100, "output": 50},
-            "cost": 0.05
+            "tokens": self._tokens(data.get("usage") or {}),
+            "cost": (data.get("usage") or {}).get("cost", 0.0)
+        }
+    
+    async def generate_stream(
+        self,
+        prompt: str,
+        model: str,
+        parameters: Dict[str, Any],
+        system: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream response deltas from OpenRouter over SSE"""
+        
+        body = self._request_body(prompt, model, parameters, system)
+        body["stream"] = True
+        body["usage"] = {"include": True}
+        usage: Dict[str, Any] = {}
+        
+        async with self.throttler:
+            async with self._http.stream(
+                "POST",
+                f"{settings.openrouter_base_url}/chat/completions",
+                headers={"Authorization": f"Bearer {settings.openrouter_api_key}"},
+                json=body
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    event = _parse_sse_line(line)
+                    if event is None:
+                        continue
+                    if event.get("usage"):
+                        usage = event["usage"]
+                    for choice in event.get("choices", ()):
+                        delta = (choice.get("delta") or {}).get("content")
+                        if delta:
+                            yield {"type": "text", "data": delta}
+        
+        yield {"type": "usage", "tokens": self._tokens(usage), "cost": usage.get("cost", 0.0)}
+    
+    @staticmethod
+    def _request_body(
+        prompt: str,
+        model: str,
+        parameters: Dict[str, Any],
+        system: Optional[str]
+    ) -> Dict[str, Any]:
+        """Chat completions body"""
+        
+        # Static prefix first; Anthropic-backed models need an explicit breakpoint,
+        # OpenAI-compatible ones cache matching prefixes automatically
+        messages = []
+        if system:
+            messages.append({"role": "system", "content": _cached_system_blocks(system)})
+        messages.append({"role": "user", "content": prompt})
+        
+        return {"model": model, "messages": messages, **parameters}
+    
+    @staticmethod
+    def _tokens(usage: Dict[str, Any]) -> Dict[str, int]:
+        return {
+            "input": usage.get("prompt_tokens", 0),
+            "output": usage.get("completion_tokens", 0),
+            "cached": (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
         }
 
 
 class CloudflareClient(BaseLLMClient):
     """Cloudflare LLM client"""
     
+    base_url = "https://api.cloudflare.com"
+    
     async def generate(
         self, 
         prompt: str, 
         model: str, 
-        parameters: Dict[str, Any]
+        parameters: Dict[str, Any],
+        system: Optional[str] = None
     ) -> Dict[str, Any]:
         """Generate response via Cloudflare"""
         
-        # Placeholder implementation
-        await asyncio.sleep(0.8)  # Simulate API call
+        async with self.throttler:
+            response = await self._http.post(
+                self._url(model),
+                headers={"Authorization": f"Bearer {settings.cloudflare_api_token}"},
+                json=self._request_body(prompt, parameters, system)
+            )
+        response.raise_for_status()
+        result = response.json().get("result", {})
         
         return {
-            "response": f"Response from Cloudflare using {model}",
+            "response": result.get("response", ""),
             "model": model,
             "provider": "cloudflare",
-            "tokens": {"input": 95, "output": 48},
-            "cost": 0.03
+            "tokens": self._tokens(result.get("usage") or {}),
+            "cost": 0.0
+        }
+    
+    async def generate_stream(
+        self,
+        prompt: str,
+        model: str,
+        parameters: Dict[str, Any],
+        system: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream response text from Cloudflare over SSE"""
+        
+        body = self._request_body(prompt, parameters, system)
+        body["stream"] = True
+        usage: Dict[str, Any] = {}
+        
+        async with self.throttler:
+            async with self._http.stream(
+                "POST",
+                self._url(model),
+                headers={"Authorization": f"Bearer {settings.cloudflare_api_token}"},
+                json=body
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    event = _parse_sse_line(line)
+                    if event is None:
+                        continue
+                    if event.get("usage"):
+                        usage = event["usage"]
+                    if event.get("response"):
+                        yield {"type": "text", "data": event["response"]}
+        
+        yield {"type": "usage", "tokens": self._tokens(usage), "cost": 0.0}
+    
+    @staticmethod
+    def _url(model: str) -> str:
+        return f"https://api.cloudflare.com/client/v4/accounts/{settings.cloudflare_account_id}/ai/run/{model}"
+    
+    @staticmethod
+    def _request_body(
+        prompt: str,
+        parameters: Dict[str, Any],
+        system: Optional[str]
+    ) -> Dict[str, Any]:
+        """Workers AI body; chat messages when there is a system prompt"""
+        
+        if system:
+            return {
+                "messages": [
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": prompt}
+                ],
+                **parameters
+            }
+        return {"prompt": prompt, **parameters}
+    
+    @staticmethod
+    def _tokens(usage: Dict[str, Any]) -> Dict[str, int]:
+        return {
+            "input": usage.get("prompt_tokens", 0),
+            "output": usage.get("completion_tokens", 0),
+            "cached": 0
         }
 
 
@@ -147,34 +618,107 @@ class BedrockClient(BaseLLMClient):
         self, 
         prompt: str, 
         model: str, 
-        parameters: Dict[str, Any]
+        parameters: Dict[str, Any],
+        system: Optional[str] = None
     ) -> Dict[str, Any]:
         """Generate response via Bedrock"""
         
-        # Placeholder implementation
-        await asyncio.sleep(1.2)  # Simulate API call
+        # Placeholder implementation; Bedrock requests need SigV4 signing
+        # before they can go out over self._http, so system is unused here
+        async with self.throttler:
+            await asyncio.sleep(1.2)  # Simulate API call
         
         return {
             "response": f"Response from Bedrock using {model}",
             "model": model,
             "provider": "bedrock",
-            "tokens": {"input": 105, "output": 52},
+            "tokens": {"input": 105, "output": 52, "cached": 0},
             "cost": 0.07
         }
 
 
+class LLMCache:
+    """Exact-match response cache for deterministic LLM calls, backed by Redis"""
+    
+    KEY_PREFIX = "llm:response:"
+    
+    def __init__(self, ttl: int = settings.cache_ttl):
+        self.ttl = ttl
+    
+    @staticmethod
+    def is_cacheable(parameters: Dict[str, Any]) -> bool:
+        """Only explicitly greedy (temperature 0) generations are repeatable"""
+        # A missing temperature means the provider default, which is not greedy
+        return parameters.get("temperature") == 0
+    
+    def make_key(
+        self,
+        model: str,
+        prompt: str,
+        provider: Optional[str],
+        parameters: Dict[str, Any],
+        system: Optional[str] = None
+    ) -> str:
+        """Hash the request into a cache key"""
+        
+        request_bytes = orjson.dumps(
+            {
+                "model": model,
+                "system": system,
+                "prompt": prompt,
+                "provider": provider,
+                "params": parameters
+            },
+            option=orjson.OPT_SORT_KEYS
+        )
+        return self.KEY_PREFIX + hashlib.sha256(request_bytes).hexdigest()
+    
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get a cached response"""
+        cached = await cache_get(key)
+        return orjson.loads(cached) if cached else None
+    
+    async def set(self, key: str, result: Dict[str, Any]) -> None:
+        """Cache a response"""
+        await cache_set(key, orjson.dumps(result), ttl=self.ttl)
+
+
 # Provider manager for routing
 class ProviderManager:
     """Manager for LLM provider routing and failover"""
     
     def __init__(self):
         self.client = LLMClient()
+        # Decorrelated jitter keeps concurrent retries apart; Retry-After on
+        # 429/503 responses overrides the computed delay
         self.retry_config = RetryConfig(
             max_attempts=3,
-            base_delay=2.0,
+            base_delay=0.1,
             max_delay=30.0,
-            strategy=RetryStrategy.EXPONENTIAL
+            strategy=RetryStrategy.DECORRELATED_JITTER,
+            respect_retry_after=True
         )
+        self.cache = LLMCache()
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0}
+        # In-flight cacheable requests keyed by cache key
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.embed_client = EmbeddingClient()
+    
+    async def warmup(self):
+        """Pre-open provider connections"""
+        await self.client.warmup()
+    
+    async def aclose(self):
+        """Release provider connections"""
+        await self.client.aclose()
+    
+    async def generate_embedding(self, text: str, model: str = "gamma-300"):
+        """Generate an embedding for a single text"""
+        return await self.embed_client.generate_embedding(text, model)
+    
+    async def generate_embeddings_batch(self, texts: List[str], model: str = "gamma-300"):
+        """Generate embeddings for several texts in one provider call"""
+        return await self.embed_client.generate_embeddings_batch(texts, model)
     
     async def generate_response(
         self,
@@ -183,19 +727,97 @@ class ProviderManager:
         task_id: int,
         model: str = "claude-3-haiku",
         provider: Optional[str] = None,
-        parameters: Optional[Dict[str, Any]] = None
+        parameters: Optional[Dict[str, Any]] = None,
+        system: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Generate response with provider routing"""
+        """
+        Generate response with provider routing.
+        
+        Set parameters["hedge"] to race a second provider when the first is slow;
+        it roughly doubles spend on slow calls, so it is opt-in for interactive traffic.
+        """
+        
+        parameters = dict(parameters or {})
+        hedge = parameters.pop("hedge", False) and provider is None
+        cache_key = None
+        
+        # Serve repeated deterministic requests from the cache
+        if self.cache.is_cacheable(parameters):
+            cache_key = self.cache.make_key(model, prompt, provider, parameters, system)
+            try:
+                cached = await self.cache.get(cache_key)
+            except Exception as e:
+                logger.warning(f"LLM cache lookup failed: {e}")
+                cached = None
+            
+            if cached is not None:
+                self.stats["hits"] += 1
+                return cached
+            
+            self.stats["misses"] += 1
         
+        if cache_key is None:
+            return await self._generate_uncached(
+                prompt, user_id, task_id, model, provider, parameters, system, hedge, None
+            )
+        
+        # Single-flight: identical concurrent requests share one provider call
+        inflight = self._inflight.get(cache_key)
+        if inflight is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(inflight)
+        
+        future = asyncio.get_running_loop().create_future()
+        # Mark a failure as retrieved even when no duplicate was waiting on it
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[cache_key] = future
         try:
-            result = await retry_async(
-                self.client.generate_response,
-                prompt=prompt,
-                model=model,
-                provider=provider,
-                parameters=parameters,
-                config=self.retry_config
+            result = await self._generate_uncached(
+                prompt, user_id, task_id, model, provider, parameters, system, hedge, cache_key
             )
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._inflight.pop(cache_key, None)
+    
+    async def _generate_uncached(
+        self,
+        prompt: str,
+        user_id: str,
+        task_id: int,
+        model: str,
+        provider: Optional[str],
+        parameters: Dict[str, Any],
+        system: Optional[str],
+        hedge: bool,
+        cache_key: Optional[str]
+    ) -> Dict[str, Any]:
+        """Call the provider, log usage and populate the cache"""
+        
+        try:
+            if hedge:
+                result = await self.hedged_generate(prompt, model, parameters, system=system)
+            else:
+                retry_result = await retry_async(
+                    self.client.generate_response,
+                    prompt=prompt,
+                    model=model,
+                    provider=provider,
+                    parameters=parameters,
+                    system=system,
+                    config=self.retry_config
+                )
+                
+                if not retry_result.success:
+                    raise retry_result.exception
+                
+                result = retry_result.result
             
             # Log usage
             await self._log_usage(
@@ -207,12 +829,102 @@ class ProviderManager:
                 cost=result.get("cost", 0.0)
             )
             
+            if cache_key is not None:
+                try:
+                    await self.cache.set(cache_key, result)
+                except Exception as e:
+                    logger.warning(f"LLM cache store failed: {e}")
+            
             return result
             
         except Exception as e:
             logger.error(f"Provider routing failed: {e}")
             raise
     
+    async def generate_stream(
+        self,
+        prompt: str,
+        user_id: str,
+        task_id: int,
+        model: str = "claude-3-haiku",
+        provider: Optional[str] = None,
+        parameters: Optional[Dict[str, Any]] = None,
+        system: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a response; usage is logged once the stream completes"""
+        
+        async for chunk in self.client.generate_stream(
+            prompt, model=model, provider=provider, parameters=parameters, system=system
+        ):
+            if chunk["type"] == "usage":
+                await self._log_usage(
+                    user_id=user_id,
+                    task_id=task_id,
+                    provider=chunk["provider"],
+                    model=model,
+                    tokens=chunk.get("tokens", {}),
+                    cost=chunk.get("cost", 0.0)
+                )
+            yield chunk
+    
+    async def hedged_generate(
+        self,
+        prompt: str,
+        model: str,
+        parameters: Dict[str, Any],
+        system: Optional[str] = None,
+        hedge_delay: float = HEDGE_DELAY
+    ) -> Dict[str, Any]:
+        """Call the preferred provider; if it has not answered after hedge_delay, race the next one"""
+        
+        chain = self.client._select_chain(model)
+        if len(chain) < 2:
+            return await self.client.generate_response(
+                prompt=prompt, model=model, parameters=parameters, system=system
+            )
+        
+        candidates = iter(chain)
+        
+        def start_next() -> Optional[asyncio.Task]:
+            """Start the next provider in the chain that admits a request"""
+            now = time.monotonic()
+            for provider in candidates:
+                if self.client.health[provider].admit(now):
+                    return asyncio.create_task(self.client.generate_response(
+                        prompt=prompt, model=model, provider=provider, parameters=parameters, system=system
+                    ))
+            return None
+        
+        primary = start_next()
+        if primary is None:
+            raise ValueError(f"No provider available for model {model}")
+        
+        done, pending = await asyncio.wait({primary}, timeout=hedge_delay)
+        last_error: Optional[BaseException] = None
+        
+        for task in done:
+            if task.exception() is None:
+                return task.result()
+            last_error = task.exception()
+        
+        # Primary is slow (or already failed): race the secondary against it
+        secondary = start_next()
+        if secondary is not None:
+            pending.add(secondary)
+        
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+        
+        raise last_error
+    
     async def _log_usage(
         self,
         user_id: str,
@@ -5,19 +5,27 @@ Processes tasks from the queue
 
 import asyncio
 import logging
-from typing import Dict, Any
+import random
+from typing import Dict, Any, List
+
+from app.config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Backoff after a failed loop iteration (seconds)
+ERROR_BACKOFF_BASE = 0.1
+ERROR_BACKOFF_MAX = 5.0
+
 
 class TaskProcessor:
     """Task processor for executing tasks"""
     
-    def __init__(self, provider_manager, vector_store):
-        self.provider_manager = provider_manager
-        self.vector_store = vector_store
+    def __init__(self, orchestrator, concurrency: int = None):
+        self.orchestrator = orchestrator
+        self.concurrency = concurrency or settings.worker_concurrency
         self.running = False
-        self.worker_task = None
+        self.workers: List[asyncio.Task] = []
+        self._stop = asyncio.Event()
     
     async def start(self):
         """Start the task processor"""
@@ -27,9 +35,17 @@ class TaskProcessor:
             return
         
         self.running = True
-        self.worker_task = asyncio.create_task(self._process_tasks())
+        self._stop.clear()
+        
+        # Connect to providers before the first task needs them
+        await self.orchestrator.provider_manager.warmup()
         
-        logger.info("Task processor started")
+        self.workers = [
+            asyncio.create_task(self._process_tasks(), name=f"task_processor_{i}")
+            for i in range(self.concurrency)
+        ]
+        
+        logger.info(f"Task processor started with {self.concurrency} workers")
     
     async def stop(self):
         """Stop the task processor"""
@@ -38,26 +54,38 @@ class TaskProcessor:
             return
         
         self.running = False
+        self._stop.set()
         
-        if self.worker_task:
-            self.worker_task.cancel()
-            try:
-                await self.worker_task
-            except asyncio.CancelledError:
-                pass
+        # Workers may be parked on a blocking dequeue; cancel instead of waiting it out
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
         
         logger.info("Task processor stopped")
     
     async def _process_tasks(self):
-        """Main processing loop"""
+        """Main processing loop; blocks on the queue rather than polling"""
+        
+        failures = 0
         
-        while self.running:
+        while not self._stop.is_set():
             try:
-                # Process next task (this would come from queue)
-                await asyncio.sleep(1)  # Placeholder
+                # Waits on the queue (BZPOPMAX) and returns as soon as a task arrives
+                await self.orchestrator.process_next_task()
+                failures = 0
                 
             except asyncio.CancelledError:
                 break
             except Exception as e:
+                failures += 1
+                delay = min(ERROR_BACKOFF_MAX, ERROR_BACKOFF_BASE * 2 ** (failures - 1))
+                delay *= random.uniform(0.5, 1.0)
+                
                 logger.error(f"Task processing error: {e}")
-                await asyncio.sleep(5)  # Wait before retrying
\ No newline at end of file
+                
+                # Back off, but wake immediately on shutdown
+                try:
+                    await asyncio.wait_for(self._stop.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
@@ -5,18 +5,42 @@ Coordinates task execution across multiple providers and manages the task lifecy
 
 import asyncio
 import logging
+import time
 from typing import Dict, Any, Optional, List
-from datetime import datetime
+from dataclasses import dataclass, field, fields, asdict
+from datetime import datetime, timezone
 from enum import Enum
 
-from app.database.connection import fetch_one, execute_query, fetch_many
-from app.database.redis import get_redis, set_task_status, get_task_status
+import orjson
+
+from app.database.connection import (
+    fetch_one, fetch_many, execute_prepared, fetch_val_prepared, command_rowcount
+)
+from app.database.redis import (
+    get_redis, set_task_status, get_task_status, get_task_statuses, enqueue_task, dequeue_task
+)
 from app.config.settings import settings
 from app.utils.tracing import trace_operation, AsyncTraceContext
 from app.utils.retry import retry_async, RetryConfig, RetryStrategy
+from app.utils.batching import BatchCoalescer
 
 logger = logging.getLogger(__name__)
 
+# Status timestamps only need second resolution; format once per second
+_iso_second = 0
+_iso_now = ""
+
+
+def _now_iso() -> str:
+    """Current UTC time as an ISO string, cached for the current second"""
+    global _iso_second, _iso_now
+    
+    second = int(time.time())
+    if second != _iso_second:
+        _iso_second = second
+        _iso_now = datetime.fromtimestamp(second, timezone.utc).isoformat()
+    return _iso_now
+
 
 class TaskStatus(Enum):
     """Task execution status"""
@@ -44,6 +68,49 @@ class TaskPriority(Enum):
     URGENT = 4
 
 
+@dataclass(frozen=True, slots=True)
+class TaskInfo:
+    """Queued task payload, decoded once when the task is dequeued"""
+    task_id: int
+    type: str
+    user_id: Optional[str] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    source: Optional[str] = None
+    external_id: Optional[str] = None
+    conversation_id: Optional[str] = None
+    trace_id: Optional[str] = None
+    created_at: Optional[str] = None
+    # chat
+    message: Optional[str] = None
+    system: Optional[str] = None
+    stream: bool = False
+    # embedding
+    text: Optional[str] = None
+    model: Optional[str] = None
+    # rerank
+    query: Optional[str] = None
+    documents: List[Any] = field(default_factory=list)
+    # skill invocation
+    skill_id: Optional[str] = None
+    inputs: Any = None
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TaskInfo":
+        """Build from a queue payload, ignoring keys this worker does not use"""
+        return cls(**{name: data[name] for name in _TASK_INFO_FIELDS if name in data})
+
+
+_TASK_INFO_FIELDS = tuple(f.name for f in fields(TaskInfo))
+
+
+@dataclass(frozen=True, slots=True)
+class TaskResult:
+    """Outcome of a task execution"""
+    success: bool
+    data: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+
 class TaskOrchestrator:
     """Main task orchestrator for coordinating task execution"""
     
@@ -51,8 +118,14 @@ class TaskOrchestrator:
         self.provider_manager = provider_manager
         self.vector_store = vector_store
         self.redis = get_redis()
-        self.active_tasks: Dict[int, Dict[str, Any]] = {}
-        self.task_workers: Dict[str, asyncio.Task] = {}
+        self.active_tasks: Dict[int, TaskInfo] = {}
+        
+        # Tasks run inline on the processor's fixed worker pool; each in-flight
+        # task gets a cancel scope that cancel_task expires
+        self._cancel_scopes: Dict[int, asyncio.Timeout] = {}
+        
+        # Embedding requests are coalesced per model into batched provider calls
+        self._embed_batchers: Dict[str, BatchCoalescer] = {}
         
     async def submit_task(
         self,
@@ -74,8 +147,7 @@ class TaskOrchestrator:
                     "input_data": input_data,
                     "priority": priority.value,
                     "status": TaskStatus.PENDING.value,
-                    "metadata": metadata or {},
-                    "created_at": datetime.now().isoformat()
+                    "metadata": metadata or {}
                 }
                 
                 task_id = await self._create_task_record(task_data)
@@ -89,7 +161,13 @@ class TaskOrchestrator:
                 })
                 
                 # Add to queue based on priority
-                await self._queue_task(task_id, priority)
+                await self._queue_task(task_id, priority, {
+                    "task_id": task_id,
+                    "type": task_type.value,
+                    "user_id": user_id,
+                    "metadata": metadata or {},
+                    **input_data
+                })
                 
                 logger.info(
                     f"Task submitted successfully - ID: {task_id}, Type: {task_type.value}",
@@ -126,51 +204,72 @@ class TaskOrchestrator:
             if not task:
                 raise ValueError(f"Task {task_id} not found")
             
-            # Convert to status format
-            status_data = {
-                "task_id": task_id,
-                "status": task["status"],
-                "task_type": task.get("task_type"),
-                "user_id": task["user_id"],
-                "created_at": task["created_at"].isoformat() if task["created_at"] else None,
-                "updated_at": task["updated_at"].isoformat() if task["updated_at"] else None,
-                "result": task.get("output_payload"),
-                "error": task.get("error_reason")
-            }
-            
-            return status_data
+            return self._row_to_status(task_id, task)
             
         except Exception as e:
             logger.error(f"Failed to get task status for {task_id}: {e}")
             raise
     
+    async def get_task_statuses(self, task_ids: List[int]) -> Dict[int, Optional[Dict[str, Any]]]:
+        """Get statuses for several tasks: one Redis MGET plus one query for misses"""
+        
+        if not task_ids:
+            return {}
+        
+        cached = await get_task_statuses([str(task_id) for task_id in task_ids])
+        statuses = dict(zip(task_ids, cached))
+        
+        # Fallback to database for anything not in Redis
+        miss_ids = [task_id for task_id, status_data in statuses.items() if status_data is None]
+        if miss_ids:
+            rows = await fetch_many(
+                "SELECT * FROM tasks WHERE id = ANY($1::bigint[])",
+                miss_ids
+            )
+            for row in rows:
+                statuses[row["id"]] = self._row_to_status(row["id"], row)
+        
+        return statuses
+    
+    @staticmethod
+    def _row_to_status(task_id: int, task: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a tasks row to status format"""
+        return {
+            "task_id": task_id,
+            "status": task["status"],
+            "task_type": task.get("task_type"),
+            "user_id": task["user_id"],
+            "created_at": task["created_at"].isoformat() if task["created_at"] else None,
+            "updated_at": task["updated_at"].isoformat() if task["updated_at"] else None,
+            "result": task.get("output_payload"),
+            "error": task.get("error_reason")
+        }
+    
     async def cancel_task(self, task_id: int) -> bool:
         """Cancel a pending or processing task"""
         
         try:
             # Update task status in database
-            result = await execute_query(
-                "UPDATE tasks SET status = $1, updated_at = NOW() WHERE id = $2 AND status IN ($3, $4)",
+            result = await execute_prepared(
+                "cancel_task",
                 TaskStatus.CANCELLED.value,
                 task_id,
                 TaskStatus.PENDING.value,
                 TaskStatus.PROCESSING.value
             )
             
-            if "0" in result:
+            if command_rowcount(result) == 0:
                 # Task was not found or not in cancelable state
                 return False
             
             # Update Redis status
             await set_task_status(str(task_id), TaskStatus.CANCELLED.value, {
                 "task_id": task_id,
-                "cancelled_at": datetime.now().isoformat()
+                "cancelled_at": _now_iso()
             })
             
-            # Cancel worker if exists
-            worker_task = self.task_workers.get(str(task_id))
-            if worker_task and not worker_task.done():
-                worker_task.cancel()
+            # Interrupt the task if it is running
+            self._expire_scope(task_id)
             
             logger.info(f"Task {task_id} cancelled successfully")
             return True
@@ -180,66 +279,61 @@ class TaskOrchestrator:
             return False
     
     async def process_next_task(self) -> Optional[int]:
-        """Process the next task from the queue"""
+        """
+        Process the next task from the queue
         
-        try:
-            # Get task from queue
-            task_data = await self.redis.brpop(settings.task_queue_name, timeout=1)
-            if not task_data:
-                return None
-            
-            _, task_json = task_data
-            import json
-            task_info = json.loads(task_json)
-            
-            task_id = task_info["task_id"]
-            
-            # Start processing task
-            await self._process_task(task_id, task_info)
-            
-            return task_id
-            
-        except Exception as e:
-            logger.error(f"Failed to process next task: {e}", exc_info=True)
+        Queue and decode errors propagate so the processor can back off;
+        failures of the task itself are handled by _process_task.
+        """
+        
+        # Get highest-priority task from queue
+        payload = await dequeue_task(timeout=1)
+        if not payload:
             return None
+        
+        task_info = TaskInfo.from_dict(payload)
+        task_id = task_info.task_id
+        
+        # Start processing task
+        await self._process_task(task_id, task_info)
+        
+        return task_id
     
-    async def _process_task(self, task_id: int, task_info: Dict[str, Any]):
-        """Process a specific task"""
+    async def _process_task(self, task_id: int, task_info: TaskInfo):
+        """Process a specific task on the calling worker"""
         
-        task_key = str(task_id)
+        scope = None
         
         try:
             # Update task status to processing
-            await execute_query(
-                "UPDATE tasks SET status = $1, updated_at = NOW() WHERE id = $2",
-                TaskStatus.PROCESSING.value,
+            await self._set_status(
+                task_id,
+                TaskStatus.PROCESSING,
+                {"task_id": task_id, "started_at": _now_iso()},
+                "update_status",
                 task_id
             )
             
-            await set_task_status(task_key, TaskStatus.PROCESSING.value, {
-                "task_id": task_id,
-                "started_at": datetime.now().isoformat()
-            })
-            
             # Mark as active
             self.active_tasks[task_id] = task_info
             
-            # Create worker task
-            worker_task = asyncio.create_task(
-                self._execute_task(task_id, task_info),
-                name=f"task_worker_{task_id}"
-            )
-            
-            self.task_workers[task_key] = worker_task
+            async with asyncio.timeout(None) as scope:
+                self._cancel_scopes[task_id] = scope
+                result = await self._execute_task(task_id, task_info)
             
-            # Wait for completion
-            result = await worker_task
-            
-            if result["success"]:
-                await self._complete_task(task_id, result["data"])
+            if result.success:
+                await self._complete_task(task_id, result.data)
             else:
-                await self._fail_task(task_id, result["error"])
-                
+                await self._fail_task(task_id, result.error)
+        
+        except TimeoutError as e:
+            if scope is not None and scope.expired():
+                # cancel_task already recorded the cancelled status
+                logger.info(f"Task {task_id} was cancelled")
+            else:
+                logger.error(f"Task {task_id} failed with error: {e}", exc_info=True)
+                await self._fail_task(task_id, str(e))
+            
         except asyncio.CancelledError:
             logger.info(f"Task {task_id} was cancelled")
             await self._fail_task(task_id, "Task was cancelled")
@@ -251,14 +345,21 @@ class TaskOrchestrator:
         finally:
             # Clean up
             self.active_tasks.pop(task_id, None)
-            self.task_workers.pop(task_key, None)
+            self._cancel_scopes.pop(task_id, None)
+    
+    def _expire_scope(self, task_id: int):
+        """Interrupt an in-flight task by expiring its cancel scope"""
+        
+        scope = self._cancel_scopes.get(task_id)
+        if scope is not None and not scope.expired():
+            scope.reschedule(asyncio.get_running_loop().time())
     
-    async def _execute_task(self, task_id: int, task_info: Dict[str, Any]) -> Dict[str, Any]:
+    async def _execute_task(self, task_id: int, task_info: TaskInfo) -> TaskResult:
         """Execute the actual task logic"""
         
-        async with AsyncTraceContext("task_execution", task_id=task_id, task_type=task_info.get("type")):
-            
-            task_type = task_info.get("type")
+        task_type = task_info.type
+        
+        async with AsyncTraceContext("task_execution", task_id=task_id, task_type=task_type):
             
             if task_type == "poe_chat":
                 return await self._execute_chat_task(task_id, task_info)
@@ -271,62 +372,105 @@ class TaskOrchestrator:
             else:
                 raise ValueError(f"Unknown task type: {task_type}")
     
-    async def _execute_chat_task(self, task_id: int, task_info: Dict[str, Any]) -> Dict[str, Any]:
+    async def _execute_chat_task(self, task_id: int, task_info: TaskInfo) -> TaskResult:
         """Execute a chat task"""
         
-        message = task_info.get("message")
-        user_id = task_info.get("user_id")
-        
-        # Generate response using provider manager
-        response = await self.provider_manager.generate_response(
-            prompt=message,
-            user_id=user_id,
-            task_id=task_id
-        )
+        if task_info.stream:
+            response = await self._stream_chat_response(task_id, task_info)
+        else:
+            # Generate response using provider manager; the static system prompt
+            # is passed separately so providers can cache it as a prefix
+            response = await self.provider_manager.generate_response(
+                prompt=task_info.message,
+                user_id=task_info.user_id,
+                task_id=task_id,
+                system=task_info.system
+            )
         
-        return {
-            "success": True,
-            "data": {
+        return TaskResult(
+            success=True,
+            data={
                 "response": response,
                 "model_used": response.get("model", "unknown"),
                 "tokens_used": response.get("tokens", {}),
                 "cost": response.get("cost", 0.0)
             }
+        )
+    
+    async def _stream_chat_response(self, task_id: int, task_info: TaskInfo) -> Dict[str, Any]:
+        """Publish response chunks to the task's stream channel as they arrive"""
+        
+        channel = f"task:{task_id}:stream"
+        parts: List[str] = []
+        usage: Dict[str, Any] = {}
+        
+        async for chunk in self.provider_manager.generate_stream(
+            prompt=task_info.message,
+            user_id=task_info.user_id,
+            task_id=task_id,
+            system=task_info.system
+        ):
+            await self.redis.publish(channel, orjson.dumps(chunk))
+            if chunk["type"] == "text":
+                parts.append(chunk["data"])
+            else:
+                usage = chunk
+        
+        # Persisted result keeps the buffered shape
+        return {
+            "response": "".join(parts),
+            "model": usage.get("model", "unknown"),
+            "provider": usage.get("provider"),
+            "tokens": usage.get("tokens", {}),
+            "cost": usage.get("cost", 0.0)
         }
     
-    async def _execute_embedding_task(self, task_id: int, task_info: Dict[str, Any]) -> Dict[str, Any]:
+    async def _execute_embedding_task(self, task_id: int, task_info: TaskInfo) -> TaskResult:
         """Execute an embedding task"""
         
-        text = task_info.get("text")
-        model = task_info.get("model", "gamma-300")
+        text = task_info.text
+        model = task_info.model or "gamma-300"
         
-        # Generate embedding
-        embedding = await self.provider_manager.generate_embedding(
-            text=text,
-            model=model
-        )
+        # Generate embedding, batched with concurrent embedding tasks
+        embedding = await self._get_embed_batcher(model).submit(text)
         
         # Store in vector store
         await self.vector_store.store_embedding(
             text=text,
             embedding=embedding,
-            metadata=task_info.get("metadata", {})
+            metadata=task_info.metadata
         )
         
-        return {
-            "success": True,
-            "data": {
+        return TaskResult(
+            success=True,
+            data={
                 "embedding": embedding,
                 "model_used": model,
                 "dimension": len(embedding)
             }
-        }
+        )
+    
+    def _get_embed_batcher(self, model: str) -> BatchCoalescer:
+        """Get or create the embedding batcher for a model"""
+        
+        batcher = self._embed_batchers.get(model)
+        if batcher is None:
+            async def embed_batch(texts: List[str]):
+                return await self.provider_manager.generate_embeddings_batch(texts, model=model)
+            
+            batcher = self._embed_batchers[model] = BatchCoalescer(
+                embed_batch,
+                max_batch=64,
+                max_wait_ms=50
+            )
+        
+        return batcher
     
-    async def _execute_rerank_task(self, task_id: int, task_info: Dict[str, Any]) -> Dict[str, Any]:
+    async def _execute_rerank_task(self, task_id: int, task_info: TaskInfo) -> TaskResult:
         """Execute a rerank task"""
         
-        query = task_info.get("query")
-        documents = task_info.get("documents", [])
+        query = task_info.query
+        documents = task_info.documents
         
         # Rerank documents
         reranked = await self.provider_manager.rerank_documents(
@@ -334,56 +478,69 @@ class TaskOrchestrator:
             documents=documents
         )
         
-        return {
-            "success": True,
-            "data": {
+        return TaskResult(
+            success=True,
+            data={
                 "reranked_documents": reranked,
                 "original_count": len(documents),
                 "reranked_count": len(reranked)
             }
-        }
+        )
     
-    async def _execute_skill_task(self, task_id: int, task_info: Dict[str, Any]) -> Dict[str, Any]:
+    async def _execute_skill_task(self, task_id: int, task_info: TaskInfo) -> TaskResult:
         """Execute a skill invocation task"""
         
-        skill_id = task_info.get("skill_id")
-        inputs = task_info.get("inputs")
+        skill_id = task_info.skill_id
+        inputs = task_info.inputs
         
         # This would integrate with the skills system
         # For now, return a placeholder result
         
-        return {
-            "success": True,
-            "data": {
+        return TaskResult(
+            success=True,
+            data={
                 "skill_id": skill_id,
                 "result": f"Skill {skill_id} executed with inputs: {inputs}",
                 "execution_time": 1.0
             }
-        }
+        )
+    
+    async def _set_status(
+        self,
+        task_id: int,
+        status: TaskStatus,
+        status_data: Dict[str, Any],
+        statement: str,
+        *statement_args
+    ):
+        """
+        Apply a status transition to Postgres and Redis concurrently.
+        
+        The named statement receives the status as $1 followed by statement_args.
+        """
+        await asyncio.gather(
+            execute_prepared(statement, status.value, *statement_args),
+            set_task_status(str(task_id), status.value, status_data)
+        )
     
     async def _complete_task(self, task_id: int, result_data: Dict[str, Any]):
         """Mark task as completed"""
         
         try:
-            # Update database
-            await execute_query(
-                """
-                UPDATE tasks 
-                SET status = $1, output_payload = $2, updated_at = NOW() 
-                WHERE id = $3
-                """,
-                TaskStatus.COMPLETED.value,
+            # Update database and Redis together
+            await self._set_status(
+                task_id,
+                TaskStatus.COMPLETED,
+                {
+                    "task_id": task_id,
+                    "completed_at": _now_iso(),
+                    "result": result_data
+                },
+                "complete_task",
                 result_data,
                 task_id
             )
             
-            # Update Redis
-            await set_task_status(str(task_id), TaskStatus.COMPLETED.value, {
-                "task_id": task_id,
-                "completed_at": datetime.now().isoformat(),
-                "result": result_data
-            })
-            
             logger.info(f"Task {task_id} completed successfully")
             
         except Exception as e:
@@ -393,25 +550,20 @@ class TaskOrchestrator:
         """Mark task as failed"""
         
         try:
-            # Update database
-            await execute_query(
-                """
-                UPDATE tasks 
-                SET status = $1, error_reason = $2, updated_at = NOW() 
-                WHERE id = $3
-                """,
-                TaskStatus.FAILED.value,
+            # Update database and Redis together
+            await self._set_status(
+                task_id,
+                TaskStatus.FAILED,
+                {
+                    "task_id": task_id,
+                    "failed_at": _now_iso(),
+                    "error": error
+                },
+                "fail_task",
                 error,
                 task_id
             )
             
-            # Update Redis
-            await set_task_status(str(task_id), TaskStatus.FAILED.value, {
-                "task_id": task_id,
-                "failed_at": datetime.now().isoformat(),
-                "error": error
-            })
-            
             logger.error(f"Task {task_id} failed: {error}")
             
         except Exception as e:
@@ -420,72 +572,50 @@ class TaskOrchestrator:
     async def _create_task_record(self, task_data: Dict[str, Any]) -> int:
         """Create task record in database"""
         
-        import json
-        
-        result = await execute_query(
-            """
-            INSERT INTO tasks (
-                user_id,
-                task_type,
-                input_payload,
-                status,
-                priority,
-                metadata,
-                created_at,
-                updated_at
-            ) VALUES ($1, $2, $3, $4, $5, $6, NOW(), NOW())
-            RETURNING id
-            """,
+        return await fetch_val_prepared(
+            "insert_task",
             task_data["user_id"],
             task_data["task_type"],
-            json.dumps(task_data["input_data"]),
+            orjson.dumps(task_data["input_data"]).decode(),
             task_data["status"],
             task_data["priority"],
-            json.dumps(task_data["metadata"])
+            orjson.dumps(task_data["metadata"]).decode()
         )
-        
-        # Extract ID from result
-        if isinstance(result, str) and " " in result:
-            return int(result.split()[-1])
-        elif isinstance(result, int):
-            return result
-        else:
-            raise ValueError(f"Unexpected task ID format: {result}")
     
-    async def _queue_task(self, task_id: int, priority: TaskPriority):
-        """Add task to appropriate queue based on priority"""
+    async def _queue_task(self, task_id: int, priority: TaskPriority, task_info: Dict[str, Any]):
+        """Add task to the priority queue"""
         
-        # For now, use a single queue with priority
-        # In production, you might use separate queues for different priorities
-        await self.redis.lpush(settings.task_queue_name, str(task_id))
+        # Single sorted-set queue; URGENT pops before LOW regardless of age
+        await enqueue_task(task_info, priority=priority.value)
     
     async def get_active_tasks(self) -> List[Dict[str, Any]]:
         """Get list of currently active tasks"""
         
-        active = []
-        for task_id, task_info in self.active_tasks.items():
-            status_info = await self.get_task_status(task_id)
-            active.append({
-                "task_id": task_id,
-                "task_info": task_info,
-                "status_info": status_info
-            })
+        active_tasks = dict(self.active_tasks)
+        statuses = await self.get_task_statuses(list(active_tasks))
         
-        return active
+        return [
+            {
+                "task_id": task_id,
+                "task_info": asdict(task_info),
+                "status_info": statuses.get(task_id)
+            }
+            for task_id, task_info in active_tasks.items()
+        ]
     
     async def cleanup_completed_tasks(self):
         """Clean up old completed tasks from active tracking"""
         
-        completed_task_ids = []
+        finished = (TaskStatus.COMPLETED.value, TaskStatus.FAILED.value, TaskStatus.CANCELLED.value)
+        statuses = await self.get_task_statuses(list(self.active_tasks))
         
-        for task_id in list(self.active_tasks.keys()):
-            status_info = await self.get_task_status(task_id)
-            if status_info.get("status") in [TaskStatus.COMPLETED.value, TaskStatus.FAILED.value, TaskStatus.CANCELLED.value]:
-                completed_task_ids.append(task_id)
+        completed_task_ids = [
+            task_id for task_id, status_info in statuses.items()
+            if status_info and status_info.get("status") in finished
+        ]
         
         for task_id in completed_task_ids:
             self.active_tasks.pop(task_id, None)
-            self.task_workers.pop(str(task_id), None)
         
         if completed_task_ids:
             logger.info(f"Cleaned up {len(completed_task_ids)} completed tasks")
@@ -495,13 +625,15 @@ class TaskOrchestrator:
         
         logger.info("Shutting down task orchestrator...")
         
-        # Cancel all active workers
-        for task_key, worker_task in self.task_workers.items():
-            if not worker_task.done():
-                worker_task.cancel()
+        # Interrupt anything still running on the worker pool
+        for task_id in list(self._cancel_scopes):
+            self._expire_scope(task_id)
+        
+        # Stop embedding batchers
+        for batcher in self._embed_batchers.values():
+            await batcher.close()
         
-        # Wait for workers to complete
-        if self.task_workers:
-            await asyncio.gather(*self.task_workers.values(), return_exceptions=True)
+        # Close pooled provider connections
+        await self.provider_manager.aclose()
         
         logger.info("Task orchestrator shutdown complete")
\ No newline at end of file
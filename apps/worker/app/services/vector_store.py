@@ -3,20 +3,318 @@ Vector store for bl1nk-agent-builder
 Handles vector storage and similarity search
 """
 
+import asyncio
+import hashlib
 import logging
+import os
+import sqlite3
+import struct
+import threading
+import time
+from collections import OrderedDict
 from typing import List, Dict, Any, Optional, Tuple
 
+import numpy as np
+import orjson
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
 from app.config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Initial row capacity of the embedding matrix; doubles when full
+VECTOR_STORE_INITIAL_CAPACITY = 1024
+
+# LRU of recent search results, cleared whenever a vector is stored
+QUERY_CACHE_MAXSIZE = 1024
+QUERY_CACHE_TTL = 60.0  # seconds
+
+# Files inside settings.vector_store_path
+VECTOR_MATRIX_FILE = "vectors.f32"
+VECTOR_ROWS_FILE = "vectors.db"
+
+# Seconds new rows are batched before one off-loop flush + commit
+VECTOR_PERSIST_DELAY = 0.2
+
+
+class HNSWIndex:
+    """Approximate nearest-neighbour index over the store's rows, backed by hnswlib"""
+    
+    def __init__(self, dim: int, capacity: int):
+        # Rows are unit vectors, so inner product is cosine similarity
+        self.index = hnswlib.Index(space="ip", dim=dim)
+        self.index.init_index(
+            max_elements=capacity,
+            ef_construction=settings.vector_hnsw_ef_construction,
+            M=settings.vector_hnsw_m
+        )
+        self.index.set_ef(settings.vector_hnsw_ef_search)
+    
+    def add(self, first_row: int, vecs: np.ndarray):
+        """Add consecutive rows starting at first_row, doubling capacity as needed"""
+        
+        capacity = self.index.get_max_elements()
+        while first_row + len(vecs) > capacity:
+            capacity *= 2
+        if capacity != self.index.get_max_elements():
+            self.index.resize_index(capacity)
+        self.index.add_items(vecs, np.arange(first_row, first_row + len(vecs)))
+    
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Row numbers and cosine similarities of the k nearest rows per query, best first"""
+        
+        # ef must be at least k for hnswlib to return k results
+        self.index.set_ef(max(settings.vector_hnsw_ef_search, k))
+        labels, distances = self.index.knn_query(queries, k=k)
+        return labels, 1.0 - distances
+
+
+class FaissGPUIndex:
+    """Exact inner-product search over the store's rows on a GPU, backed by faiss"""
+    
+    def __init__(self, dim: int, capacity: int):
+        self._resources = faiss.StandardGpuResources()
+        self.index = faiss.index_cpu_to_gpu(self._resources, 0, faiss.IndexFlatIP(dim))
+    
+    def add(self, first_row: int, vecs: np.ndarray):
+        """Add consecutive rows; flat index ids follow insertion order, i.e. row numbers"""
+        self.index.add(np.ascontiguousarray(vecs, dtype=np.float32))
+    
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Row numbers and cosine similarities of the k nearest rows per query, best first"""
+        sims, labels = self.index.search(np.ascontiguousarray(np.atleast_2d(queries), dtype=np.float32), k)
+        return labels, sims
+
+
+def _select_index_backend():
+    """Index class for settings.vector_index_backend, or None if its library is missing"""
+    
+    if not settings.vector_use_index:
+        return None
+    if settings.vector_index_backend == "faiss-gpu":
+        return FaissGPUIndex if faiss is not None else None
+    return HNSWIndex if hnswlib is not None else None
+
 
 class VectorStore:
-    """Vector store for embeddings"""
+    """
+    Vector store for embeddings (would use pgvector in production).
+    
+    With a path, the matrix is a memory-mapped float32 file and ids, texts and
+    metadata live in a SQLite sidecar, so restarts reopen instead of rebuilding
+    and processes share the mapped pages. One process should write at a time.
+    New rows are written to disk in batches, off the event loop, shortly after
+    they are stored; close() writes whatever is still pending.
+    """
+    
+    def __init__(
+        self,
+        capacity: int = VECTOR_STORE_INITIAL_CAPACITY,
+        path: Optional[str] = settings.vector_store_path
+    ):
+        # Struct-of-arrays: row i of every column describes vector i
+        self._ids: List[str] = []
+        self._texts: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        
+        # L2-normalized embeddings as rows of one contiguous float32 matrix, so
+        # cosine similarity is a plain dot product; allocated on the first
+        # insert once the dimension is known
+        self._capacity = capacity
+        self._embeddings: Optional[np.ndarray] = None
+        
+        # HNSW (sub-linear) or FAISS GPU search when the backend library is
+        # installed; the matrix stays the source of truth and the exact fallback
+        self._index_cls = _select_index_backend()
+        self._index = None
+        
+        # query key -> (expires_at, results)
+        self._query_cache: "OrderedDict[bytes, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        
+        self._path = path
+        self._db: Optional[sqlite3.Connection] = None
+        
+        # Rows below _persisted_rows are on disk; the dimension is recorded
+        # with the first batch
+        self._persisted_rows = 0
+        self._pending_dim: Optional[int] = None
+        self._persist_task: Optional[asyncio.Task] = None
+        self._write_lock = threading.Lock()
+        
+        if path:
+            self._open(path)
+    
+    def _open(self, path: str):
+        """Open (or create) the persistent store and load its rows"""
+        
+        os.makedirs(path, exist_ok=True)
+        self._matrix_path = os.path.join(path, VECTOR_MATRIX_FILE)
+        
+        # Batches are committed from a worker thread, one at a time
+        self._db = sqlite3.connect(os.path.join(path, VECTOR_ROWS_FILE), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS vectors ("
+            "row INTEGER PRIMARY KEY, id TEXT NOT NULL, text TEXT NOT NULL, metadata BLOB NOT NULL)"
+        )
+        self._db.commit()
+        
+        dim_row = self._db.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+        if dim_row is None:
+            return
+        
+        # Rows are committed only after their vectors are flushed, so every
+        # committed row has its embedding on disk
+        dim = int(dim_row[0])
+        capacity = os.path.getsize(self._matrix_path) // (dim * 4)
+        self._embeddings = np.memmap(self._matrix_path, dtype=np.float32, mode="r+", shape=(capacity, dim))
+        
+        for vector_id, text, metadata in self._db.execute(
+            "SELECT id, text, metadata FROM vectors ORDER BY row"
+        ):
+            self._ids.append(vector_id)
+            self._texts.append(text)
+            self._metadatas.append(orjson.loads(metadata))
+        self._persisted_rows = len(self._ids)
+        
+        if self._index_cls is not None and self._ids:
+            self._index = self._index_cls(dim, max(capacity, 1))
+            self._index.add(0, self._embeddings[:len(self._ids)])
+        
+        logger.info(f"Vector store opened: {len(self._ids)} vectors from {path}")
+    
+    def close(self):
+        """Write pending rows, then close the persistent store"""
+        
+        if self._db is not None:
+            if self._persist_task is not None:
+                self._persist_task.cancel()
+                self._persist_task = None
+            
+            # Waits for a batch still being written by the worker thread
+            with self._write_lock:
+                end = len(self._ids)
+                if end > self._persisted_rows or self._pending_dim is not None:
+                    self._commit_rows(self._embeddings, self._pending_dim, self._pending_rows(end))
+                    self._persisted_rows = end
+                    self._pending_dim = None
+                elif isinstance(self._embeddings, np.memmap):
+                    self._embeddings.flush()
+                self._db.close()
+                self._db = None
+    
+    def __len__(self) -> int:
+        return len(self._ids)
+    
+    def _append_rows(self, vecs: np.ndarray):
+        """Append embedding rows, doubling the matrix until they fit (amortized O(1) per row)"""
+        
+        n = len(self._ids)
+        
+        capacity = self._capacity if self._embeddings is None else self._embeddings.shape[0]
+        while n + len(vecs) > capacity:
+            capacity *= 2
+        if self._embeddings is None or capacity != self._embeddings.shape[0]:
+            self._resize(capacity, vecs.shape[1])
+        
+        self._embeddings[n:n + len(vecs)] = vecs
+        
+        if self._index_cls is not None:
+            if self._index is None:
+                self._index = self._index_cls(vecs.shape[1], self._capacity)
+            self._index.add(n, vecs)
+    
+    def _resize(self, capacity: int, dim: int):
+        """Give the matrix room for capacity rows, keeping the stored rows"""
+        
+        n = len(self._ids)
+        
+        if self._db is None:
+            embeddings = np.empty((capacity, dim), dtype=np.float32)
+            if self._embeddings is not None:
+                embeddings[:n] = self._embeddings[:n]
+            self._embeddings = embeddings
+            return
+        
+        # Extending the file keeps existing rows in place; only the mapping changes
+        if self._embeddings is not None:
+            self._embeddings.flush()
+        else:
+            self._pending_dim = dim
+        with open(self._matrix_path, "ab") as f:
+            f.truncate(capacity * dim * 4)
+        self._embeddings = np.memmap(self._matrix_path, dtype=np.float32, mode="r+", shape=(capacity, dim))
+    
+    def _schedule_persist(self):
+        """Make sure a batch write is pending for newly stored rows"""
+        
+        if self._db is not None and (self._persist_task is None or self._persist_task.done()):
+            self._persist_task = asyncio.ensure_future(self._persist_pending())
     
-    def __init__(self):
-        self.embeddings = {}  # In-memory storage (would use pgvector in production)
-        self.vectors = []
+    async def _persist_pending(self):
+        """Write batches off the loop until every stored row is on disk"""
+        
+        while self._persisted_rows < len(self._ids):
+            await asyncio.sleep(VECTOR_PERSIST_DELAY)
+            
+            end = len(self._ids)
+            dim = self._pending_dim
+            try:
+                await asyncio.to_thread(self._write_batch, self._embeddings, dim, self._pending_rows(end))
+            except Exception as e:
+                # Rows stay pending; the next store or close() writes them
+                logger.error(f"Vector store persist failed: {e}")
+                return
+            
+            self._persisted_rows = end
+            if dim is not None:
+                self._pending_dim = None
+    
+    def _pending_rows(self, end: int) -> List[tuple]:
+        """Sidecar rows for vectors from _persisted_rows up to end"""
+        return [
+            (row, self._ids[row], self._texts[row], orjson.dumps(self._metadatas[row], default=str))
+            for row in range(self._persisted_rows, end)
+        ]
+    
+    def _write_batch(self, embeddings: np.ndarray, dim: Optional[int], rows: List[tuple]):
+        """Worker-thread entry; skipped if close() got there first (it writes the same rows)"""
+        
+        with self._write_lock:
+            if self._db is not None:
+                self._commit_rows(embeddings, dim, rows)
+    
+    def _commit_rows(self, embeddings: np.ndarray, dim: Optional[int], rows: List[tuple]):
+        """Flush the vectors, then commit their rows; caller holds _write_lock"""
+        
+        # Rows are committed only after their vectors are on disk
+        embeddings.flush()
+        if dim is not None:
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('dim', ?)", (str(dim),))
+        # OR REPLACE: close() may rewrite rows of a batch that is still in flight
+        self._db.executemany(
+            "INSERT OR REPLACE INTO vectors (row, id, text, metadata) VALUES (?, ?, ?, ?)",
+            rows
+        )
+        self._db.commit()
+    
+    def _check_dimension(self, vecs: np.ndarray):
+        """Reject embeddings whose dimension differs from the stored rows"""
+        
+        if self._embeddings is not None and vecs.shape[-1:] != self._embeddings.shape[1:]:
+            raise ValueError(
+                f"Embedding dimension {vecs.shape[-1]} does not match store dimension {self._embeddings.shape[1]}"
+            )
     
     async def store_embedding(
         self,
@@ -26,30 +324,69 @@ class VectorStore:
     ) -> str:
         """Store embedding with metadata"""
         
-        vector_id = f"vec_{len(self.vectors)}"
+        vec = np.asarray(embedding, dtype=np.float32)
+        self._check_dimension(vec)
         
-        vector_data = {
-            "id": vector_id,
-            "text": text,
-            "embedding": embedding,
-            "metadata": metadata or {},
-            "created_at": "2024-01-01T00:00:00Z"  # Would use datetime.now()
-        }
+        vector_id = f"vec_{len(self._ids)}"
         
-        self.vectors.append(vector_data)
+        self._append_rows(self._normalize(vec)[np.newaxis])
+        self._query_cache.clear()
+        self._ids.append(vector_id)
+        self._texts.append(text)
+        self._metadatas.append(metadata or {})
+        self._schedule_persist()
         
-        logger.info(
-            f"Embedding stored: {vector_id}",
-            extra={
-                "event": "embedding_stored",
-                "vector_id": vector_id,
-                "dimension": len(embedding),
-                "text_length": len(text)
-            }
-        )
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Embedding stored",
+                extra={
+                    "event": "embedding_stored",
+                    "vector_id": vector_id,
+                    "dimension": len(embedding),
+                    "text_length": len(text)
+                }
+            )
         
         return vector_id
     
+    async def store_embeddings(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[Optional[Dict[str, Any]]]] = None
+    ) -> List[str]:
+        """Store several embeddings at once; the matrix grows at most once"""
+        
+        if not texts:
+            return []
+        
+        vecs = np.asarray(embeddings, dtype=np.float32)
+        if vecs.ndim != 2 or len(vecs) != len(texts):
+            raise ValueError("Expected one embedding per text")
+        self._check_dimension(vecs)
+        
+        first = len(self._ids)
+        vector_ids = [f"vec_{first + i}" for i in range(len(texts))]
+        
+        self._append_rows(self._normalize(vecs))
+        self._query_cache.clear()
+        self._ids.extend(vector_ids)
+        self._texts.extend(texts)
+        self._metadatas.extend(metadata or {} for metadata in (metadatas or [None] * len(texts)))
+        self._schedule_persist()
+        
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Embeddings stored",
+                extra={
+                    "event": "embeddings_stored",
+                    "count": len(vector_ids),
+                    "dimension": vecs.shape[1]
+                }
+            )
+        
+        return vector_ids
+    
     async def search_similar(
         self,
         query_embedding: List[float],
@@ -58,47 +395,121 @@ class VectorStore:
     ) -> List[Dict[str, Any]]:
         """Search for similar embeddings"""
         
+        q = np.asarray(query_embedding, dtype=np.float32)
+        cache_key = (
+            hashlib.blake2b(q.tobytes(), digest_size=16).digest()
+            + struct.pack("<if", limit, threshold)
+        )
+        
+        cached = self._query_cache.get(cache_key)
+        if cached is not None and cached[0] > time.monotonic():
+            self._query_cache.move_to_end(cache_key)
+            return list(cached[1])
+        
         results = []
         
-        # Simple cosine similarity (would use pgvector in production)
-        for vector_data in self.vectors:
-            similarity = self._cosine_similarity(query_embedding, vector_data["embedding"])
-            
-            if similarity >= threshold:
-                results.append({
-                    "id": vector_data["id"],
-                    "text": vector_data["text"],
-                    "metadata": vector_data["metadata"],
-                    "similarity": similarity
-                })
-        
-        # Sort by similarity and limit results
-        results.sort(key=lambda x: x["similarity"], reverse=True)
-        results = results[:limit]
-        
-        logger.info(
-            f"Vector search completed: {len(results)} results",
-            extra={
-                "event": "vector_search_completed",
-                "total_vectors": len(self.vectors),
-                "results_found": len(results),
-                "threshold": threshold
-            }
-        )
+        # Cosine similarity of the query against every row in one matrix-vector
+        # product (would use pgvector in production)
+        n = len(self._ids)
+        
+        if n and limit > 0 and q.shape == self._embeddings.shape[1:]:
+            q = self._normalize(q)
+            if self._index is not None:
+                rows, sims = self._index.search(q, min(limit, n))
+                results = self._index_results(rows[0], sims[0], threshold)
+            else:
+                sims = self._embeddings[:n] @ q
+                results = self._scan_results(sims, limit, threshold)
         
-        return results
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Vector search completed",
+                extra={
+                    "event": "vector_search_completed",
+                    "total_vectors": n,
+                    "results_found": len(results),
+                    "threshold": threshold
+                }
+            )
+        
+        self._query_cache[cache_key] = (time.monotonic() + QUERY_CACHE_TTL, results)
+        self._query_cache.move_to_end(cache_key)
+        if len(self._query_cache) > QUERY_CACHE_MAXSIZE:
+            self._query_cache.popitem(last=False)
+        
+        return list(results)
     
-    def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """Calculate cosine similarity between two vectors"""
+    async def search_similar_batch(
+        self,
+        query_embeddings: List[List[float]],
+        limit: int = 5,
+        threshold: float = 0.8
+    ) -> List[List[Dict[str, Any]]]:
+        """Search for several queries at once; one result list per query"""
+        
+        n = len(self._ids)
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        
+        if not n or limit <= 0 or queries.ndim != 2 or queries.shape[1:] != self._embeddings.shape[1:]:
+            return [[] for _ in query_embeddings]
+        
+        queries = self._normalize(queries)
+        
+        if self._index is not None:
+            rows, sims = self._index.search(queries, min(limit, n))
+            batch_results = [
+                self._index_results(query_rows, query_sims, threshold)
+                for query_rows, query_sims in zip(rows, sims)
+            ]
+        else:
+            # One matrix-matrix product scores every query against every row
+            sims = queries @ self._embeddings[:n].T
+            batch_results = [self._scan_results(query_sims, limit, threshold) for query_sims in sims]
         
-        if len(vec1) != len(vec2):
-            return 0.0
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Batch vector search completed",
+                extra={
+                    "event": "vector_search_batch_completed",
+                    "total_vectors": n,
+                    "queries": len(batch_results),
+                    "threshold": threshold
+                }
+            )
         
-        dot_product = sum(a * b for a, b in zip(vec1, vec2))
-        magnitude1 = sum(a * a for a in vec1) ** 0.5
-        magnitude2 = sum(b * b for b in vec2) ** 0.5
+        return batch_results
+    
+    def _result(self, row: int, similarity: float) -> Dict[str, Any]:
+        """Materialize one matched row"""
+        return {
+            "id": self._ids[row],
+            "text": self._texts[row],
+            "metadata": self._metadatas[row],
+            "similarity": float(similarity)
+        }
+    
+    def _index_results(self, rows: np.ndarray, sims: np.ndarray, threshold: float) -> List[Dict[str, Any]]:
+        """Results from index neighbours at or above threshold"""
+        return [self._result(row, sim) for row, sim in zip(rows, sims) if sim >= threshold]
+    
+    def _scan_results(self, sims: np.ndarray, limit: int, threshold: float) -> List[Dict[str, Any]]:
+        """Results for the top-k rows of a full similarity scan"""
+        # Only the top-k rows are materialized as dicts
+        return [self._result(row, sims[row]) for row in self._top_k(sims, limit, threshold)]
+    
+    @staticmethod
+    def _top_k(sims: np.ndarray, limit: int, threshold: float) -> np.ndarray:
+        """Indices of the best `limit` scores at or above threshold, best first"""
         
-        if magnitude1 == 0 or magnitude2 == 0:
-            return 0.0
+        # Partition instead of sorting every row; only the k winners get sorted
+        candidates = np.flatnonzero(sims >= threshold)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-sims[candidates], limit - 1)[:limit]]
+        return candidates[np.argsort(-sims[candidates], kind="stable")]
+    
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """L2-normalize along the last axis; zero vectors stay zero and score 0"""
         
-        return dot_product / (magnitude1 * magnitude2)
\ No newline at end of file
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
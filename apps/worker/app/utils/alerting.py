@@ -17,6 +17,11 @@ class AlertSeverity(Enum):
     CRITICAL = "critical"
 
 
+# Severity strings resolved once at import instead of per alert
+_SEVERITY_VALUE: Dict[AlertSeverity, str] = {s: s.value for s in AlertSeverity}
+_SEVERITY_UPPER: Dict[AlertSeverity, str] = {s: s.value.upper() for s in AlertSeverity}
+
+
 class AlertingService:
     """Service for sending alerts"""
     
@@ -30,10 +35,10 @@ class AlertingService:
         """Send alert notification"""
         
         logger.warning(
-            f"ALERT [{severity.value.upper()}]: {title} - {message}",
+            f"ALERT [{_SEVERITY_UPPER[severity]}]: {title} - {message}",
             extra={
                 "event": "alert_sent",
-                "severity": severity.value,
+                "severity": _SEVERITY_VALUE[severity],
                 "title": title,
                 "message": message,
                 "metadata": metadata or {}
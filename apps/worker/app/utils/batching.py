@@ -0,0 +1,93 @@
+"""
+Request batching utilities for bl1nk-agent-builder
+Coalesces concurrent single-item calls into batched calls
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class BatchCoalescer:
+    """
+    Collects items submitted concurrently and hands them to a batch function.
+    
+    A batch is dispatched when max_batch items are waiting or max_wait_ms has
+    passed since the first item arrived, whichever comes first. The batch
+    function must return one result per item, in order.
+    """
+    
+    def __init__(
+        self,
+        fn: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch: int = 64,
+        max_wait_ms: float = 50
+    ):
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue: "asyncio.Queue[Tuple[Any, asyncio.Future]]" = asyncio.Queue()
+        self._worker: Optional[asyncio.Task] = None
+    
+    async def submit(self, item: Any) -> Any:
+        """Queue an item and wait for its result"""
+        
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+    
+    async def close(self):
+        """Stop dispatching and cancel anything still waiting"""
+        
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            future.cancel()
+    
+    async def _run(self):
+        """Gather items into batches and dispatch them"""
+        
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            await self._dispatch(batch)
+    
+    async def _dispatch(self, batch: List[Tuple[Any, asyncio.Future]]):
+        """Run the batch function and resolve each item's future"""
+        
+        try:
+            results = await self.fn([item for item, _ in batch])
+        except Exception as e:
+            logger.error(f"Batch of {len(batch)} items failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,61 @@
+"""
+HTTP caching utilities for bl1nk-agent-builder
+Provides ETag / conditional GET handling for read-mostly endpoints
+"""
+
+import hashlib
+from typing import Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+
+def compute_etag(payload: bytes) -> str:
+    """Compute a strong ETag from the response payload"""
+    return '"' + hashlib.blake2b(payload, digest_size=8).hexdigest() + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check whether the request's If-None-Match header covers the ETag"""
+
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+
+    if if_none_match.strip() == "*":
+        return True
+
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def cached_json_response(
+    request: Request,
+    payload: bytes,
+    etag: Optional[str] = None,
+    cache_control: str = "no-cache"
+) -> Response:
+    """
+    Build a JSON response that honors conditional GETs.
+
+    Args:
+        request: Incoming request (for If-None-Match)
+        payload: Serialized JSON body
+        etag: Precomputed ETag; computed from the payload if omitted
+        cache_control: Cache-Control header value
+
+    Returns:
+        304 response with no body if the client copy is current, otherwise the payload
+    """
+
+    if etag is None:
+        etag = compute_etag(payload)
+
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(payload, media_type="application/json", headers=headers)
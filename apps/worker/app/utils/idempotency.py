@@ -3,16 +3,80 @@ Idempotency utilities for bl1nk-agent-builder
 Ensures that duplicate requests don't create duplicate operations
 """
 
+import asyncio
 import logging
 import hashlib
 import json
+import unicodedata
 from typing import Optional, Dict, Any, Tuple
 
-from app.database.connection import fetch_one, execute_query
+import orjson
+
+from app.database.connection import fetch_one, execute_query, command_rowcount
+from app.database.redis import acquire_idempotency_key, set_idempotency_result
 from app.config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Payload hashes are stored as "<scheme>:<hexdigest>"; unprefixed values are
+# legacy SHA-256 digests written before payloads were canonicalized
+PAYLOAD_HASH_PREFIX = "c14n-b2:"
+
+# Integral floats inside this range are hashed as ints, so 1.0 and 1 match
+_MAX_EXACT_FLOAT_INT = 2 ** 53
+
+# Expired keys are deleted in bounded batches to keep each transaction short
+IDEMPOTENCY_CLEANUP_BATCH_SIZE = 10_000
+
+SKILL_INVOCATION_TTL = 3600  # 1 hour for skill invocations
+
+# Fire-and-forget Postgres writes; referenced here so they are not collected mid-flight
+_background_writes: set = set()
+
+
+def _finish_background_write(task: asyncio.Task):
+    """Drop a finished background write; failures were already logged"""
+    _background_writes.discard(task)
+    if not task.cancelled():
+        task.exception()
+
+
+def _canonicalize(value: Any) -> Any:
+    """
+    Normalize a payload so semantically equal values hash the same.
+    
+    Strings (including keys) are NFC-normalized, integral floats become ints
+    and tuples become lists; key order is handled by OPT_SORT_KEYS at every depth.
+    """
+    if isinstance(value, str):
+        return unicodedata.normalize("NFC", value)
+    if isinstance(value, dict):
+        return {
+            unicodedata.normalize("NFC", str(key)): _canonicalize(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [_canonicalize(item) for item in value]
+    if isinstance(value, float) and value.is_integer() and abs(value) < _MAX_EXACT_FLOAT_INT:
+        return int(value)
+    return value
+
+
+def _hash_payload(payload: Dict[str, Any]) -> str:
+    """Content hash of a canonicalized payload for idempotency checks"""
+    canonical = orjson.dumps(_canonicalize(payload), option=orjson.OPT_SORT_KEYS)
+    return PAYLOAD_HASH_PREFIX + hashlib.blake2b(canonical, digest_size=32).hexdigest()
+
+
+def _payload_hash_matches(stored_hash: str, payload: Dict[str, Any]) -> bool:
+    """Compare a payload against a stored hash of either scheme"""
+    
+    if stored_hash.startswith(PAYLOAD_HASH_PREFIX):
+        return stored_hash == _hash_payload(payload)
+    
+    legacy = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+    return stored_hash == legacy
+
 
 async def get_or_create_task(
     source: str, 
@@ -33,21 +97,9 @@ async def get_or_create_task(
     """
     
     try:
-        # Check for existing task
-        existing_task = await fetch_one(
-            "SELECT id FROM tasks WHERE source = $1 AND external_id = $2",
-            source,
-            external_id
-        )
-        
-        if existing_task:
-            logger.debug(
-                f"Found existing task for {source}:{external_id} - ID: {existing_task['id']}"
-            )
-            return existing_task['id']
-        
-        # Create new task
-        task_id = await execute_query(
+        # Insert or touch in one round-trip; concurrent duplicates all get the
+        # same row, and xmax = 0 only for the insert that created it
+        task = await fetch_one(
             """
             INSERT INTO tasks (
                 source, 
@@ -57,25 +109,25 @@ async def get_or_create_task(
                 created_at,
                 updated_at
             ) VALUES ($1, $2, $3, 'pending', NOW(), NOW())
-            RETURNING id
+            ON CONFLICT (source, external_id)
+            DO UPDATE SET updated_at = NOW()
+            RETURNING id, (xmax = 0) AS created
             """,
             source,
             external_id,
-            json.dumps(payload)
+            orjson.dumps(payload).decode()
         )
         
-        # Extract ID from result
-        # execute_query returns string like "INSERT 0 123"
-        if isinstance(task_id, str) and " " in task_id:
-            task_id = int(task_id.split()[-1])
-        elif isinstance(task_id, int):
-            pass
-        else:
-            raise ValueError(f"Unexpected task_id format: {task_id}")
+        task_id = task['id']
         
-        logger.info(
-            f"Created new task for {source}:{external_id} - ID: {task_id}"
-        )
+        if task['created']:
+            logger.info(
+                "Created new task for %s:%s - ID: %s", source, external_id, task_id
+            )
+        else:
+            logger.debug(
+                "Found existing task for %s:%s - ID: %s", source, external_id, task_id
+            )
         
         return task_id
         
@@ -104,11 +156,6 @@ async def check_idempotency_key(
     """
     
     try:
-        # Create a hash of the payload for storage
-        payload_hash = hashlib.sha256(
-            json.dumps(payload, sort_keys=True).encode()
-        ).hexdigest()
-        
         # Check for existing idempotency record
         existing = await fetch_one(
             """
@@ -121,12 +168,12 @@ async def check_idempotency_key(
         )
         
         if existing:
-            # Verify payload hash matches
-            if existing['payload_hash'] == payload_hash:
+            # Verify payload hash matches; only hashed when a record exists
+            if _payload_hash_matches(existing['payload_hash'], payload):
                 logger.debug(
-                    f"Found duplicate operation: {operation_type}:{idempotency_key}"
+                    "Found duplicate operation: %s:%s", operation_type, idempotency_key
                 )
-                return True, json.loads(existing['result_data'])
+                return True, orjson.loads(existing['result_data'])
             else:
                 logger.warning(
                     f"Idempotency key {idempotency_key} exists with different payload"
@@ -140,6 +187,71 @@ async def check_idempotency_key(
         raise
 
 
+async def claim_idempotency_key(
+    operation_type: str,
+    idempotency_key: str,
+    payload: Dict[str, Any],
+    ttl_seconds: int = 86400  # 24 hours default
+) -> Tuple[bool, Optional[Dict[str, Any]]]:
+    """
+    Atomically check and claim an idempotency key in a single round-trip.
+    
+    Unlike check_idempotency_key, the key is reserved for this caller when it
+    is new, so two concurrent requests cannot both proceed.
+    
+    Args:
+        operation_type: Type of operation
+        idempotency_key: Unique key for the operation
+        payload: Operation payload
+        ttl_seconds: Time to live in seconds
+    
+    Returns:
+        Tuple of (is_duplicate, result_data)
+        - is_duplicate: False if this caller claimed the key
+        - result_data: Stored result if duplicate; None while the first
+          operation is still in progress
+    """
+    
+    try:
+        existing = await fetch_one(
+            """
+            INSERT INTO idempotency_keys (
+                operation_type,
+                idempotency_key,
+                payload_hash,
+                created_at,
+                expires_at
+            ) VALUES ($1, $2, $3, NOW(), NOW() + make_interval(secs => $4))
+            ON CONFLICT (operation_type, idempotency_key)
+            DO UPDATE SET updated_at = NOW()
+            RETURNING (xmax = 0) AS inserted, result_data, payload_hash
+            """,
+            operation_type,
+            idempotency_key,
+            _hash_payload(payload),
+            ttl_seconds
+        )
+        
+        if existing['inserted']:
+            return False, None
+        
+        if not _payload_hash_matches(existing['payload_hash'], payload):
+            logger.warning(
+                f"Idempotency key {idempotency_key} exists with different payload"
+            )
+            raise ValueError("Idempotency key exists with different payload")
+        
+        logger.debug(
+            "Found duplicate operation: %s:%s", operation_type, idempotency_key
+        )
+        result_data = existing['result_data']
+        return True, orjson.loads(result_data) if result_data else None
+        
+    except Exception as e:
+        logger.error(f"Failed to claim idempotency key: {e}")
+        raise
+
+
 async def store_idempotency_result(
     operation_type: str,
     idempotency_key: str,
@@ -159,9 +271,7 @@ async def store_idempotency_result(
     """
     
     try:
-        payload_hash = hashlib.sha256(
-            json.dumps(payload, sort_keys=True).encode()
-        ).hexdigest()
+        payload_hash = _hash_payload(payload)
         
         await execute_query(
             """
@@ -172,24 +282,23 @@ async def store_idempotency_result(
                 result_data,
                 created_at,
                 expires_at
-            ) VALUES ($1, $2, $3, $4, NOW(), NOW() + INTERVAL '%s seconds')
+            ) VALUES ($1, $2, $3, $4, NOW(), NOW() + make_interval(secs => $5))
             ON CONFLICT (operation_type, idempotency_key) 
             DO UPDATE SET 
                 payload_hash = $3,
                 result_data = $4,
                 updated_at = NOW(),
-                expires_at = NOW() + INTERVAL '%s seconds'
+                expires_at = NOW() + make_interval(secs => $5)
             """,
             operation_type,
             idempotency_key,
             payload_hash,
-            json.dumps(result_data),
-            ttl_seconds,
+            orjson.dumps(result_data).decode(),
             ttl_seconds
         )
         
         logger.debug(
-            f"Stored idempotency result: {operation_type}:{idempotency_key}"
+            "Stored idempotency result: %s:%s", operation_type, idempotency_key
         )
         
     except Exception as e:
@@ -206,20 +315,29 @@ async def cleanup_expired_idempotency_keys() -> int:
     """
     
     try:
-        result = await execute_query(
-            """
-            DELETE FROM idempotency_keys 
-            WHERE expires_at < NOW()
-            """
-        )
+        deleted_count = 0
         
-        # Extract count from result
-        if isinstance(result, str) and " " in result:
-            deleted_count = int(result.split()[-1])
-        else:
-            deleted_count = 0
+        while True:
+            # Oldest expired rows first, via the expires_at index
+            result = await execute_query(
+                """
+                DELETE FROM idempotency_keys 
+                WHERE ctid IN (
+                    SELECT ctid FROM idempotency_keys
+                    WHERE expires_at < NOW()
+                    ORDER BY expires_at
+                    LIMIT $1
+                )
+                """,
+                IDEMPOTENCY_CLEANUP_BATCH_SIZE
+            )
+            
+            batch_count = command_rowcount(result)
+            deleted_count += batch_count
+            if batch_count < IDEMPOTENCY_CLEANUP_BATCH_SIZE:
+                break
         
-        logger.info(f"Cleaned up {deleted_count} expired idempotency keys")
+        logger.info("Cleaned up %d expired idempotency keys", deleted_count)
         
         return deleted_count
         
@@ -266,7 +384,7 @@ async def check_skill_invocation_idempotency(
     inputs: Dict[str, Any]
 ) -> Tuple[bool, Optional[Dict[str, Any]]]:
     """
-    Check if a skill invocation has already been processed.
+    Check if a skill invocation has already been processed, claiming it if not.
     
     Args:
         skill_id: ID of the skill
@@ -278,12 +396,33 @@ async def check_skill_invocation_idempotency(
     """
     
     operation_type = f"skill_invoke_{skill_id}"
+    payload_hash = _hash_payload(inputs)
     
-    return await check_idempotency_key(
-        operation_type=operation_type,
-        idempotency_key=request_id,
-        payload=inputs
-    )
+    # Redis first; Postgres is the fallback when Redis is unavailable
+    try:
+        acquired, stored_hash, result = await acquire_idempotency_key(
+            operation_type, request_id, payload_hash, SKILL_INVOCATION_TTL
+        )
+    except Exception as e:
+        logger.warning(f"Redis idempotency check failed, falling back to database: {e}")
+        return await claim_idempotency_key(
+            operation_type=operation_type,
+            idempotency_key=request_id,
+            payload=inputs,
+            ttl_seconds=SKILL_INVOCATION_TTL
+        )
+    
+    if acquired:
+        return False, None
+    
+    if stored_hash != payload_hash:
+        logger.warning(
+            f"Idempotency key {request_id} exists with different payload"
+        )
+        raise ValueError("Idempotency key exists with different payload")
+    
+    logger.debug("Found duplicate operation: %s:%s", operation_type, request_id)
+    return True, result
 
 
 async def store_skill_invocation_result(
@@ -304,13 +443,18 @@ async def store_skill_invocation_result(
     
     operation_type = f"skill_invoke_{skill_id}"
     
-    await store_idempotency_result(
+    await set_idempotency_result(operation_type, request_id, result, SKILL_INVOCATION_TTL)
+    
+    # Durable copy for audit, off the request path
+    write = asyncio.create_task(store_idempotency_result(
         operation_type=operation_type,
         idempotency_key=request_id,
         payload=inputs,
         result_data=result,
-        ttl_seconds=3600  # 1 hour for skill invocations
-    )
+        ttl_seconds=SKILL_INVOCATION_TTL
+    ))
+    _background_writes.add(write)
+    write.add_done_callback(_finish_background_write)
 
 
 # Database schema for idempotency (add to migrations if not exists)
@@ -5,9 +5,14 @@ Implements retry logic with exponential backoff and jitter
 
 import asyncio
 import logging
+import math
 import random
+import threading
 import time
-from typing import Callable, Any, Optional, Union, Dict, List
+import weakref
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Any, Optional, Union, Dict, List, Generator, NamedTuple, Tuple
 from functools import wraps
 from enum import Enum
 
@@ -15,12 +20,69 @@ from app.config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Retry sleeps are rounded up to this granularity (seconds) so that waiters
+# due in the same slot share a single event loop timer
+RETRY_TIMER_RESOLUTION = 0.01
+
 
 class RetryStrategy(Enum):
     """Retry strategies"""
     FIXED = "fixed"
     EXPONENTIAL = "exponential"
     LINEAR = "linear"
+    DECORRELATED_JITTER = "decorrelated_jitter"
+    FULL_JITTER = "full_jitter"
+
+
+# Per-thread jitter generators, so retrying threads never share the global RNG
+_rng_local = threading.local()
+
+
+def _rand() -> float:
+    """Uniform float in [0, 1) from this thread's own generator"""
+    
+    try:
+        return _rng_local.random()
+    except AttributeError:
+        _rng_local.random = random.Random().random
+        return _rng_local.random()
+
+
+# Un-jittered, uncapped delay after attempt n for each strategy, as (base_delay, n) -> seconds
+_DELAY_FNS: Dict[RetryStrategy, Callable[[float, int], float]] = {
+    RetryStrategy.FIXED: lambda base, attempt: base,
+    RetryStrategy.LINEAR: lambda base, attempt: base * attempt,
+    RetryStrategy.EXPONENTIAL: lambda base, attempt: base * (1 << (attempt - 1)),
+    RetryStrategy.FULL_JITTER: lambda base, attempt: base * (1 << (attempt - 1)),
+    # Decorrelated jitter grows from the previous delay; base_delay is its floor
+    RetryStrategy.DECORRELATED_JITTER: lambda base, attempt: base,
+}
+
+
+def get_retry_after(exception: Exception) -> Optional[float]:
+    """Extract a Retry-After delay in seconds from an HTTP error, if present"""
+    
+    response = getattr(exception, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    
+    # Either delta-seconds or an HTTP date
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
 
 
 class RetryConfig:
@@ -35,7 +97,9 @@ class RetryConfig:
         jitter: bool = True,
         jitter_factor: float = 0.1,
         retryable_exceptions: Optional[List[type]] = None,
-        non_retryable_exceptions: Optional[List[type]] = None
+        non_retryable_exceptions: Optional[List[type]] = None,
+        respect_retry_after: bool = True,
+        log_tracebacks: bool = True
     ):
         self.max_attempts = max_attempts
         self.base_delay = base_delay
@@ -45,42 +109,91 @@ class RetryConfig:
         self.jitter_factor = jitter_factor
         self.retryable_exceptions = retryable_exceptions or [Exception]
         self.non_retryable_exceptions = non_retryable_exceptions or []
+        self.respect_retry_after = respect_retry_after
+        self.log_tracebacks = log_tracebacks
+        
+        # Strategy dispatch is resolved once instead of compared on every delay
+        self._schedule_fn = _DELAY_FNS[strategy]
+        if strategy == RetryStrategy.DECORRELATED_JITTER:
+            self._delay_fn = self._decorrelated_delay
+        elif strategy == RetryStrategy.FULL_JITTER:
+            self._delay_fn = self._full_jitter_delay
+        elif jitter:
+            self._delay_fn = self._jittered_delay
+        else:
+            self._delay_fn = self._unjittered_delay
+        
+        # Tuple lets should_retry do one isinstance call instead of a Python loop
+        self._non_retryable = tuple(self.non_retryable_exceptions)
+        
+        # Un-jittered delay before attempt 2..max_attempts, computed once per config
+        self._base_delays = [
+            self._schedule_delay(attempt) for attempt in range(1, max(max_attempts, 1) + 1)
+        ]
+    
+    def _schedule_delay(self, attempt: int) -> float:
+        """Un-jittered delay after the given attempt, capped at max_delay"""
+        
+        return min(self._schedule_fn(self.base_delay, attempt), self.max_delay)
     
     def should_retry(self, exception: Exception, attempt: int) -> bool:
         """Determine if an exception should be retried"""
         
         # Check if this is a non-retryable exception
-        for non_retryable in self.non_retryable_exceptions:
-            if isinstance(exception, non_retryable):
-                return False
-        
-        # Check if this is a retryable exception
-        for retryable in self.retryable_exceptions:
-            if isinstance(exception, retryable):
-                return attempt < self.max_attempts
+        if self._non_retryable and isinstance(exception, self._non_retryable):
+            return False
         
         # Default: retry all exceptions if not explicitly marked as non-retryable
         return attempt < self.max_attempts
     
-    def calculate_delay(self, attempt: int) -> float:
+    def calculate_delay(
+        self,
+        attempt: int,
+        previous_delay: Optional[float] = None,
+        exception: Optional[Exception] = None
+    ) -> float:
         """Calculate delay for the given attempt"""
         
-        if self.strategy == RetryStrategy.FIXED:
-            delay = self.base_delay
+        # A server-provided Retry-After wins over the local schedule
+        if self.respect_retry_after and exception is not None:
+            retry_after = get_retry_after(exception)
+            if retry_after is not None:
+                return min(retry_after, self.max_delay)
         
-        elif self.strategy == RetryStrategy.LINEAR:
-            delay = self.base_delay * attempt
+        return self._delay_fn(attempt, previous_delay)
+    
+    def _base_delay_for(self, attempt: int) -> float:
+        """Capped un-jittered delay, from the precomputed table when possible"""
         
-        elif self.strategy == RetryStrategy.EXPONENTIAL:
-            delay = self.base_delay * (2 ** (attempt - 1))
+        if attempt <= len(self._base_delays):
+            return self._base_delays[attempt - 1]
+        return self._schedule_delay(attempt)
+    
+    def _decorrelated_delay(self, attempt: int, previous_delay: Optional[float]) -> float:
+        """Decorrelated jitter: uniform in [base_delay, 3 * previous delay]"""
         
-        else:
-            delay = self.base_delay
+        # Already randomized; spreads concurrent retriers apart
+        upper = (previous_delay or self.base_delay) * 3
+        return min(self.max_delay, self.base_delay + (upper - self.base_delay) * _rand())
+    
+    def _full_jitter_delay(self, attempt: int, previous_delay: Optional[float]) -> float:
+        """Full jitter: uniform over [0, capped exponential delay] (AWS)"""
+        
+        return self._base_delay_for(attempt) * _rand()
+    
+    def _unjittered_delay(self, attempt: int, previous_delay: Optional[float]) -> float:
+        """Scheduled delay without jitter, floored and capped"""
+        
+        return min(max(0.1, self._base_delay_for(attempt)), self.max_delay)
+    
+    def _jittered_delay(self, attempt: int, previous_delay: Optional[float]) -> float:
+        """Scheduled delay with symmetric jitter, floored and capped"""
+        
+        delay = self._base_delay_for(attempt)
         
-        # Apply jitter if enabled
-        if self.jitter:
-            jitter_range = delay * self.jitter_factor
-            delay += random.uniform(-jitter_range, jitter_range)
+        # Apply jitter
+        jitter_range = delay * self.jitter_factor
+        delay += (_rand() - 0.5) * 2.0 * jitter_range
         
         # Ensure delay is positive
         delay = max(0.1, delay)
@@ -89,6 +202,71 @@ class RetryConfig:
         return min(delay, self.max_delay)
 
 
+class _RetryScheduler:
+    """Coalesces retry sleeps on one event loop into a timer per time slot"""
+    
+    def __init__(self, resolution: float = RETRY_TIMER_RESOLUTION):
+        self.resolution = resolution
+        self._slots: Dict[int, List[asyncio.Future]] = {}
+    
+    async def sleep(self, delay: float) -> None:
+        """Sleep for at least delay seconds, sharing the timer with other waiters"""
+        
+        if delay <= 0:
+            await asyncio.sleep(0)
+            return
+        
+        loop = asyncio.get_running_loop()
+        slot = math.ceil((loop.time() + delay) / self.resolution)
+        
+        waiters = self._slots.get(slot)
+        if waiters is None:
+            waiters = self._slots[slot] = []
+            loop.call_at(slot * self.resolution, self._wake, slot)
+        
+        waiter = loop.create_future()
+        waiters.append(waiter)
+        await waiter
+    
+    def _wake(self, slot: int) -> None:
+        """Release every waiter registered on a slot"""
+        
+        for waiter in self._slots.pop(slot, ()):
+            # Cancelled sleepers are already done
+            if not waiter.done():
+                waiter.set_result(None)
+
+
+# One scheduler per event loop; entries go away with their loop
+_schedulers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _RetryScheduler]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _retry_sleep(delay: float):
+    """Sleep on the running loop's shared retry scheduler"""
+    
+    loop = asyncio.get_running_loop()
+    scheduler = _schedulers.get(loop)
+    if scheduler is None:
+        scheduler = _schedulers[loop] = _RetryScheduler()
+    return scheduler.sleep(delay)
+
+
+def _event_loop_running() -> bool:
+    """Check whether an asyncio event loop is running in the current thread"""
+    
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+# Shared default so callers that omit config don't rebuild the delay table per call
+_DEFAULT_CONFIG = RetryConfig()
+
+
 class RetryResult:
     """Result of a retry operation"""
     
@@ -107,146 +285,360 @@ class RetryResult:
         self.total_delay = total_delay
 
 
-async def retry_async(
-    func: Callable,
-    *args,
-    config: Optional[RetryConfig] = None,
-    on_retry: Optional[Callable] = None,
-    **kwargs
-) -> RetryResult:
+class _RetryWait(NamedTuple):
+    """Driver command: notify on_retry, sleep for delay, then call again"""
+    attempt: int
+    exception: Exception
+    delay: float
+
+
+def _retry_driver(
+    fn_name: str,
+    config: RetryConfig
+) -> Generator[Optional[_RetryWait], Tuple[bool, Any], RetryResult]:
     """
-    Retry an async function with exponential backoff
+    Retry state machine shared by retry_async and retry_sync
     
-    Args:
-        func: Async function to retry
-        *args: Positional arguments for the function
-        config: Retry configuration
-        on_retry: Callback function to call on each retry
-        **kwargs: Keyword arguments for the function
-    
-    Returns:
-        RetryResult with success status and result/exception
+    Send (True, result) or (False, exception) for each call; the driver yields
+    a _RetryWait when another attempt should follow and returns the final
+    RetryResult through StopIteration.
     """
     
-    if config is None:
-        config = RetryConfig()
-    
     last_exception = None
+    exc_type = exc_str = None
     total_delay = 0.0
-    attempts = 0
+    delay = None
+    attempt = 1
     
-    for attempt in range(1, config.max_attempts + 1):
-        attempts = attempt
-        
-        try:
-            # Execute the function
-            result = await func(*args, **kwargs)
-            
-            logger.debug(
-                f"Function succeeded on attempt {attempt}",
-                extra={
-                    "event": "retry_success",
-                    "function": func.__name__,
-                    "attempt": attempt,
-                    "attempts": attempts
-                }
-            )
+    # Hoisted out of the loop; the config is not expected to change mid-retry
+    max_attempts = config.max_attempts
+    should_retry = config.should_retry
+    calculate_delay = config.calculate_delay
+    
+    # There is always at least one attempt, even if max_attempts < 1
+    succeeded, value = yield None
+    
+    while True:
+        if succeeded:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    f"Function succeeded on attempt {attempt}",
+                    extra={
+                        "event": "retry_success",
+                        "function": fn_name,
+                        "attempt": attempt,
+                        "attempts": attempt
+                    }
+                )
             
             return RetryResult(
                 success=True,
-                result=result,
+                result=value,
                 attempts=attempt,
                 total_delay=total_delay
             )
-            
-        except Exception as e:
-            last_exception = e
-            
-            # Check if we should retry
-            if not config.should_retry(e, attempt):
+        
+        last_exception = e = value
+        # Every failure ends in the retry warning or the exhausted error, so
+        # stringify once here and reuse it across the log records below
+        exc_type = type(e).__name__
+        exc_str = str(e)
+        
+        # If this is the last attempt, don't delay or classify the exception
+        if attempt >= max_attempts:
+            if logger.isEnabledFor(logging.DEBUG):
                 logger.debug(
-                    f"Function failed with non-retryable exception on attempt {attempt}",
+                    f"Function failed on final attempt {attempt}",
                     extra={
-                        "event": "retry_non_retryable",
-                        "function": func.__name__,
+                        "event": "retry_final_attempt",
+                        "function": fn_name,
                         "attempt": attempt,
-                        "exception": str(e),
-                        "exception_type": type(e).__name__
+                        "exception": exc_str,
+                        "exception_type": exc_type
                     }
                 )
-                break
-            
-            # If this is the last attempt, don't delay
-            if attempt == config.max_attempts:
+            break
+        
+        # Check if we should retry
+        if not should_retry(e, attempt):
+            if logger.isEnabledFor(logging.DEBUG):
                 logger.debug(
-                    f"Function failed on final attempt {attempt}",
+                    f"Function failed with non-retryable exception on attempt {attempt}",
                     extra={
-                        "event": "retry_final_attempt",
-                        "function": func.__name__,
+                        "event": "retry_non_retryable",
+                        "function": fn_name,
                         "attempt": attempt,
-                        "exception": str(e),
-                        "exception_type": type(e).__name__
+                        "exception": exc_str,
+                        "exception_type": exc_type
                     }
                 )
-                break
-            
-            # Calculate delay
-            delay = config.calculate_delay(attempt)
-            total_delay += delay
-            
-            # Log the retry
+            break
+        
+        # Calculate delay
+        delay = calculate_delay(attempt, delay, e)
+        total_delay += delay
+        
+        # Log the retry
+        if logger.isEnabledFor(logging.WARNING):
             logger.warning(
                 f"Function failed on attempt {attempt}, retrying in {delay:.2f}s",
                 extra={
                     "event": "retry_attempt",
-                    "function": func.__name__,
+                    "function": fn_name,
                     "attempt": attempt,
                     "next_attempt": attempt + 1,
                     "delay": delay,
-                    "exception": str(e),
-                    "exception_type": type(e).__name__
+                    "exception": exc_str,
+                    "exception_type": exc_type
                 }
             )
-            
-            # Call retry callback if provided
-            if on_retry:
-                try:
-                    await on_retry(attempt, e, delay)
-                except Exception as callback_error:
-                    logger.warning(
-                        f"Retry callback failed: {callback_error}",
-                        extra={
-                            "event": "retry_callback_error",
-                            "function": func.__name__,
-                            "callback_error": str(callback_error)
-                        }
-                    )
-            
-            # Wait before retrying
-            await asyncio.sleep(delay)
+        
+        wait = _RetryWait(attempt, e, delay)
+        attempt += 1
+        succeeded, value = yield wait
     
     # All attempts failed
     logger.error(
-        f"Function failed after {attempts} attempts",
+        f"Function failed after {attempt} attempts",
         extra={
             "event": "retry_exhausted",
-            "function": func.__name__,
-            "attempts": attempts,
+            "function": fn_name,
+            "attempts": attempt,
             "total_delay": total_delay,
-            "final_exception": str(last_exception),
-            "exception_type": type(last_exception).__name__
+            "final_exception": exc_str,
+            "exception_type": exc_type
         },
-        exc_info=True
+        exc_info=last_exception if config.log_tracebacks else None
     )
     
     return RetryResult(
         success=False,
         exception=last_exception,
-        attempts=attempts,
+        attempts=attempt,
         total_delay=total_delay
     )
 
 
+def _first_try_result(fn_name: str, result: Any) -> RetryResult:
+    """Result for a call that succeeded on its first attempt"""
+    
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Function succeeded on attempt 1",
+            extra={
+                "event": "retry_success",
+                "function": fn_name,
+                "attempt": 1,
+                "attempts": 1
+            }
+        )
+    
+    return RetryResult(success=True, result=result, attempts=1)
+
+
+def _log_callback_error(fn_name: str, callback_error: Exception) -> None:
+    """Log a failing on_retry callback without aborting the retry loop"""
+    
+    if logger.isEnabledFor(logging.WARNING):
+        logger.warning(
+            f"Retry callback failed: {callback_error}",
+            extra={
+                "event": "retry_callback_error",
+                "function": fn_name,
+                "callback_error": str(callback_error)
+            }
+        )
+
+
+class RetryEvent(NamedTuple):
+    """A single retry reported through BatchedRetryReporter"""
+    function: str
+    attempt: int
+    exception: Exception
+    delay: float
+
+
+class BatchedRetryReporter:
+    """
+    on_retry sink that hands retry events to one handler in batches
+    
+    Pass an instance as retry_async's on_retry: each retry only appends an
+    event, and the handler is awaited with a list of events once max_batch
+    events are pending or flush_interval seconds after the first one.
+    """
+    
+    def __init__(
+        self,
+        handler: Callable,
+        max_batch: int = 100,
+        flush_interval: float = 0.05
+    ):
+        self.handler = handler
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._pending: List[RetryEvent] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._deliveries: set = set()
+    
+    def report(self, attempt: int, exception: Exception, delay: float, function: str) -> None:
+        """Queue a retry event; must be called from the event loop"""
+        
+        self._pending.append(RetryEvent(function, attempt, exception, delay))
+        
+        if len(self._pending) >= self.max_batch:
+            self._start_delivery()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.flush_interval, self._start_delivery
+            )
+    
+    async def flush(self) -> None:
+        """Deliver pending events and wait for in-flight deliveries"""
+        
+        self._start_delivery()
+        if self._deliveries:
+            await asyncio.gather(*self._deliveries, return_exceptions=True)
+    
+    def _start_delivery(self) -> None:
+        """Hand the pending batch to the handler in a background task"""
+        
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        
+        if not self._pending:
+            return
+        
+        batch, self._pending = self._pending, []
+        delivery = asyncio.get_running_loop().create_task(self._deliver(batch))
+        self._deliveries.add(delivery)
+        delivery.add_done_callback(self._deliveries.discard)
+    
+    async def _deliver(self, batch: List[RetryEvent]) -> None:
+        """Await the handler with one batch, logging instead of raising"""
+        
+        try:
+            await self.handler(batch)
+        except Exception as handler_error:
+            logger.warning(
+                f"Batched retry handler failed: {handler_error}",
+                extra={
+                    "event": "retry_callback_error",
+                    "batch_size": len(batch),
+                    "callback_error": str(handler_error)
+                }
+            )
+
+
+async def _notify_retry(on_retry: Optional[Callable], wait: _RetryWait, fn_name: str) -> None:
+    """Run an async on_retry callback; a batched reporter only enqueues"""
+    
+    if on_retry is None:
+        return
+    
+    if isinstance(on_retry, BatchedRetryReporter):
+        on_retry.report(wait.attempt, wait.exception, wait.delay, fn_name)
+        return
+    
+    try:
+        await on_retry(wait.attempt, wait.exception, wait.delay)
+    except Exception as callback_error:
+        _log_callback_error(fn_name, callback_error)
+
+
+async def retry_async(
+    func: Callable,
+    *args,
+    config: Optional[RetryConfig] = None,
+    on_retry: Optional[Callable] = None,
+    **kwargs
+) -> RetryResult:
+    """
+    Retry an async function with exponential backoff
+    
+    Args:
+        func: Async function to retry
+        *args: Positional arguments for the function
+        config: Retry configuration
+        on_retry: Callback function to call on each retry, or a
+            BatchedRetryReporter to coalesce retry events
+        **kwargs: Keyword arguments for the function
+    
+    Returns:
+        RetryResult with success status and result/exception
+    """
+    
+    if config is None:
+        config = _DEFAULT_CONFIG
+    
+    fn_name = getattr(func, "__name__", repr(func))
+    
+    # Happy path: a first-try success never builds the retry state machine
+    try:
+        result = await func(*args, **kwargs)
+    except Exception as e:
+        outcome = (False, e)
+    else:
+        return _first_try_result(fn_name, result)
+    
+    return await _retry_async_after_failure(func, args, kwargs, config, on_retry, fn_name, outcome)
+
+
+async def _retry_async_raw(
+    func: Callable,
+    args: tuple,
+    kwargs: Dict[str, Any],
+    config: RetryConfig,
+    on_retry: Optional[Callable]
+) -> Any:
+    """retry_async for the decorators: returns the value or raises, no RetryResult"""
+    
+    try:
+        return await func(*args, **kwargs)
+    except Exception as e:
+        fn_name = getattr(func, "__name__", repr(func))
+        retry_result = await _retry_async_after_failure(
+            func, args, kwargs, config, on_retry, fn_name, (False, e)
+        )
+    
+    if not retry_result.success:
+        raise retry_result.exception
+    return retry_result.result
+
+
+async def _retry_async_after_failure(
+    func: Callable,
+    args: tuple,
+    kwargs: Dict[str, Any],
+    config: RetryConfig,
+    on_retry: Optional[Callable],
+    fn_name: str,
+    outcome: Tuple[bool, Any]
+) -> RetryResult:
+    """Drive the remaining async attempts after a failed first attempt"""
+    
+    driver = _retry_driver(fn_name, config)
+    driver.send(None)
+    
+    while True:
+        try:
+            wait = driver.send(outcome)
+        except StopIteration as done:
+            return done.value
+        
+        # Call retry callback if provided
+        if on_retry:
+            await _notify_retry(on_retry, wait, fn_name)
+        
+        # Wait before retrying
+        await _retry_sleep(wait.delay)
+        
+        try:
+            outcome = (True, await func(*args, **kwargs))
+        except Exception as e:
+            outcome = (False, e)
+
+
 def retry_sync(
     func: Callable,
     *args,
@@ -266,125 +658,161 @@ def retry_sync(
     
     Returns:
         RetryResult with success status and result/exception
+    
+    Raises:
+        RuntimeError: If called while an event loop is running in this thread,
+            where time.sleep would stall every other coroutine
     """
     
+    if _event_loop_running():
+        raise RuntimeError("retry_sync called from async context; use retry_async")
+    
     if config is None:
-        config = RetryConfig()
+        config = _DEFAULT_CONFIG
     
-    last_exception = None
-    total_delay = 0.0
-    attempts = 0
+    fn_name = getattr(func, "__name__", repr(func))
+    
+    # Happy path: a first-try success never builds the retry state machine
+    try:
+        result = func(*args, **kwargs)
+    except Exception as e:
+        outcome = (False, e)
+    else:
+        return _first_try_result(fn_name, result)
+    
+    return _retry_sync_after_failure(func, args, kwargs, config, on_retry, fn_name, outcome)
+
+
+def _retry_sync_raw(
+    func: Callable,
+    args: tuple,
+    kwargs: Dict[str, Any],
+    config: RetryConfig,
+    on_retry: Optional[Callable]
+) -> Any:
+    """retry_sync for the decorators: returns the value or raises, no RetryResult"""
+    
+    if _event_loop_running():
+        raise RuntimeError("retry_sync called from async context; use retry_async")
+    
+    try:
+        return func(*args, **kwargs)
+    except Exception as e:
+        fn_name = getattr(func, "__name__", repr(func))
+        retry_result = _retry_sync_after_failure(
+            func, args, kwargs, config, on_retry, fn_name, (False, e)
+        )
+    
+    if not retry_result.success:
+        raise retry_result.exception
+    return retry_result.result
+
+
+def _retry_sync_after_failure(
+    func: Callable,
+    args: tuple,
+    kwargs: Dict[str, Any],
+    config: RetryConfig,
+    on_retry: Optional[Callable],
+    fn_name: str,
+    outcome: Tuple[bool, Any]
+) -> RetryResult:
+    """Drive the remaining sync attempts after a failed first attempt"""
+    
+    driver = _retry_driver(fn_name, config)
+    driver.send(None)
     
-    for attempt in range(1, config.max_attempts + 1):
-        attempts = attempt
+    while True:
+        try:
+            wait = driver.send(outcome)
+        except StopIteration as done:
+            return done.value
+        
+        # Call retry callback if provided
+        if on_retry:
+            try:
+                on_retry(wait.attempt, wait.exception, wait.delay)
+            except Exception as callback_error:
+                _log_callback_error(fn_name, callback_error)
+        
+        # Wait before retrying
+        time.sleep(wait.delay)
         
         try:
-            # Execute the function
-            result = func(*args, **kwargs)
-            
-            logger.debug(
-                f"Function succeeded on attempt {attempt}",
-                extra={
-                    "event": "retry_success",
-                    "function": func.__name__,
-                    "attempt": attempt,
-                    "attempts": attempts
-                }
-            )
-            
-            return RetryResult(
-                success=True,
-                result=result,
-                attempts=attempt,
-                total_delay=total_delay
-            )
-            
+            outcome = (True, func(*args, **kwargs))
         except Exception as e:
-            last_exception = e
-            
-            # Check if we should retry
-            if not config.should_retry(e, attempt):
-                logger.debug(
-                    f"Function failed with non-retryable exception on attempt {attempt}",
-                    extra={
-                        "event": "retry_non_retryable",
-                        "function": func.__name__,
-                        "attempt": attempt,
-                        "exception": str(e),
-                        "exception_type": type(e).__name__
-                    }
-                )
-                break
-            
-            # If this is the last attempt, don't delay
-            if attempt == config.max_attempts:
-                logger.debug(
-                    f"Function failed on final attempt {attempt}",
-                    extra={
-                        "event": "retry_final_attempt",
-                        "function": func.__name__,
-                        "attempt": attempt,
-                        "exception": str(e),
-                        "exception_type": type(e).__name__
-                    }
-                )
-                break
-            
-            # Calculate delay
-            delay = config.calculate_delay(attempt)
-            total_delay += delay
-            
-            # Log the retry
-            logger.warning(
-                f"Function failed on attempt {attempt}, retrying in {delay:.2f}s",
-                extra={
-                    "event": "retry_attempt",
-                    "function": func.__name__,
-                    "attempt": attempt,
-                    "next_attempt": attempt + 1,
-                    "delay": delay,
-                    "exception": str(e),
-                    "exception_type": type(e).__name__
-                }
-            )
-            
-            # Call retry callback if provided
-            if on_retry:
-                try:
-                    on_retry(attempt, e, delay)
-                except Exception as callback_error:
-                    logger.warning(
-                        f"Retry callback failed: {callback_error}",
-                        extra={
-                            "event": "retry_callback_error",
-                            "function": func.__name__,
-                            "callback_error": str(callback_error)
-                        }
-                    )
-            
-            # Wait before retrying
-            time.sleep(delay)
+            outcome = (False, e)
+
+
+class RetryLoop:
+    """
+    Inline async retry loop, for bodies that shouldn't be wrapped in a function
+    
+    Usage:
+        retry = RetryLoop(config)
+        async for attempt in retry:
+            try:
+                retry.succeeded(await do_work())
+            except Exception as e:
+                retry.failed(e)
+        
+        if not retry.result.success:
+            raise retry.result.exception
     
-    # All attempts failed
-    logger.error(
-        f"Function failed after {attempts} attempts",
-        extra={
-            "event": "retry_exhausted",
-            "function": func.__name__,
-            "attempts": attempts,
-            "total_delay": total_delay,
-            "final_exception": str(last_exception),
-            "exception_type": type(last_exception).__name__
-        },
-        exc_info=True
-    )
+    Uses the same retry driver, delays and logging as retry_async; the
+    final RetryResult is available as .result once the loop ends.
+    """
     
-    return RetryResult(
-        success=False,
-        exception=last_exception,
-        attempts=attempts,
-        total_delay=total_delay
-    )
+    def __init__(
+        self,
+        config: Optional[RetryConfig] = None,
+        on_retry: Optional[Callable] = None,
+        name: str = "retry_loop"
+    ):
+        self.config = config or _DEFAULT_CONFIG
+        self.on_retry = on_retry
+        self.name = name
+        self.result: Optional[RetryResult] = None
+        self._driver = None
+        self._outcome: Optional[Tuple[bool, Any]] = None
+        self._attempt = 0
+    
+    def succeeded(self, result: Any = None) -> None:
+        """Report the current attempt as successful"""
+        self._outcome = (True, result)
+    
+    def failed(self, exception: Exception) -> None:
+        """Report the current attempt as failed"""
+        self._outcome = (False, exception)
+    
+    def __aiter__(self) -> "RetryLoop":
+        return self
+    
+    async def __anext__(self) -> int:
+        if self._driver is None:
+            self._driver = _retry_driver(self.name, self.config)
+            self._driver.send(None)
+            self._attempt = 1
+            return self._attempt
+        
+        if self.result is not None:
+            raise StopAsyncIteration
+        
+        outcome, self._outcome = self._outcome, None
+        if outcome is None:
+            raise RuntimeError(f"Retry attempt {self._attempt} reported neither success nor failure")
+        
+        try:
+            wait = self._driver.send(outcome)
+        except StopIteration as done:
+            self.result = done.value
+            raise StopAsyncIteration
+        
+        await _notify_retry(self.on_retry, wait, self.name)
+        await _retry_sleep(wait.delay)
+        
+        self._attempt += 1
+        return self._attempt
 
 
 # Decorators for automatic retry
@@ -408,21 +836,15 @@ def retry_async_decorator(
         non_retryable_exceptions=non_retryable_exceptions
     )
     
+    # Bind everything the wrapper needs as closure cells, once per decorator
+    _retry = _retry_async_raw
+    _config = config
+    _on_retry = on_retry
+    
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            result = await retry_async(
-                func, 
-                *args, 
-                config=config, 
-                on_retry=on_retry,
-                **kwargs
-            )
-            
-            if not result.success:
-                raise result.exception
-            
-            return result.result
+            return await _retry(func, args, kwargs, _config, _on_retry)
         
         return wrapper
     
@@ -449,21 +871,15 @@ def retry_sync_decorator(
         non_retryable_exceptions=non_retryable_exceptions
     )
     
+    # Bind everything the wrapper needs as closure cells, once per decorator
+    _retry = _retry_sync_raw
+    _config = config
+    _on_retry = on_retry
+    
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            result = retry_sync(
-                func, 
-                *args, 
-                config=config, 
-                on_retry=on_retry,
-                **kwargs
-            )
-            
-            if not result.success:
-                raise result.exception
-            
-            return result.result
+            return _retry(func, args, kwargs, _config, _on_retry)
         
         return wrapper
     
@@ -485,9 +901,10 @@ RETRY_CONFIGS = {
         max_attempts=3,
         base_delay=2.0,
         max_delay=60.0,
-        strategy=RetryStrategy.EXPONENTIAL,
+        strategy=RetryStrategy.FULL_JITTER,  # Spread retries against shared upstreams
         retryable_exceptions=[Exception],  # Retry API call failures
-        non_retryable_exceptions=[Exception]  # You can specify specific HTTP errors
+        non_retryable_exceptions=[Exception],  # You can specify specific HTTP errors
+        log_tracebacks=False  # Exception type and message are already in the log extras
     ),
     
     "quick_retry": RetryConfig(
@@ -512,23 +929,13 @@ RETRY_CONFIGS = {
 async def retry_database_operation(func: Callable, *args, **kwargs) -> Any:
     """Retry a database operation"""
     
-    result = await retry_async(func, *args, config=RETRY_CONFIGS["database"], **kwargs)
-    
-    if not result.success:
-        raise result.exception
-    
-    return result.result
+    return await _retry_async_raw(func, args, kwargs, RETRY_CONFIGS["database"], None)
 
 
 async def retry_api_call(func: Callable, *args, **kwargs) -> Any:
     """Retry an API call"""
     
-    result = await retry_async(func, *args, config=RETRY_CONFIGS["api_call"], **kwargs)
-    
-    if not result.success:
-        raise result.exception
-    
-    return result.result
+    return await _retry_async_raw(func, args, kwargs, RETRY_CONFIGS["api_call"], None)
 
 
 # Retry callback functions
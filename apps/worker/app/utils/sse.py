@@ -4,23 +4,156 @@ Provides SSE streaming functionality for real-time updates
 """
 
 import asyncio
-import json
 import logging
-from typing import AsyncGenerator, Dict, Any, Optional, Callable
+import time
+from dataclasses import dataclass, field
+from typing import AsyncGenerator, AsyncIterable, Dict, Any, Optional, Callable, Iterable, List, Set
 from datetime import datetime
 
+import orjson
 from fastapi import Request, Response
 from fastapi.responses import StreamingResponse
 
 logger = logging.getLogger(__name__)
 
+# orjson options for SSE payloads; non-string keys are stringified like json.dumps did
+SSE_JSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+# Static response headers for every SSE stream
+SSE_RESPONSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "Cache-Control, X-Requested-With"
+}
+
+# Idle seconds before create_sse_response sends a keepalive; the frame is an SSE
+# comment, which clients ignore but proxies count as traffic
+SSE_HEARTBEAT_INTERVAL = 30.0
+SSE_HEARTBEAT_FRAME = b": heartbeat\n\n"
+
+# Prebuilt named heartbeat event for stream_heartbeat; clients only need the frame
+SSE_HEARTBEAT_EVENT_FRAME = b"event: heartbeat\ndata: {}\n\n"
+
+# Broadcast frames buffered per connection; a client that falls this far behind
+# has superseded frames coalesced, and is disconnected if that isn't enough.
+# The response's own stream gets a separate budget of the same size and only
+# waits when it fills, so it never counts toward the disconnect
+SSE_CONNECTION_QUEUE_SIZE = 256
+
+# Event types where a newer frame makes older queued ones obsolete
+SSE_COALESCIBLE_EVENTS = frozenset({"progress", "heartbeat"})
+
+# End-of-stream marker on a connection queue
+_STREAM_END = object()
+
+# Event-type slot of entries from the response's own stream; never coalesced
+_OWN_STREAM = object()
+
+
+class _FrameQueue(asyncio.Queue):
+    """
+    Queue of (event_type, frame) entries whose get() returns the frame
+    
+    Broadcast frames and the response's own stream are bounded separately:
+    broadcasts by broadcast_full(), the own stream by put_stream() waiting.
+    """
+    
+    def __init__(self, limit: int = SSE_CONNECTION_QUEUE_SIZE):
+        super().__init__()
+        self.limit = limit
+        self.pushed = 0
+        self._stream_slots = asyncio.Semaphore(limit)
+    
+    def _put(self, item):
+        if item[0] is not _OWN_STREAM:
+            self.pushed += 1
+        self._queue.append(item)
+    
+    def _get(self):
+        event_type, frame = self._queue.popleft()
+        if event_type is _OWN_STREAM:
+            self._stream_slots.release()
+        else:
+            self.pushed -= 1
+        return frame
+    
+    def broadcast_full(self) -> bool:
+        """True once limit broadcast frames are waiting"""
+        return self.pushed >= self.limit
+    
+    async def put_stream(self, frame) -> None:
+        """Queue a frame from the response's own stream, waiting while its budget is used up"""
+        await self._stream_slots.acquire()
+        self.put_nowait((_OWN_STREAM, frame))
+    
+    def coalesce(self, event_type: str, frame: bytes) -> bool:
+        """Replace the oldest queued frame of event_type with frame; False if none is queued"""
+        
+        for index, (queued_type, _) in enumerate(self._queue):
+            if queued_type == event_type:
+                del self._queue[index]
+                self._queue.append((event_type, frame))
+                return True
+        return False
+    
+    def close(self) -> None:
+        """Discard buffered frames and end the stream"""
+        
+        self._queue.clear()
+        self.pushed = 0
+        self.put_nowait((None, _STREAM_END))
+
+# Granularity (seconds) of the cached wall-clock timestamp used in SSE payloads
+SSE_TIMESTAMP_RESOLUTION = 0.05
+
+_iso_tick = -1
+_iso_now = ""
+
+
+def _now_iso_cached() -> str:
+    """Current local time as an ISO string, cached for SSE_TIMESTAMP_RESOLUTION"""
+    global _iso_tick, _iso_now
+    
+    tick = int(time.time() / SSE_TIMESTAMP_RESOLUTION)
+    if tick != _iso_tick:
+        _iso_tick = tick
+        _iso_now = datetime.fromtimestamp(tick * SSE_TIMESTAMP_RESOLUTION).isoformat()
+    return _iso_now
+
+
+def _build_sse_frame(event_type: bytes, data_bytes: bytes, event_id: bytes) -> bytes:
+    """Assemble one SSE frame, ending in the blank line that terminates it"""
+    return b"".join((b"id: ", event_id, b"\nevent: ", event_type, b"\ndata: ", data_bytes, b"\n\n"))
+
+
+@dataclass(slots=True)
+class ConnectionInfo:
+    """State of one SSE connection"""
+    task_id: Optional[str]
+    user_id: Optional[str]
+    created_at_ts: float
+    last_activity_ts: float
+    queue: _FrameQueue = field(default_factory=_FrameQueue)
+    dropped_frames: int = 0
+
 
 class SSEManager:
     """Manager for Server-Sent Events connections"""
     
     def __init__(self):
-        self.active_connections: Dict[str, Dict[str, Any]] = {}
-        self.connection_count = 0
+        self.active_connections: Dict[str, ConnectionInfo] = {}
+        
+        # Secondary indexes so broadcasts only visit matching connections
+        self._by_task: Dict[str, Set[str]] = {}
+        self._by_user: Dict[str, Set[str]] = {}
+    
+    @property
+    def connection_count(self) -> int:
+        """Number of registered connections"""
+        return len(self.active_connections)
     
     async def add_connection(
         self, 
@@ -30,14 +163,18 @@ class SSEManager:
     ) -> None:
         """Add a new SSE connection"""
         
-        self.active_connections[connection_id] = {
-            "task_id": task_id,
-            "user_id": user_id,
-            "created_at": datetime.now().isoformat(),
-            "last_activity": datetime.now().isoformat()
-        }
+        now = time.time()
+        self.active_connections[connection_id] = ConnectionInfo(
+            task_id=task_id,
+            user_id=user_id,
+            created_at_ts=now,
+            last_activity_ts=now
+        )
         
-        self.connection_count += 1
+        if task_id is not None:
+            self._by_task.setdefault(task_id, set()).add(connection_id)
+        if user_id is not None:
+            self._by_user.setdefault(user_id, set()).add(connection_id)
         
         logger.info(
             f"SSE connection added: {connection_id}",
@@ -53,10 +190,7 @@ class SSEManager:
     async def remove_connection(self, connection_id: str) -> None:
         """Remove an SSE connection"""
         
-        if connection_id in self.active_connections:
-            del self.active_connections[connection_id]
-            self.connection_count -= 1
-            
+        if self._discard_connection(connection_id):
             logger.info(
                 f"SSE connection removed: {connection_id}",
                 extra={
@@ -66,6 +200,32 @@ class SSEManager:
                 }
             )
     
+    def _discard_connection(self, connection_id: str) -> bool:
+        """
+        Drop a connection and its index entries; False if it was not registered
+        
+        Broadcasts iterate the connection maps without snapshotting them, so
+        this must not run inside such a loop; collect the ids and discard after.
+        """
+        
+        connection_info = self.active_connections.pop(connection_id, None)
+        if connection_info is None:
+            return False
+        
+        self._unindex(self._by_task, connection_info.task_id, connection_id)
+        self._unindex(self._by_user, connection_info.user_id, connection_id)
+        return True
+    
+    @staticmethod
+    def _unindex(index: Dict[str, Set[str]], key: Optional[str], connection_id: str) -> None:
+        """Drop a connection from a secondary index, removing emptied entries"""
+        
+        connection_ids = index.get(key)
+        if connection_ids is not None:
+            connection_ids.discard(connection_id)
+            if not connection_ids:
+                del index[key]
+    
     async def send_to_connection(
         self, 
         connection_id: str, 
@@ -76,84 +236,183 @@ class SSEManager:
         if connection_id not in self.active_connections:
             return False
         
-        # Update last activity
-        self.active_connections[connection_id]["last_activity"] = datetime.now().isoformat()
+        now = _now_iso_cached()
         
         # Format SSE event
         event_data = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now,
             "connection_id": connection_id,
             **data
         }
+        frame = SSEEvent(data.get("type", "message"), event_data).to_sse_format()
         
-        # In a real implementation, this would send to the actual connection
-        # For now, we just log it
-        logger.debug(
-            f"SSE event sent to {connection_id}",
+        return self._send_prebuilt(connection_id, frame, data.get("type"), time.time())
+    
+    def _send_prebuilt(
+        self,
+        connection_id: str,
+        frame: bytes,
+        event_type: Optional[str],
+        now: float,
+        overflowed: Optional[List[str]] = None
+    ) -> bool:
+        """Send an already-encoded SSE frame to a connection"""
+        
+        connection_info = self.active_connections.get(connection_id)
+        if connection_info is None:
+            return False
+        
+        # Update last activity
+        connection_info.last_activity_ts = now
+        
+        if not self._push_to(connection_id, connection_info, frame, event_type, overflowed):
+            return False
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "SSE event sent to %s",
+                connection_id,
+                extra={
+                    "event": "sse_event_sent",
+                    "connection_id": connection_id,
+                    "event_type": event_type,
+                    "frame_size": len(frame)
+                }
+            )
+        
+        return True
+    
+    def push(self, connection_id: str, frame: bytes, event_type: Optional[str] = None) -> bool:
+        """
+        Queue a frame for a connection without awaiting
+        
+        When the connection's queue is full, a coalescible frame replaces the
+        oldest queued frame of its type; otherwise the slow client is
+        disconnected. Returns False if the frame was not queued.
+        """
+        
+        connection_info = self.active_connections.get(connection_id)
+        if connection_info is None:
+            return False
+        
+        return self._push_to(connection_id, connection_info, frame, event_type)
+    
+    def _push_to(
+        self,
+        connection_id: str,
+        connection_info: ConnectionInfo,
+        frame: bytes,
+        event_type: Optional[str],
+        overflowed: Optional[List[str]] = None
+    ) -> bool:
+        """
+        push() for a connection that has already been looked up
+        
+        If overflowed is given, a disconnected id is appended to it instead of
+        being discarded, so callers iterating the connection maps can discard
+        it once they are done.
+        """
+        
+        queue = connection_info.queue
+        if not queue.broadcast_full():
+            queue.put_nowait((event_type, frame))
+            return True
+        
+        connection_info.dropped_frames += 1
+        if event_type in SSE_COALESCIBLE_EVENTS and queue.coalesce(event_type, frame):
+            return True
+        
+        # Bound memory: end the stream rather than buffer without limit
+        queue.close()
+        if overflowed is None:
+            self._discard_connection(connection_id)
+        else:
+            overflowed.append(connection_id)
+        logger.warning(
+            "SSE connection %s closed: client too slow (%d frames dropped)",
+            connection_id,
+            connection_info.dropped_frames,
             extra={
-                "event": "sse_event_sent",
+                "event": "sse_connection_overflow",
                 "connection_id": connection_id,
-                "event_type": data.get("type"),
-                "data": event_data
+                "dropped_frames": connection_info.dropped_frames
             }
         )
+        return False
+    
+    def _broadcast_frame(self, data: Dict[str, Any], connection_ids: Iterable[str]) -> int:
+        """Serialize data once and send the frame to the given connections"""
         
-        return True
+        now = _now_iso_cached()
+        event_type = data.get("type")
+        frame = SSEEvent(event_type or "message", {"timestamp": now, **data}).to_sse_format()
+        
+        sent_count = 0
+        sent_ts = time.time()
+        overflowed: List[str] = []
+        # Sends only enqueue; each connection's response task does its own socket
+        # write, so the writes already overlap and there is nothing to gather.
+        # connection_ids may be a live view of the connection maps, so slow
+        # clients are only collected here and discarded after the loop
+        for connection_id in connection_ids:
+            if self._send_prebuilt(connection_id, frame, event_type, sent_ts, overflowed):
+                sent_count += 1
+        
+        for connection_id in overflowed:
+            self._discard_connection(connection_id)
+        
+        return sent_count
     
     async def broadcast_to_task(self, task_id: str, data: Dict[str, Any]) -> int:
         """Broadcast data to all connections for a specific task"""
         
-        sent_count = 0
-        
-        for connection_id, connection_info in self.active_connections.items():
-            if connection_info.get("task_id") == task_id:
-                if await self.send_to_connection(connection_id, data):
-                    sent_count += 1
+        sent_count = self._broadcast_frame(data, self._by_task.get(task_id, ()))
         
-        logger.debug(
-            f"SSE broadcast to task {task_id}: {sent_count} connections",
-            extra={
-                "event": "sse_broadcast_task",
-                "task_id": task_id,
-                "connections_reached": sent_count,
-                "event_type": data.get("type")
-            }
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "SSE broadcast to task %s: %d connections",
+                task_id,
+                sent_count,
+                extra={
+                    "event": "sse_broadcast_task",
+                    "task_id": task_id,
+                    "connections_reached": sent_count,
+                    "event_type": data.get("type")
+                }
+            )
         
         return sent_count
     
     async def broadcast_to_user(self, user_id: str, data: Dict[str, Any]) -> int:
         """Broadcast data to all connections for a specific user"""
         
-        sent_count = 0
-        
-        for connection_id, connection_info in self.active_connections.items():
-            if connection_info.get("user_id") == user_id:
-                if await self.send_to_connection(connection_id, data):
-                    sent_count += 1
+        sent_count = self._broadcast_frame(data, self._by_user.get(user_id, ()))
         
-        logger.debug(
-            f"SSE broadcast to user {user_id}: {sent_count} connections",
-            extra={
-                "event": "sse_broadcast_user",
-                "user_id": user_id,
-                "connections_reached": sent_count,
-                "event_type": data.get("type")
-            }
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "SSE broadcast to user %s: %d connections",
+                user_id,
+                sent_count,
+                extra={
+                    "event": "sse_broadcast_user",
+                    "user_id": user_id,
+                    "connections_reached": sent_count,
+                    "event_type": data.get("type")
+                }
+            )
         
         return sent_count
     
     async def cleanup_stale_connections(self, max_age_hours: int = 24) -> int:
         """Clean up stale connections"""
         
-        stale_connections = []
-        cutoff_time = datetime.now() - timedelta(hours=max_age_hours)
+        cutoff = time.time() - max_age_hours * 3600
         
-        for connection_id, connection_info in self.active_connections.items():
-            last_activity = datetime.fromisoformat(connection_info["last_activity"])
-            if last_activity < cutoff_time:
-                stale_connections.append(connection_id)
+        stale_connections = [
+            connection_id
+            for connection_id, connection_info in self.active_connections.items()
+            if connection_info.last_activity_ts < cutoff
+        ]
         
         # Remove stale connections
         for connection_id in stale_connections:
@@ -174,9 +433,10 @@ class SSEManager:
     def get_connection_stats(self) -> Dict[str, Any]:
         """Get statistics about SSE connections"""
         
+        connection_count = self.connection_count
         return {
-            "total_connections": self.connection_count,
-            "active_connections": len(self.active_connections),
+            "total_connections": connection_count,
+            "active_connections": connection_count,
             "connections": list(self.active_connections.keys())
         }
 
@@ -196,51 +456,91 @@ class SSEEvent:
     ):
         self.event_type = event_type
         self.data = data
-        self.event_id = event_id or f"evt_{int(datetime.now().timestamp() * 1000)}"
+        self.event_id = event_id or f"evt_{time.time_ns() // 1_000_000}"
         self.timestamp = datetime.now()
     
-    def to_sse_format(self) -> str:
-        """Convert event to SSE format string"""
-        
-        lines = []
-        
-        # Add event ID
-        lines.append(f"id: {self.event_id}")
+    def to_sse_format(self) -> bytes:
+        """Convert event to an SSE frame"""
         
-        # Add event type
-        lines.append(f"event: {self.event_type}")
-        
-        # Add data
-        data_json = json.dumps(self.data, default=str)
-        lines.append(f"data: {data_json}")
-        
-        # Add blank line to separate events
-        lines.append("")
-        
-        return "\n".join(lines)
+        return _build_sse_frame(
+            self.event_type.encode(),
+            orjson.dumps(self.data, default=str, option=SSE_JSON_OPTIONS),
+            self.event_id.encode()
+        )
+
+
+def _event_to_frame(event_data: Any) -> bytes:
+    """Encode an event from a stream generator as an SSE frame"""
+    
+    if isinstance(event_data, dict):
+        # Convert dict to SSE format
+        return SSEEvent(
+            event_type=event_data.get("type", "message"),
+            data=event_data
+        ).to_sse_format()
+    
+    if isinstance(event_data, str):
+        # Already in SSE format
+        return event_data.encode()
+    
+    # Already an encoded SSE frame
+    return event_data
 
 
 async def create_sse_response(
     request: Request,
     event_generator: AsyncGenerator[str, None],
-    connection_id: str
+    connection_id: str,
+    heartbeat_interval: Optional[float] = SSE_HEARTBEAT_INTERVAL
 ) -> StreamingResponse:
-    """Create an SSE response with proper headers"""
+    """
+    Create an SSE response with proper headers, sending keepalives while idle
+    
+    The response streams event_generator's events together with any frames
+    broadcast to connection_id through sse_manager.
+    """
     
     async def sse_generator():
         """Generator that yields SSE events"""
+        stream_errors = []
+        
+        async def pump():
+            """Feed this response's own events into the connection queue"""
+            try:
+                async for event_data in event_generator:
+                    await queue.put_stream(_event_to_frame(event_data))
+            except Exception as e:
+                stream_errors.append(e)
+            await queue.put_stream(_STREAM_END)
+        
+        pump_task = asyncio.ensure_future(pump())
+        getter: Optional[asyncio.Future] = None
         try:
-            async for event_data in event_generator:
-                if isinstance(event_data, dict):
-                    # Convert dict to SSE format
-                    event = SSEEvent(
-                        event_type=event_data.get("type", "message"),
-                        data=event_data
-                    )
-                    yield event.to_sse_format()
+            while True:
+                if getter is None and not queue.empty():
+                    # Drain already-queued frames without scheduling a task
+                    frame = queue.get_nowait()
                 else:
-                    # Assume it's already in SSE format
-                    yield event_data
+                    if getter is None:
+                        getter = asyncio.ensure_future(queue.get())
+                    
+                    # Race the next frame against the heartbeat; asyncio.wait times
+                    # out without raising, unlike wait_for
+                    if heartbeat_interval:
+                        done, _ = await asyncio.wait((getter,), timeout=heartbeat_interval)
+                        if not done:
+                            yield SSE_HEARTBEAT_FRAME
+                            continue
+                    
+                    frame = await getter
+                    getter = None
+                
+                if frame is _STREAM_END:
+                    if stream_errors:
+                        raise stream_errors[0]
+                    break
+                
+                yield frame
         except asyncio.CancelledError:
             logger.info(
                 f"SSE connection cancelled: {connection_id}",
@@ -260,23 +560,22 @@ async def create_sse_response(
                 exc_info=True
             )
         finally:
+            if getter is not None:
+                getter.cancel()
+            pump_task.cancel()
+            
             # Clean up connection
             await sse_manager.remove_connection(connection_id)
     
-    # Add connection to manager
+    # Add connection to manager; the stream holds on to its queue even if the
+    # manager drops the connection first
     await sse_manager.add_connection(connection_id)
+    queue = sse_manager.active_connections[connection_id].queue
     
     return StreamingResponse(
         sse_generator(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "Cache-Control",
-            "Access-Control-Allow-Headers": "X-Requested-With"
-        }
+        media_type="text/event-stream; charset=utf-8",
+        headers=SSE_RESPONSE_HEADERS
     )
 
 
@@ -323,17 +622,11 @@ async def stream_task_events(task_id: str) -> AsyncGenerator[Dict[str, Any], Non
     }
 
 
-async def stream_heartbeat() -> AsyncGenerator[Dict[str, Any], None]:
+async def stream_heartbeat() -> AsyncGenerator[bytes, None]:
     """Stream heartbeat events to keep connection alive"""
     
     while True:
-        yield {
-            "type": "heartbeat",
-            "data": {
-                "timestamp": datetime.now().isoformat(),
-                "message": "Connection alive"
-            }
-        }
+        yield SSE_HEARTBEAT_EVENT_FRAME
         
         await asyncio.sleep(30)  # Send heartbeat every 30 seconds
 
@@ -346,28 +639,106 @@ async def stream_error_events(error_message: str) -> AsyncGenerator[Dict[str, An
         "type": "error",
         "data": {
             "error": error_message,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": _now_iso_cached()
         }
     }
 
 
-async def stream_chat_events(messages: list) -> AsyncGenerator[Dict[str, Any], None]:
-    """Stream chat message events"""
+async def stream_chat_events(
+    messages: list,
+    batch_size: int = 4,
+    flush_ms: int = 50
+) -> AsyncGenerator[Dict[str, Any], None]:
+    """Stream chat message events, coalescing rapid chunks into batched frames"""
+    
+    async for event in coalesce_events(_chat_message_events(messages), batch_size, flush_ms):
+        yield event
+
+
+async def _chat_message_events(messages: list) -> AsyncGenerator[Dict[str, Any], None]:
+    """One text event per chat message"""
     
     for message in messages:
         yield {
             "type": "text",
             "data": {
                 "content": message,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": _now_iso_cached()
             }
         }
         
         await asyncio.sleep(0.5)  # Simulate streaming delay
 
 
+def _merge_events(event_type: str, chunks: List[Any]) -> Dict[str, Any]:
+    """Single event carrying the data of several same-type events"""
+    return {"type": event_type, "data": {"chunks": chunks}}
+
+
+async def coalesce_events(
+    events: AsyncIterable[Dict[str, Any]],
+    batch_size: int = 4,
+    flush_ms: int = 50
+) -> AsyncGenerator[Dict[str, Any], None]:
+    """
+    Merge runs of same-type events into one event per batch
+    
+    A batch is emitted once it holds batch_size events, flush_ms after its
+    first event, or when an event of another type arrives. Its data is
+    {"chunks": [data, ...]} in arrival order.
+    """
+    
+    loop = asyncio.get_running_loop()
+    iterator = events.__aiter__()
+    pending: Optional[asyncio.Future] = None
+    batch: List[Any] = []
+    batch_type = None
+    deadline = 0.0
+    
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            
+            # Flush a partial batch if the next event doesn't arrive in time
+            if batch:
+                done, _ = await asyncio.wait((pending,), timeout=max(0.0, deadline - loop.time()))
+                if not done:
+                    yield _merge_events(batch_type, batch)
+                    batch = []
+                    continue
+            
+            try:
+                event = await pending
+            except StopAsyncIteration:
+                pending = None
+                break
+            pending = None
+            
+            event_type = event.get("type", "message")
+            if batch and event_type != batch_type:
+                yield _merge_events(batch_type, batch)
+                batch = []
+            
+            if not batch:
+                batch_type = event_type
+                deadline = loop.time() + flush_ms / 1000
+            batch.append(event.get("data"))
+            
+            if len(batch) >= batch_size:
+                yield _merge_events(batch_type, batch)
+                batch = []
+        
+        if batch:
+            yield _merge_events(batch_type, batch)
+    
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+
 # Utility functions
-def format_sse_event(event_type: str, data: Dict[str, Any]) -> str:
+def format_sse_event(event_type: str, data: Dict[str, Any]) -> bytes:
     """Format a single SSE event"""
     
     event = SSEEvent(event_type, data)
@@ -401,11 +772,10 @@ async def broadcast_sse_event(
         return await sse_manager.broadcast_to_user(user_id, {"type": event_type, "data": data})
     else:
         # Broadcast to all connections
-        sent_count = 0
-        for connection_id in list(sse_manager.active_connections.keys()):
-            if await sse_manager.send_to_connection(connection_id, {"type": event_type, "data": data}):
-                sent_count += 1
-        return sent_count
+        return sse_manager._broadcast_frame(
+            {"type": event_type, "data": data},
+            sse_manager.active_connections
+        )
 
 
 # Cleanup task
@@ -422,6 +792,3 @@ async def cleanup_sse_connections():
                 
         except Exception as e:
             logger.error(f"Error during SSE cleanup: {e}")
-
-
-from datetime import timedelta
\ No newline at end of file
@@ -4,15 +4,25 @@ Handles request tracing, correlation IDs, and distributed tracing
 """
 
 import logging
-import uuid
+import os
+import sys
 import time
 from typing import Optional, Dict, Any
 from contextlib import contextmanager
-from dataclasses import dataclass
-from datetime import datetime
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import wraps
+
+import orjson
+
+from app.config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# When off, @trace_function hands back the undecorated function
+_TRACING_ENABLED = settings.enable_tracing
+
 
 @dataclass
 class TraceContext:
@@ -22,6 +32,8 @@ class TraceContext:
     parent_span_id: Optional[str]
     baggage: Dict[str, Any]
     start_time: float
+    # Monotonic start for duration math; start_time stays the wall-clock timestamp
+    start_ns: int = field(default_factory=time.perf_counter_ns)
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary"""
@@ -34,26 +46,77 @@ class TraceContext:
         }
 
 
+# Active span for the current asyncio task (or thread); copied into child tasks
+_current_ctx: ContextVar[Optional[TraceContext]] = ContextVar("trace_ctx", default=None)
+
+# LogRecord attributes that are not part of a call site's extra payload
+_LOG_RECORD_ATTRS = frozenset(
+    logging.LogRecord("", 0, "", 0, "", None, None).__dict__
+) | {"message", "asctime"}
+
+# orjson options for log lines; naive datetimes in extras are treated as UTC
+LOG_JSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY
+
+
+class JsonFormatter(logging.Formatter):
+    """Log formatter emitting one orjson-encoded object per record, extras included"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        
+        for key, value in record.__dict__.items():
+            if key not in _LOG_RECORD_ATTRS:
+                payload[key] = value
+        
+        if "trace_id" not in payload:
+            trace_context = _current_ctx.get()
+            if trace_context is not None:
+                payload["trace_id"] = trace_context.trace_id
+                payload["span_id"] = trace_context.span_id
+        
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        
+        # default=str keeps odd extras (exceptions, Decimals, ...) from dropping the line
+        return orjson.dumps(payload, default=str, option=LOG_JSON_OPTIONS).decode()
+
+
+def use_json_logging(target: Optional[logging.Logger] = None) -> None:
+    """Switch every handler on the given (default: root) logger to JsonFormatter"""
+    
+    formatter = JsonFormatter()
+    for handler in (target or logging.getLogger()).handlers:
+        handler.setFormatter(formatter)
+
+
 class TraceManager:
     """Manager for trace context and operations"""
     
-    def __init__(self):
-        self.current_context: Optional[TraceContext] = None
+    @property
+    def current_context(self) -> Optional[TraceContext]:
+        """Trace context active in the current task"""
+        return _current_ctx.get()
     
     def generate_trace_id(self) -> str:
-        """Generate a new trace ID"""
-        return str(uuid.uuid4()).replace("-", "")[:32]
+        """Generate a new 128-bit trace ID (32 hex chars)"""
+        return os.urandom(16).hex()
     
     def generate_span_id(self) -> str:
-        """Generate a new span ID"""
-        return str(uuid.uuid4()).replace("-", "")[:16]
+        """Generate a new 64-bit span ID (16 hex chars)"""
+        return os.urandom(8).hex()
     
     def create_trace_context(
         self, 
         parent_context: Optional['TraceContext'] = None,
-        baggage: Dict[str, Any] = None
+        baggage: Dict[str, Any] = None,
+        activate: bool = True
     ) -> TraceContext:
-        """Create a new trace context"""
+        """Create a new trace context, making it current unless activate is False"""
         
         if parent_context:
             # Child span
@@ -74,22 +137,40 @@ class TraceManager:
             start_time=time.time()
         )
         
-        self.current_context = context
+        if activate:
+            _current_ctx.set(context)
         return context
     
     def get_current_context(self) -> Optional[TraceContext]:
         """Get current trace context"""
-        return self.current_context
+        return _current_ctx.get()
+    
+    def start_span(self, **tags) -> tuple:
+        """Create a root or child span and make it current; returns (span, token)"""
+        
+        parent = _current_ctx.get()
+        if parent is None:
+            span = self.create_trace_context(None, tags, activate=False)
+        else:
+            span = self.create_trace_context(parent, activate=False)
+        
+        return span, _current_ctx.set(span)
+    
+    def end_span(self, token: Token) -> None:
+        """Restore the trace context that was current before start_span"""
+        _current_ctx.reset(token)
     
     def set_baggage_item(self, key: str, value: Any) -> None:
         """Set baggage item in current context"""
-        if self.current_context:
-            self.current_context.baggage[key] = value
+        context = _current_ctx.get()
+        if context:
+            context.baggage[key] = value
     
     def get_baggage_item(self, key: str) -> Optional[Any]:
         """Get baggage item from current context"""
-        if self.current_context:
-            return self.current_context.baggage.get(key)
+        context = _current_ctx.get()
+        if context:
+            return context.baggage.get(key)
         return None
 
 
@@ -139,28 +220,30 @@ def trace_operation(operation_name: str, **tags):
     """Context manager for tracing operations"""
     
     # Create new span
-    span = create_root_span(**tags) if not trace_manager.get_current_context() else create_child_span()
+    span, token = trace_manager.start_span(**tags)
     span.operation_name = operation_name
     
-    start_time = time.time()
+    start_ns = time.perf_counter_ns()
     
     try:
-        logger.debug(
-            f"Starting trace operation: {operation_name}",
-            extra={
-                "event": "trace_operation_start",
-                "operation_name": operation_name,
-                "trace_id": span.trace_id,
-                "span_id": span.span_id,
-                "tags": tags
-            }
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Starting trace operation: %s",
+                operation_name,
+                extra={
+                    "event": "trace_operation_start",
+                    "operation_name": operation_name,
+                    "trace_id": span.trace_id,
+                    "span_id": span.span_id,
+                    "tags": tags
+                }
+            )
         
         yield span
         
     except Exception as e:
         # Log error with trace context
-        duration = time.time() - start_time
+        duration = (time.perf_counter_ns() - start_ns) / 1e9
         
         logger.error(
             f"Trace operation failed: {operation_name} - {str(e)}",
@@ -180,7 +263,7 @@ def trace_operation(operation_name: str, **tags):
         
     finally:
         # Log completion
-        duration = time.time() - start_time
+        duration = (time.perf_counter_ns() - start_ns) / 1e9
         
         logger.info(
             f"Trace operation completed: {operation_name} ({duration:.3f}s)",
@@ -193,6 +276,8 @@ def trace_operation(operation_name: str, **tags):
                 "tags": tags
             }
         )
+        
+        trace_manager.end_span(token)
 
 
 def log_with_trace(
@@ -224,18 +309,19 @@ def get_trace_headers(trace_context: Optional[TraceContext] = None) -> Dict[str,
     if not trace_context:
         return {}
     
+    trace_id = trace_context.trace_id
+    span_id = trace_context.span_id
+    
     headers = {
-        "X-Trace-Id": trace_context.trace_id,
-        "X-Span-Id": trace_context.span_id,
+        "X-Trace-Id": trace_id,
+        "X-Span-Id": span_id,
+        # OpenTelemetry traceparent header
+        "traceparent": f"00-{trace_id}-{span_id}-01"
     }
     
     if trace_context.parent_span_id:
         headers["X-Parent-Span-Id"] = trace_context.parent_span_id
     
-    # Add OpenTelemetry traceparent header
-    traceparent = f"00-{trace_context.trace_id}-{trace_context.span_id}-01"
-    headers["traceparent"] = traceparent
-    
     return headers
 
 
@@ -243,21 +329,22 @@ def parse_trace_headers(headers: Dict[str, str]) -> Optional[TraceContext]:
     """Parse trace headers and create context"""
     
     # Try to extract from traceparent (OpenTelemetry format)
+    # Version 00 has fixed offsets: 00-<32 hex trace id>-<16 hex span id>-<2 hex flags>
     traceparent = headers.get("traceparent")
-    if traceparent and traceparent.startswith("00-"):
-        parts = traceparent.split("-")
-        if len(parts) >= 3:
-            trace_id = parts[1]
-            span_id = parts[2]
-            parent_span_id = None
-            
-            return TraceContext(
-                trace_id=trace_id,
-                span_id=span_id,
-                parent_span_id=parent_span_id,
-                baggage={},
-                start_time=time.time()
-            )
+    if (
+        traceparent
+        and len(traceparent) == 55
+        and traceparent.startswith("00-")
+        and traceparent[35] == "-"
+        and traceparent[52] == "-"
+    ):
+        return TraceContext(
+            trace_id=traceparent[3:35],
+            span_id=traceparent[36:52],
+            parent_span_id=None,
+            baggage={},
+            start_time=time.time()
+        )
     
     # Fallback to custom headers
     trace_id = headers.get("X-Trace-Id")
@@ -284,28 +371,32 @@ class AsyncTraceContext:
         self.operation_name = operation_name
         self.tags = tags
         self.span = None
-        self.start_time = None
+        self.start_ns = None
+        self._token = None
     
     async def __aenter__(self):
-        self.span = create_root_span(**self.tags) if not trace_manager.get_current_context() else create_child_span()
+        self.span, self._token = trace_manager.start_span(**self.tags)
         self.span.operation_name = self.operation_name
-        self.start_time = time.time()
+        self.start_ns = time.perf_counter_ns()
         
-        logger.debug(
-            f"Starting async trace operation: {self.operation_name}",
-            extra={
-                "event": "async_trace_operation_start",
-                "operation_name": self.operation_name,
-                "trace_id": self.span.trace_id,
-                "span_id": self.span.span_id,
-                "tags": self.tags
-            }
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Starting async trace operation: %s",
+                self.operation_name,
+                extra={
+                    "event": "async_trace_operation_start",
+                    "operation_name": self.operation_name,
+                    "trace_id": self.span.trace_id,
+                    "span_id": self.span.span_id,
+                    "tags": self.tags
+                }
+            )
         
         return self.span
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        duration = time.time() - self.start_time
+        duration = (time.perf_counter_ns() - self.start_ns) / 1e9
+        trace_manager.end_span(self._token)
         
         if exc_type:
             logger.error(
@@ -340,20 +431,25 @@ def trace_function(operation_name: str = None, **tags):
     """Decorator for automatic function tracing"""
     
     def decorator(func):
-        operation = operation_name or f"{func.__module__}.{func.__name__}"
+        if not _TRACING_ENABLED:
+            return func
         
-        async def async_wrapper(*args, **kwargs):
-            async with AsyncTraceContext(operation, **tags):
-                return await func(*args, **kwargs)
+        operation = sys.intern(operation_name or f"{func.__module__}.{func.__qualname__}")
         
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                async with AsyncTraceContext(operation, **tags):
+                    return await func(*args, **kwargs)
+            
+            return async_wrapper
+        
+        @wraps(func)
         def sync_wrapper(*args, **kwargs):
             with trace_operation(operation, **tags):
                 return func(*args, **kwargs)
         
-        if asyncio.iscoroutinefunction(func):
-            return async_wrapper
-        else:
-            return sync_wrapper
+        return sync_wrapper
     
     return decorator
 